@@ -1,46 +1,114 @@
 import os
-import psycopg2
-import matplotlib
+import json
+import time
+import uuid
 import pandas as pd
 from config import Config
 from models import db, User
 from flask_cors import CORS
 from typing import Dict, Any
-from llm.llm import ask_agent
-from pymongo import MongoClient
-import matplotlib.pyplot as plt
+from llm.llm import ask_agent, stream_agent, reset_conversation
+from llm.dataset_cache import DATAFRAME_CACHE
+from llm.response_cache import RESPONSE_CACHE
 from flask_migrate import Migrate
-from plot_utils import _generate_plots
+from plot_utils import PLOT_CACHE
+from export_utils import EXPORT_CACHE, EXPORT_FORMATS
+from delta_utils import versioned
+from column_utils import COLUMN_PROFILES, column_page
+from warmup import warm_up
+from db_pool import DatabasePools, public_params
+from db_import import record_batches
+from dataset_store import create_dataset_store
+from jobs import JobQueue, _source_df, _upload_task, _import_task, _preprocess_task, _analytics_task
 from sqlalchemy import create_engine, inspect
 from werkzeug.security import generate_password_hash, check_password_hash
-from preprocess_utils import _compute_overview_and_stats, _apply_preprocessing
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_file
+from preprocess_utils import _compute_overview_and_stats, PreprocessingPipeline
+from flask import (Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify,
+                   send_file, stream_with_context)
 
 app = Flask(__name__)
 CORS(app)
 app.config.from_object(Config)
 
-matplotlib.use('Agg')
 # Initialize DB and Migrate
 db.init_app(app)
 migrate = Migrate(app, db)
 
-# In-memory dataframe store keyed by user_id
-USER_DATAFRAMES: Dict[int, pd.DataFrame] = {}
+# Per-user datasets (in-memory LRU, shared Arrow files on disk, or both)
+DATASET_STORE = create_dataset_store(app.config)
+# Background upload/preprocess/analytics jobs (process pool, started on first use)
+JOB_QUEUE = JobQueue(app.config, DATASET_STORE)
+# Pooled connections to users' external databases
+DB_POOLS = DatabasePools(app.config)
 
+# Optional warm-up (PRELOAD=analytics,agent), e.g. once in the gunicorn master with --preload
+if app.config['PRELOAD']:
+    warm_up(app.config['PRELOAD'])
 
-def _get_user_df() -> pd.DataFrame | None:
+
+def _get_user_df(columns: list[str] | None = None) -> pd.DataFrame | None:
     user_id = session.get('user_id')
     if user_id is None:
         return None
-    return USER_DATAFRAMES.get(user_id)
+    return DATASET_STORE.get(user_id, columns)
 
 
 def _set_user_df(df: pd.DataFrame) -> None:
     user_id = session.get('user_id')
     if user_id is None:
         return
-    USER_DATAFRAMES[user_id] = df
+    DATASET_STORE.set(user_id, df)
+
+
+def _user_pipeline() -> PreprocessingPipeline:
+    """The user's last applied pipeline, refitted (from the step cache) on the source."""
+    pipeline = PreprocessingPipeline(session.get('preprocessing_steps', []),
+                                     float32=session.get('preprocessing_float32', False))
+    source = _source_df(DATASET_STORE, session['user_id'])
+    if source is not None:
+        pipeline.fit_transform(source)
+    return pipeline
+
+
+def _wants_async() -> bool:
+    # ?async=1 (or "async": true in a JSON body) runs the work as a background job
+    flag = request.args.get('async')
+    if flag is None and request.is_json:
+        flag = request.json.get('async')
+    return str(flag).lower() in ('1', 'true')
+
+
+def _plot_mode() -> str:
+    # ?mode=data (or "mode": "data" in a JSON body) returns chart data instead of PNGs
+    mode = request.args.get('mode')
+    if mode is None and request.is_json:
+        mode = request.json.get('mode')
+    return 'data' if str(mode).lower() == 'data' else 'image'
+
+
+def _since() -> str | None:
+    # ?since=<version> (or "since" in a JSON body): the result version the client already holds
+    since = request.args.get('since')
+    if since is None and request.is_json:
+        since = request.json.get('since')
+    return since or None
+
+
+def _versioned_response(result: Dict[str, Any], **extra: Any):
+    """JSON for a versioned result: 304 when If-None-Match has its version, else full or delta."""
+    payload = versioned(result, _since())
+    if request.if_none_match.contains(payload['version']):
+        response = Response(status=304)
+    else:
+        response = jsonify({**extra, **payload})
+    response.set_etag(payload['version'])
+    return response
+
+
+def _job_response(job: Dict[str, Any]):
+    return jsonify({'success': True, 'job_id': job['id'],
+                    'status_url': url_for('job_status', job_id=job['id']),
+                    'events_url': url_for('job_events', job_id=job['id'])}), 202
 
 # Routes
 @app.route('/')
@@ -125,7 +193,8 @@ def dashboard():
     df = _get_user_df()
     template_kwargs: Dict[str, Any] = {'user': user}
     if df is not None:
-        computed = _compute_overview_and_stats(df)
+        # The template only shows the overview; column profiles are fetched by the page
+        computed = _compute_overview_and_stats(df, max_columns=0)
         template_kwargs.update(computed)
     return render_template('dashboard.html', **template_kwargs)  # dashboard.html expects 'user'
 
@@ -133,8 +202,8 @@ def dashboard():
 @app.route('/logout')
 def logout():
     user_id = session.pop('user_id', None)
-    if user_id in USER_DATAFRAMES:
-        USER_DATAFRAMES.pop(user_id)
+    if user_id is not None:
+        DATASET_STORE.delete(user_id)
     return redirect(url_for('login'))
 
 
@@ -147,19 +216,26 @@ def upload():
         return jsonify({'error': 'No file provided'}), 400
     try:
         filename_lower = file.filename.lower()
-        if filename_lower.endswith('.csv'):
-            df = pd.read_csv(file)
-        elif filename_lower.endswith('.xlsx') or filename_lower.endswith('.xls'):
-            df = pd.read_excel(file)
-        else:
+        if not filename_lower.endswith(('.csv', '.xlsx', '.xls')):
             flash('Unsupported file format. Please upload CSV or Excel.', 'danger')
             return redirect(url_for('dashboard'))
-        _set_user_df(df)
-        computed = _compute_overview_and_stats(df)
-        plots = _generate_plots(df)
-
-        return jsonify({'success': True, 'message': 'Dataset uploaded successfully!',
-                        **computed, 'plots': plots})
+        user_id = session['user_id']
+        if _wants_async():
+            # The request body is gone once we respond, so the job reads a saved copy
+            os.makedirs(app.config['DATASET_DIR'], exist_ok=True)
+            path = os.path.join(app.config['DATASET_DIR'],
+                                f'upload_{user_id}_{uuid.uuid4().hex}{os.path.splitext(filename_lower)[1]}')
+            file.save(path)
+            response = _job_response(JOB_QUEUE.submit('upload', user_id, path=path, filename=filename_lower,
+                                                      config=JOB_QUEUE.config, plot_mode=_plot_mode()))
+        else:
+            result = _upload_task(DATASET_STORE, user_id, file, filename_lower, app.config,
+                                  plot_mode=_plot_mode())
+            response = jsonify({'success': True, 'message': 'Dataset uploaded successfully!', **result})
+        # A new upload starts an empty pipeline
+        session.pop('preprocessing_steps', None)
+        session.pop('preprocessing_float32', None)
+        return response
     except Exception as e:
         app.logger.exception("Upload failed")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -169,110 +245,243 @@ def upload():
 def api_analytics():
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
-    df = _get_user_df()
-    if df is None:
+    if DATASET_STORE.get(session['user_id']) is None:
+        return jsonify({'error': 'No dataset uploaded yet'}), 400
+    # ?approximate=1 trades exactness for speed on large frames: HyperLogLog
+    # distinct counts for text columns, and plots drawn from a row sample sized
+    # so their rank error stays within ?epsilon= (default STATS_APPROX_EPSILON)
+    approximate = request.args.get('approximate', '').lower() in ('1', 'true')
+    try:
+        epsilon = float(request.args.get('epsilon', app.config['STATS_APPROX_EPSILON']))
+    except ValueError:
+        return jsonify({'error': 'epsilon must be a number'}), 400
+    if not 0 < epsilon < 0.5:
+        return jsonify({'error': 'epsilon must be between 0 and 0.5'}), 400
+    plot_mode = _plot_mode()
+    if _wants_async():
+        return _job_response(JOB_QUEUE.submit('analytics', session['user_id'], approximate=approximate,
+                                              plot_mode=plot_mode, epsilon=epsilon, since=_since()))
+    return _versioned_response(_analytics_task(DATASET_STORE, session['user_id'], approximate=approximate,
+                                               plot_mode=plot_mode, epsilon=epsilon))
+
+
+@app.route('/api/columns', methods=['GET'])
+def api_columns():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if DATASET_STORE.version(session['user_id']) is None:
         return jsonify({'error': 'No dataset uploaded yet'}), 400
-    computed = _compute_overview_and_stats(df)
-    plots = _generate_plots(df)
-    return jsonify({**computed, 'plots': plots})
+    # A page of column profiles: ?offset=&limit=&sort=&order=asc|desc&q=<name filter>&kind=all|numeric|text
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = min(int(request.args.get('limit', app.config['COLUMN_PAGE_SIZE'])), app.config['COLUMN_PAGE_MAX'])
+        page = column_page(DATASET_STORE, session['user_id'], offset, limit,
+                           sort=request.args.get('sort', 'position'),
+                           descending=request.args.get('order', 'asc').lower() == 'desc',
+                           search=request.args.get('q', ''), kind=request.args.get('kind', 'all'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Pages are fixed for a dataset version, so revalidation is a 304
+    response = jsonify(page)
+    response.set_etag(f"{page['version']}-{request.query_string.decode()}")
+    return response.make_conditional(request)
+
+
+@app.route('/api/cache_stats', methods=['GET'])
+def api_cache_stats():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    return jsonify({'plots': PLOT_CACHE.stats(), 'datasets': DATASET_STORE.stats(),
+                    'llm_datasets': DATAFRAME_CACHE.stats(), 'llm_responses': RESPONSE_CACHE.stats(),
+                    'databases': DB_POOLS.stats(), 'exports': EXPORT_CACHE.stats(),
+                    'column_profiles': COLUMN_PROFILES.stats()})
 
 
 @app.route('/preprocess', methods=['POST'])
 def preprocess():
     if 'user_id' not in session:
         return jsonify({'error': 'Unauthorized'}), 401
-    df = _get_user_df()
-    if df is None:
+    if DATASET_STORE.get(session['user_id']) is None:
         return jsonify({'error': 'No dataset uploaded yet'}), 400
 
     # Read steps from either form or JSON
     steps = request.json.get('steps') if request.is_json else request.form.getlist('preprocessing')
     if not steps:
         steps = []
+    # float32 halves the memory of the scaled numeric columns
+    float32 = (request.json.get('float32') if request.is_json else request.form.get('float32'))
+    float32 = app.config['PREPROCESS_FLOAT32'] if float32 is None else str(float32).lower() in ('1', 'true')
     try:
-        new_df = _apply_preprocessing(df, steps)
-        _set_user_df(new_df)
-        computed = _compute_overview_and_stats(new_df)
-        plots = _generate_plots(new_df)
-
-        return jsonify({'success': True, 'message': 'Preprocessing successful!',
-                        **computed, 'plots': plots})
+        if _wants_async():
+            response = _job_response(JOB_QUEUE.submit('preprocess', session['user_id'],
+                                                      steps=steps, float32=float32,
+                                                      plot_mode=_plot_mode(), since=_since()))
+        else:
+            result = _preprocess_task(DATASET_STORE, session['user_id'], steps, float32,
+                                      plot_mode=_plot_mode())
+            response = _versioned_response(result, success=True, message='Preprocessing successful!')
+        session['preprocessing_steps'] = PreprocessingPipeline(steps).step_names
+        session['preprocessing_float32'] = float32
+        return response
     except Exception as e:
         app.logger.exception("Preprocessing failed")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/pipeline', methods=['GET'])
+def api_pipeline():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    # Fitted parameters of the current pipeline; PreprocessingPipeline.from_dict
+    # replays them on new data without refitting
+    return jsonify(_user_pipeline().to_dict())
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    job = JOB_QUEUE.jobs.get(job_id)
+    if job is None or job['user_id'] != session['user_id']:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    job = JOB_QUEUE.jobs.get(job_id)
+    if job is None or job['user_id'] != session['user_id']:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def stream():
+        # Server-sent events: the job record each time it changes, until it finishes
+        last_update = None
+        while True:
+            current = JOB_QUEUE.jobs.get(job_id)
+            if current is None:
+                break
+            if current['updated'] != last_update:
+                last_update = current['updated']
+                yield f"data: {json.dumps(current)}\n\n"
+            if current['status'] in ('done', 'error'):
+                break
+            time.sleep(app.config['JOB_POLL_SECONDS'])
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/download')
 def download():
     df = _get_user_df()
     if df is None:
         return jsonify({'error': 'No dataset available'}), 400
-    csv_path = os.path.join('static', 'exports', f'user_{session["user_id"]}_data.csv')
-    os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-    df.to_csv(csv_path, index=False)
-    return send_file(csv_path, as_attachment=True)
+    # ?format=csv|parquet|feather|arrow, and ?gzip=1 for CSV
+    fmt = request.args.get('format', 'csv').lower()
+    gzip = request.args.get('gzip') in ('1', 'true')
+    try:
+        path, chunks = EXPORT_CACHE.export(df, fmt, gzip)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f'user_{session["user_id"]}_data{extension}'
+    if gzip and fmt == 'csv':
+        mimetype, filename = 'application/gzip', filename + '.gz'
+    if path is not None:
+        return send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename)
+    # Streamed while it is written to the export cache
+    return Response(chunks, mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @app.route('/connect_db', methods=['POST'])
 def connect_db():
     db_type = request.form['db_type']
-    host = request.form['host']
-    port = request.form['port']
-    db_name = request.form['database']
-    username = request.form.get('username')
-    password = request.form.get('password')
+    labels = {'postgresql': 'PostgreSQL', 'mysql': 'MySQL', 'mongodb': 'MongoDB', 'sqlite': 'SQLite'}
 
     try:
-        if db_type == 'postgresql':
-            conn = psycopg2.connect(
-                host=host, port=port, dbname=db_name,
-                user=username, password=password
-            )
-            cur = conn.cursor()
-            cur.execute("""SELECT table_schema, table_name 
-                           FROM information_schema.tables
-                           WHERE table_schema NOT IN ('information_schema', 'pg_catalog')
-                           ORDER BY table_schema, table_name;""")
-            tables = cur.fetchall()
-            conn.close()
-
-            html = render_template('partials/db_schema.html', tables=tables, db_type='PostgreSQL')
-
-        elif db_type == 'mysql':
-            conn = pymysql.connect(
-                host=host, port=int(port), user=username,
-                password=password, db=db_name
-            )
-            cur = conn.cursor()
-            cur.execute("SHOW TABLES;")
-            tables = [(db_name, t[0]) for t in cur.fetchall()]
-            conn.close()
-
-            html = render_template('partials/db_schema.html', tables=tables, db_type='MySQL')
-
-        elif db_type == 'mongodb':
-            client = MongoClient(f"mongodb://{username}:{password}@{host}:{port}/")
-            db = client[db_name]
-            collections = db.list_collection_names()
-            tables = [(db_name, c) for c in collections]
-            html = render_template('partials/db_schema.html', tables=tables, db_type='MongoDB')
-
-        else:
-            return jsonify(success=False, error="Unsupported database type")
-
+        # Pooled connections and cached table listings (see db_pool.DatabasePools)
+        pool_id = DB_POOLS.register(request.form)
+        tables, _ = DB_POOLS.list_tables(pool_id, refresh=request.form.get('refresh') in ('1', 'true'))
+        # Pools are per process: other workers rebuild this one from the parameters
+        # kept here plus the password the client sends with each import
+        session['db_connection'] = {'pool_id': pool_id, 'params': public_params(request.form)}
+        html = render_template('partials/db_schema.html', tables=tables, db_type=labels.get(db_type, db_type))
         return jsonify(success=True, html=html)
 
     except Exception as e:
         return jsonify(success=False, error=str(e))
 
+@app.route('/import_db', methods=['POST'])
+def import_db():
+    if 'user_id' not in session:
+        return jsonify({'error': 'Unauthorized'}), 401
+    if 'db_connection' not in session:
+        return jsonify({'error': 'No database connected'}), 400
+    params = request.get_json(silent=True) or request.form
+    try:
+        connection = session['db_connection']
+        if not isinstance(connection, dict):
+            raise KeyError('Database connection expired; connect again')
+        pool_id = DB_POOLS.resolve(connection['pool_id'], {**connection['params'], 'password': params.get('password')})
+        tables, _ = DB_POOLS.list_tables(pool_id)
+        filter_ = params.get('filter')
+        # Rows stream from a server-side cursor into Arrow batches (see db_import.record_batches)
+        batches = record_batches(DB_POOLS.pool(pool_id), tables, table=params.get('table'),
+                                 schema=params.get('schema'), query=params.get('query'),
+                                 columns=params.get('columns'),
+                                 filter_=json.loads(filter_) if isinstance(filter_, str) else filter_,
+                                 limit=params.get('limit'), max_rows=app.config['DB_IMPORT_MAX_ROWS'],
+                                 batch_rows=app.config['DB_IMPORT_BATCH_ROWS'],
+                                 allow_queries=app.config['DB_IMPORT_ALLOW_QUERIES'])
+        result = _import_task(DATASET_STORE, session['user_id'], batches, app.config, plot_mode=_plot_mode())
+        # An import starts an empty pipeline, like an upload
+        session.pop('preprocessing_steps', None)
+        session.pop('preprocessing_float32', None)
+        return jsonify({'success': True, 'message': 'Dataset imported successfully!', **result})
+    except (KeyError, ValueError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        app.logger.exception("Import failed")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route("/ai-chat", methods=["GET"])
 def chat_page():
     return render_template("chat.html")
 
+def _chat_thread() -> str:
+    """The caller's conversation with the agent: one per user, or per browser session."""
+    if 'user_id' in session:
+        return f"user-{session['user_id']}"
+    if 'chat_thread' not in session:
+        session['chat_thread'] = uuid.uuid4().hex
+    return f"session-{session['chat_thread']}"
+
 @app.route("/ai-chat", methods=["POST"])
 def chat_api():
     user_input = request.json.get("message")
-    response = ask_agent(user_input)
+    response = ask_agent(user_input, _chat_thread())
     return jsonify({"reply": response})
 
+@app.route("/ai-chat/reset", methods=["POST"])
+def chat_reset():
+    reset_conversation(_chat_thread())
+    return jsonify({"success": True})
+
+@app.route("/ai-chat/stream", methods=["POST"])
+def chat_stream():
+    user_input = request.json.get("message")
+    thread_id = _chat_thread()
+
+    def stream():
+        # Server-sent events: an immediate "start", then LLM tokens and tool
+        # progress as the agent produces them, ending with "done" or "error"
+        yield f"data: {json.dumps({'type': 'start'})}\n\n"
+        for event in stream_agent(user_input, thread_id):
+            yield f"data: {json.dumps(event, default=str)}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,349 @@
+"""Latency and peak memory of the analytics, preprocessing and plotting hot paths on
+synthetic datasets, written as JSON that can be compared between commits.
+
+    python benchmarks/hot_paths.py --preset smoke                  # a quick look
+    python benchmarks/hot_paths.py -o base.json                    # default grid, saved
+    python benchmarks/hot_paths.py -o new.json --compare base.json --threshold 0.15
+    python benchmarks/hot_paths.py --rows 10000000 --columns 50 --mixes numeric --only stats,chart_data
+
+Functions are called directly with their caches bypassed or cleared. Routes
+run through the Flask test client with a logged-in session, against a
+throwaway DATASET_DIR, so no database or Ollama server is needed. Every case
+is timed ``--repeat`` times; peak memory is the tracemalloc peak of one more
+run (allocations made in plot worker processes are not counted). With
+``--compare``, the exit status is 1 when a case's median time or peak memory
+grew by more than its threshold over the baseline file.
+"""
+import gc
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRESETS = {
+    'smoke': {'rows': [1_000, 10_000], 'columns': [10], 'mixes': ['mixed']},
+    'default': {'rows': [1_000, 100_000, 1_000_000], 'columns': [10, 50], 'mixes': ['numeric', 'mixed']},
+    'full': {'rows': [1_000, 100_000, 1_000_000, 10_000_000], 'columns': [10, 50, 200],
+             'mixes': ['numeric', 'mixed', 'text']},
+}
+
+# Dtype mixes: (column kind, share of the columns)
+MIXES = {
+    'numeric': [('float', 0.7), ('int', 0.3)],
+    'mixed': [('float', 0.5), ('int', 0.2), ('category', 0.2), ('id', 0.1)],
+    'text': [('float', 0.25), ('category', 0.45), ('id', 0.3)],
+}
+# Share of missing cells in float and text columns of every mix but 'numeric'
+MISSING_SHARE = 0.05
+CATEGORIES = np.array(['red', 'green', 'blue', 'cyan', 'magenta', 'yellow', 'black', 'white',
+                       'north', 'south', 'east', 'west'], dtype=object)
+
+PREPROCESS_STEPS = ['fill_median', 'fill_mode', 'treat_outliers', 'standardize', 'one_hot']
+USER_ID = 1
+
+
+def _column_kinds(columns: int, mix: str) -> List[str]:
+    """``columns`` column kinds in the proportions of ``mix`` (largest remainder, floats first)."""
+    shares = MIXES[mix]
+    counts = [int(columns * share) for _, share in shares]
+    by_remainder = sorted(range(len(shares)), key=lambda i: columns * shares[i][1] - counts[i], reverse=True)
+    for i in by_remainder[:columns - sum(counts)]:
+        counts[i] += 1
+    return [kind for (kind, _), count in zip(shares, counts) for _ in range(count)]
+
+
+def _synthetic(rows: int, columns: int, mix: str, seed: int = 0) -> pd.DataFrame:
+    """A reproducible frame of ``rows`` x ``columns`` with the dtypes of ``mix``."""
+    rng = np.random.default_rng(seed)
+    missing = 0.0 if mix == 'numeric' else MISSING_SHARE
+    data: Dict[str, Any] = {}
+    for i, kind in enumerate(_column_kinds(columns, mix)):
+        if kind == 'float':
+            values = rng.normal(rng.uniform(-100, 100), rng.uniform(1, 50), rows)
+            if missing:
+                values[rng.random(rows) < missing] = np.nan
+        elif kind == 'int':
+            values = rng.integers(0, 1_000, rows)
+        elif kind == 'category':
+            values = CATEGORIES[rng.integers(0, len(CATEGORIES), rows)]
+        else:
+            # ID-like: close to one distinct value per row
+            values = np.char.add('id', rng.integers(0, rows, rows).astype(str)).astype(object)
+        if kind in ('category', 'id') and missing:
+            values[rng.random(rows) < missing] = None
+        data[f'{kind}_{i}'] = values
+    return pd.DataFrame(data)
+
+
+def _measure(run: Callable[[], Any], setup: Callable[[], None], repeat: int,
+             memory: bool) -> Tuple[List[float], Optional[int]]:
+    """Wall seconds of ``repeat`` runs, and the tracemalloc peak of one more (each after ``setup``)."""
+    seconds = []
+    for _ in range(repeat):
+        setup()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return seconds, peak
+
+
+class Bench:
+    """The project modules, imported once DATASET_DIR points at a throwaway directory."""
+
+    def __init__(self):
+        import app
+        from plot_utils import PLOT_CACHE, PLOT_POOL, _generate_plots, _chart_data
+        from preprocess_utils import STEP_CACHE, _apply_preprocessing
+        from stats_utils import _compute_overview_and_stats
+        from export_utils import EXPORT_CACHE
+        from column_utils import COLUMN_PROFILES, COLUMN_SCHEMAS
+        self.app = app
+        self.pool = PLOT_POOL
+        self.caches = [PLOT_CACHE, STEP_CACHE, EXPORT_CACHE, COLUMN_PROFILES, COLUMN_SCHEMAS]
+        self.client = app.app.test_client()
+        with self.client.session_transaction() as session:
+            session['user_id'] = USER_ID
+        self.functions: Dict[str, Callable[[pd.DataFrame], Any]] = {
+            'stats': _compute_overview_and_stats,
+            'stats_approx': lambda df: _compute_overview_and_stats(df, approximate=True),
+            'preprocess': lambda df: _apply_preprocessing(df, PREPROCESS_STEPS),
+            'plots': lambda df: _generate_plots(df, cache=None),
+            'chart_data': lambda df: _chart_data(df, cache=None),
+        }
+        self.routes: Dict[str, Callable[[], Any]] = {
+            'route:upload': self._upload,
+            'route:analytics': lambda: self._get('/api/analytics?mode=data'),
+            'route:analytics_image': lambda: self._get('/api/analytics'),
+            'route:preprocess': lambda: self._check(self.client.post(
+                '/preprocess', json={'steps': PREPROCESS_STEPS, 'mode': 'data'})),
+            'route:columns': lambda: self._get('/api/columns?sort=mean&order=desc&limit=100'),
+            'route:download': lambda: self._get('/download?format=csv'),
+        }
+        self._csv = b''
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.functions) + list(self.routes)
+
+    def clear_caches(self) -> None:
+        for cache in self.caches:
+            cache.clear()
+
+    def load(self, df: pd.DataFrame, csv: bool) -> None:
+        """Make ``df`` the benchmark user's dataset (and, for the upload route, a CSV file)."""
+        self.app.DATASET_STORE.delete(USER_ID)
+        self.app.DATASET_STORE.set(USER_ID, df)
+        self._csv = df.to_csv(index=False).encode('utf-8') if csv else b''
+
+    def reset_dataset(self, df: pd.DataFrame) -> None:
+        # Preprocessing and uploads replace the current dataset; put the benchmark's back
+        if self.app.DATASET_STORE.get(USER_ID) is not df:
+            self.app.DATASET_STORE.set(USER_ID, df)
+        self.app.DATASET_STORE.delete(USER_ID, slot='source')
+
+    @staticmethod
+    def _check(response: Any) -> Any:
+        body = response.get_data()
+        if response.status_code != 200:
+            raise RuntimeError(f'HTTP {response.status_code}: {body[:300]!r}')
+        return body
+
+    def _get(self, url: str) -> Any:
+        return self._check(self.client.get(url))
+
+    def _upload(self) -> Any:
+        data = {'file': (io.BytesIO(self._csv), 'benchmark.csv')}
+        return self._check(self.client.post('/upload?mode=data', data=data, content_type='multipart/form-data'))
+
+    def warm_up(self, names: List[str]) -> None:
+        """Run every benchmark once on a tiny frame: lazy imports and worker pools start here, untimed."""
+        df = _synthetic(200, 6, 'mixed')
+        self.load(df, csv=True)
+        for name in names:
+            self.clear_caches()
+            self.reset_dataset(df)
+            if name in self.functions:
+                self.functions[name](df)
+            else:
+                self.routes[name]()
+
+    def case(self, name: str, df: pd.DataFrame, repeat: int, memory: bool) -> Tuple[List[float], Optional[int]]:
+        def setup() -> None:
+            self.clear_caches()
+            self.reset_dataset(df)
+
+        if name in self.functions:
+            function = self.functions[name]
+            return _measure(lambda: function(df), setup, repeat, memory)
+        return _measure(self.routes[name], setup, repeat, memory)
+
+
+def _case_id(result: Dict[str, Any]) -> str:
+    return f"{result['bench']}/{result['mix']}/{result['rows']}x{result['columns']}"
+
+
+def _meta(args: argparse.Namespace) -> Dict[str, Any]:
+    def git(*command: str) -> Optional[str]:
+        try:
+            return subprocess.run(['git', *command], cwd=ROOT, capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'repeat': args.repeat,
+    }
+
+
+def _compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float,
+             memory_threshold: float, min_seconds: float) -> List[str]:
+    """Print each case against the baseline; return the cases that regressed beyond a threshold."""
+    previous = {_case_id(r): r for r in baseline['results']}
+    regressions = []
+    print(f"\nAgainst {str(baseline['meta'].get('commit'))[:12]} "
+          f"(time +{threshold:.0%}, memory +{memory_threshold:.0%}):")
+    print(f"{'case':<44} {'base [s]':>9} {'now [s]':>9} {'time':>7} {'memory':>7}")
+    for result in results:
+        case = _case_id(result)
+        base = previous.get(case)
+        if base is None:
+            print(f'{case:<44} {"(new)":>9}')
+            continue
+        before, now = base['seconds']['median'], result['seconds']['median']
+        time_ratio = now / before if before else float('inf')
+        memory_ratio = (result['peak_bytes'] / base['peak_bytes']
+                        if result['peak_bytes'] and base.get('peak_bytes') else None)
+        flags = []
+        # Sub-millisecond cases are all noise; they only regress past the absolute floor
+        if time_ratio > 1 + threshold and now - before > min_seconds:
+            flags.append('time')
+        if memory_ratio is not None and memory_ratio > 1 + memory_threshold:
+            flags.append('memory')
+        memory_text = f'{memory_ratio:>6.2f}x' if memory_ratio is not None else f'{"-":>7}'
+        print(f'{case:<44} {before:>9.4f} {now:>9.4f} {time_ratio:>6.2f}x {memory_text}'
+              f'{"  REGRESSED: " + ", ".join(flags) if flags else ""}')
+        if flags:
+            regressions.append(f"{case} ({', '.join(flags)})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='default')
+    parser.add_argument('--rows', type=int, nargs='+', help='row counts (overrides the preset)')
+    parser.add_argument('--columns', type=int, nargs='+', help='column counts (overrides the preset)')
+    parser.add_argument('--mixes', nargs='+', choices=sorted(MIXES), help='dtype mixes (overrides the preset)')
+    parser.add_argument('--only', default='', help='comma-separated benchmarks, e.g. stats,route:analytics')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per case')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--route-max-rows', type=int, default=1_000_000,
+                        help='largest dataset the routes are run on')
+    parser.add_argument('--max-cells', type=int, default=500_000_000,
+                        help='skip datasets with more rows x columns than this')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help='write the results here as JSON')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed median time growth')
+    parser.add_argument('--memory-threshold', type=float, default=0.20, help='allowed peak memory growth')
+    parser.add_argument('--min-seconds', type=float, default=0.005,
+                        help='time growth below this many seconds is never a regression')
+    args = parser.parse_args()
+    preset = PRESETS[args.preset]
+    rows, columns, mixes = args.rows or preset['rows'], args.columns or preset['columns'], args.mixes or preset['mixes']
+
+    # Everything the app writes (datasets, exports, snapshots) goes to a directory removed at exit
+    dataset_dir = tempfile.mkdtemp(prefix='agentic_ai_bench_')
+    os.environ['DATASET_DIR'] = dataset_dir
+    # The user database URI must parse, but nothing here connects to it
+    for key, value in (('DB_USER', 'bench'), ('DB_PASSWORD', 'bench'), ('DB_HOST', 'localhost'),
+                       ('DB_PORT', '5432'), ('DB_NAME', 'bench')):
+        os.environ.setdefault(key, value)
+    sys.path.insert(0, ROOT)
+    bench = None
+    results = []
+    try:
+        bench = Bench()
+        names = [n.strip() for n in args.only.split(',') if n.strip()] or bench.names
+        unknown = sorted(set(names) - set(bench.names))
+        if unknown:
+            parser.error(f'unknown benchmarks {unknown}; choose from {bench.names}')
+        bench.warm_up(names)
+        print(f"{'case':<44} {'median [s]':>10} {'min [s]':>9} {'peak [MB]':>10}")
+        for mix in mixes:
+            for n_columns in columns:
+                for n_rows in rows:
+                    if n_rows * n_columns > args.max_cells:
+                        print(f'skipped {mix}/{n_rows}x{n_columns}: more than --max-cells', file=sys.stderr)
+                        continue
+                    cases = [n for n in names if not n.startswith('route:') or n_rows <= args.route_max_rows]
+                    if not cases:
+                        continue
+                    df = _synthetic(n_rows, n_columns, mix, args.seed)
+                    bench.load(df, csv='route:upload' in cases)
+                    for name in cases:
+                        seconds, peak = bench.case(name, df, args.repeat, not args.no_memory)
+                        result = {
+                            'bench': name,
+                            'kind': 'route' if name.startswith('route:') else 'function',
+                            'mix': mix, 'rows': n_rows, 'columns': n_columns,
+                            'seconds': {'median': statistics.median(seconds), 'min': min(seconds),
+                                        'max': max(seconds), 'runs': seconds},
+                            'peak_bytes': peak,
+                        }
+                        results.append(result)
+                        peak_text = f'{peak / 1e6:>10.1f}' if peak is not None else f'{"-":>10}'
+                        print(f"{_case_id(result):<44} {result['seconds']['median']:>10.4f} "
+                              f"{result['seconds']['min']:>9.4f} {peak_text}", flush=True)
+                    del df
+    finally:
+        if bench is not None:
+            bench.pool.shutdown()
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+
+    report = {'meta': {**_meta(args), 'rows': rows, 'columns': columns, 'mixes': mixes}, 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = _compare(results, baseline, args.threshold, args.memory_threshold, args.min_seconds)
+        if regressions:
+            print(f'\n{len(regressions)} regression(s): {"; ".join(regressions)}', file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Start-up cost of the app: wall time to import each module in a fresh interpreter,
+plus the heaviest imports underneath it (from ``python -X importtime``).
+
+    python benchmarks/import_time.py                 # app and the main modules
+    python benchmarks/import_time.py app --top 20    # 20 heaviest imports under app
+    python benchmarks/import_time.py --warm-up analytics,agent
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['app', 'jobs', 'plot_utils', 'preprocess_utils', 'stats_utils', 'ingest_utils',
+           'dataset_store', 'llm.llm', 'llm.tools_']
+
+TIMED_IMPORT = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+TIMED_WARM_UP = ("import time; t = time.perf_counter(); import warmup; "
+                 "print(warmup.warm_up({targets!r}), time.perf_counter() - t)")
+
+
+def _run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    return subprocess.run(args, cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def _wall_seconds(module: str, repeat: int) -> float:
+    """Median wall time of ``import module`` in a fresh interpreter."""
+    return statistics.median(float(_run(TIMED_IMPORT.format(module=module)).stdout.split()[-1])
+                             for _ in range(repeat))
+
+
+def _heaviest(module: str, top: int) -> List[Tuple[str, float, float]]:
+    """(module, self seconds, cumulative seconds) of the ``top`` slowest imports under ``module``."""
+    rows: Dict[str, Tuple[float, float]] = {}
+    for line in _run(f'import {module}', importtime=True).stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows[name.strip()] = (int(own) / 1e6, int(cumulative) / 1e6)
+    ranked = sorted(rows.items(), key=lambda item: item[1][1], reverse=True)
+    return [(name, own, cumulative) for name, (own, cumulative) in ranked[1:top + 1]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=MODULES)
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=10, help='heaviest imports listed per module')
+    parser.add_argument('--warm-up', default='', help='also time warmup.warm_up for these targets')
+    args = parser.parse_args()
+
+    print(f"{'module':<20} {'import [s]':>10}")
+    for module in args.modules:
+        print(f'{module:<20} {_wall_seconds(module, args.repeat):>10.3f}')
+    for module in args.modules:
+        if args.top <= 0:
+            break
+        print(f'\nHeaviest imports under {module} (cumulative / self seconds):')
+        for name, own, cumulative in _heaviest(module, args.top):
+            print(f'  {name:<50} {cumulative:>7.3f} {own:>7.3f}')
+    if args.warm_up:
+        targets = [t for t in args.warm_up.split(',') if t]
+        print(f'\nwarm_up({targets}): {_run(TIMED_WARM_UP.format(targets=targets)).stdout.strip()}')
+
+
+if __name__ == '__main__':
+    main()
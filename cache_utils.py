@@ -0,0 +1,184 @@
+import sys
+import time
+import hashlib
+import weakref
+import threading
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+
+
+def _default_sizeof(value: Any) -> int:
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sum(_default_sizeof(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and (optionally) bytes.
+
+    With ``ttl_seconds``, entries also expire that long after they were set.
+    Hit, miss and eviction counters are kept so callers can expose them.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = _default_sizeof,
+                 on_evict: Optional[Callable[[Hashable, int], None]] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._expires: Dict[Hashable, float] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data and not self._expired(key):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, size: Optional[int] = None) -> None:
+        if size is None:
+            size = self._sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            # Values that can never fit are not cached at all
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            if self.ttl_seconds is not None:
+                self._expires[key] = time.monotonic() + self.ttl_seconds
+            self._bytes += size
+            self._evict()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            value = self._data[key]
+            self._remove(key)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._expires.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data and not self._expired(key)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def size_of(self, key: Hashable) -> int:
+        with self._lock:
+            return self._sizes.get(key, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        del self._data[key]
+        self._expires.pop(key, None)
+        self._bytes -= self._sizes.pop(key)
+
+    def _expired(self, key: Hashable) -> bool:
+        """Drop ``key`` if its TTL has passed (caller holds the lock)."""
+        expires = self._expires.get(key)
+        if expires is None or time.monotonic() < expires:
+            return False
+        self._remove(key)
+        self.expirations += 1
+        return True
+
+    def _evict(self) -> None:
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._data))
+            size = self._sizes[oldest]
+            self._remove(oldest)
+            self.evictions += 1
+            if self._on_evict is not None:
+                self._on_evict(oldest, size)
+
+
+## Fingerprints
+# Column fingerprints are memoized per DataFrame object. Stored frames are never
+# mutated in place (every transform builds a new frame), so identity is a safe key.
+_FINGERPRINT_MEMO: Dict[int, Dict[Tuple[int, Any], str]] = {}
+_FINGERPRINT_LOCK = threading.Lock()
+
+
+def _series_fingerprint(series: pd.Series) -> str:
+    try:
+        row_hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    except TypeError:
+        # Unhashable cells (lists, dicts) fall back to their string form
+        row_hashes = pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+    digest = hashlib.blake2b(digest_size=16)
+    # repr keeps the column labels 1 and '1' apart
+    digest.update(f'{series.name!r}|{series.dtype}|'.encode('utf-8'))
+    digest.update(row_hashes.tobytes())
+    return digest.hexdigest()
+
+
+def _column_fingerprints(df: pd.DataFrame) -> Dict[Tuple[int, Any], str]:
+    """Fingerprint of every column, keyed by (position, label) so duplicate labels stay distinct."""
+    key = id(df)
+    with _FINGERPRINT_LOCK:
+        cached = _FINGERPRINT_MEMO.get(key)
+    if cached is not None:
+        return cached
+    fingerprints = {(pos, col): _series_fingerprint(series) for pos, (col, series) in enumerate(df.items())}
+    with _FINGERPRINT_LOCK:
+        _FINGERPRINT_MEMO[key] = fingerprints
+    weakref.finalize(df, _FINGERPRINT_MEMO.pop, key, None)
+    return fingerprints
+
+
+def _combine_fingerprints(*parts: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def _frame_fingerprint(df: pd.DataFrame) -> str:
+    fingerprints = _column_fingerprints(df)
+    return _combine_fingerprints(str(df.shape[0]), *(f'{pos}={fp}' for (pos, _), fp in fingerprints.items()))
@@ -0,0 +1,124 @@
+import math
+from config import Config
+from cache_utils import LRUCache
+from dataset_store import DatasetStore
+from stats_utils import DESCRIBE_METRICS, _compute_overview_and_stats, _is_numeric_dtype
+from typing import Dict, Any, List, Optional, Tuple
+
+# Sort keys served without profiling anything (read from the schema)
+SCHEMA_SORTS = ('position', 'name', 'dtype')
+PROFILE_SORTS = ('missing_percent', 'unique_values', *DESCRIBE_METRICS)
+COLUMN_KINDS = ('all', 'numeric', 'text')
+
+# Column profiles ({'info': column_info entry, 'statistics': describe metrics or None})
+# by (user, dataset version, column position); a new dataset version never reuses them
+COLUMN_PROFILES = LRUCache(max_entries=Config.COLUMN_PROFILE_CACHE_MAX_ENTRIES,
+                           max_bytes=Config.COLUMN_PROFILE_CACHE_MAX_BYTES)
+# (position, name, dtype, is numeric) of every column, by (user, dataset version)
+COLUMN_SCHEMAS = LRUCache(max_entries=256)
+
+
+def _schema(store: DatasetStore, user_id: int, version: int,
+            cache: LRUCache = COLUMN_SCHEMAS) -> List[Tuple[int, Any, str, bool]]:
+    schema = cache.get((user_id, version))
+    if schema is None:
+        dtypes = store.dtypes(user_id)
+        if dtypes is None:
+            raise ValueError('No dataset uploaded yet')
+        schema = [(pos, col, str(dtype), _is_numeric_dtype(dtype)) for pos, (col, dtype) in enumerate(dtypes.items())]
+        cache.set((user_id, version), schema, size=0)
+    return schema
+
+
+def _select(schema: List[Tuple[int, Any, str, bool]], search: str, kind: str) -> List[Tuple[int, Any, str]]:
+    """(position, name, dtype) of the columns whose name contains ``search`` and that are of ``kind``."""
+    if kind not in COLUMN_KINDS:
+        raise ValueError(f"Unknown column kind '{kind}'. Choose from {list(COLUMN_KINDS)}")
+    search = search.lower()
+    return [(pos, col, dtype) for pos, col, dtype, numeric in schema
+            if (not search or search in str(col).lower()) and (kind == 'all' or numeric == (kind == 'numeric'))]
+
+
+def _profiles(store: DatasetStore, user_id: int, version: int, columns: List[Tuple[int, Any]],
+              cache: LRUCache = COLUMN_PROFILES,
+              block_columns: int = Config.COLUMN_PROFILE_BLOCK) -> Dict[int, Dict[str, Any]]:
+    """Profiles of ``columns`` ((position, name) pairs) by position.
+
+    The uncached ones are read and profiled ``block_columns`` at a time. A
+    name shared by several columns reads all of them, in schema order, so each
+    column is picked out of the block by its position.
+    """
+    profiles = {pos: cache.get((user_id, version, pos)) for pos, _ in columns}
+    missing = [(pos, col) for pos, col in columns if profiles[pos] is None]
+    if not missing:
+        return profiles
+    positions_of: Dict[Any, List[int]] = {}
+    for pos, col, _, _ in _schema(store, user_id, version):
+        positions_of.setdefault(col, []).append(pos)
+    for start in range(0, len(missing), block_columns):
+        block = missing[start:start + block_columns]
+        labels = list(dict.fromkeys(col for _, col in block))
+        df = store.get(user_id, columns=labels)
+        if df is None:
+            raise ValueError('No dataset uploaded yet')
+        read = {pos: i for i, pos in enumerate(p for col in labels for p in positions_of[col])}
+        # Profiled under placeholder labels so duplicate names keep apart
+        df = df.iloc[:, [read[pos] for pos, _ in block]].set_axis(range(len(block)), axis=1)
+        computed = _compute_overview_and_stats(df)
+        for (pos, col), info in zip(block, computed['column_info']):
+            profile = {'info': {**info, 'name': col}, 'statistics': computed['statistics'].get(info['name'])}
+            cache.set((user_id, version, pos), profile)
+            profiles[pos] = profile
+    return profiles
+
+
+def _sort_value(profile: Dict[str, Any], sort: str) -> Optional[float]:
+    if sort in ('missing_percent', 'unique_values'):
+        value = profile['info'].get(sort)
+    else:
+        value = (profile['statistics'] or {}).get(sort)
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
+
+
+def column_page(store: DatasetStore, user_id: int, offset: int = 0, limit: int = Config.COLUMN_PAGE_SIZE,
+                sort: str = 'position', descending: bool = False, search: str = '', kind: str = 'all',
+                cache: LRUCache = COLUMN_PROFILES) -> Dict[str, Any]:
+    """One page of the dataset's column profiles (column_info entries plus their statistics).
+
+    Columns are filtered by a case-insensitive ``search`` on the name and by
+    ``kind``, then sorted. Schema sorts profile only the columns of the page;
+    sorting by a profile metric profiles every selected column once, after
+    which the cached profiles serve any page of this dataset version.
+    Columns without the metric (e.g. ``mean`` of a text column) sort last.
+    """
+    if sort not in SCHEMA_SORTS + PROFILE_SORTS:
+        raise ValueError(f"Unknown sort '{sort}'. Choose from {list(SCHEMA_SORTS + PROFILE_SORTS)}")
+    if offset < 0 or limit <= 0:
+        raise ValueError('offset must be >= 0 and limit positive')
+    version = store.version(user_id)
+    if version is None:
+        raise ValueError('No dataset uploaded yet')
+    schema = _schema(store, user_id, version)
+    columns = _select(schema, search, kind)
+    if sort in SCHEMA_SORTS:
+        field = SCHEMA_SORTS.index(sort)
+        columns.sort(key=lambda c: (str(c[field]), c[0]) if field else c[0], reverse=descending)
+        page = columns[offset:offset + limit]
+        profiles = _profiles(store, user_id, version, [(pos, col) for pos, col, _ in page], cache)
+    else:
+        profiles = _profiles(store, user_id, version, [(pos, col) for pos, col, _ in columns], cache)
+        valued = [c for c in columns if _sort_value(profiles[c[0]], sort) is not None]
+        valued.sort(key=lambda c: _sort_value(profiles[c[0]], sort), reverse=descending)
+        page = (valued + [c for c in columns if _sort_value(profiles[c[0]], sort) is None])[offset:offset + limit]
+
+    return {
+        'version': str(version),
+        'total': len(columns),
+        'total_columns': len(schema),
+        'offset': offset,
+        'limit': limit,
+        'sort': sort,
+        'order': 'desc' if descending else 'asc',
+        'columns': [{'position': pos, **profiles[pos]['info'], 'statistics': profiles[pos]['statistics']}
+                    for pos, _, _ in page],
+    }
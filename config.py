@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from .env
@@ -11,3 +12,130 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY', 'fallbacksecret')
+
+    # Warm-up at import (see warmup.warm_up): comma-separated targets, e.g. analytics,agent
+    PRELOAD = [t.strip() for t in os.getenv('PRELOAD', '').split(',') if t.strip()]
+
+    # Plot cache (see plot_utils.PLOT_CACHE)
+    PLOT_CACHE_MAX_ENTRIES = int(os.getenv('PLOT_CACHE_MAX_ENTRIES', 128))
+    PLOT_CACHE_MAX_BYTES = int(os.getenv('PLOT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    # Plot rendering pool (see plot_utils.PLOT_POOL): process | thread
+    PLOT_EXECUTOR = os.getenv('PLOT_EXECUTOR', 'process')
+    PLOT_WORKERS = int(os.getenv('PLOT_WORKERS', os.cpu_count() or 1))
+    PLOT_MAX_COLUMNS = int(os.getenv('PLOT_MAX_COLUMNS', 24))
+    # Chart data mode (see plot_utils._chart_data)
+    CHART_MAX_BINS = int(os.getenv('CHART_MAX_BINS', 50))
+    CHART_MAX_OUTLIERS = int(os.getenv('CHART_MAX_OUTLIERS', 100))
+
+    # Stats engine (see stats_utils._compute_overview_and_stats)
+    STATS_BLOCK_CELLS = int(os.getenv('STATS_BLOCK_CELLS', 8_000_000))
+    STATS_APPROX_MIN_ROWS = int(os.getenv('STATS_APPROX_MIN_ROWS', 1_000_000))
+    # Approximate analytics: max rank error of percentiles/plots and its confidence
+    STATS_APPROX_EPSILON = float(os.getenv('STATS_APPROX_EPSILON', 0.005))
+    STATS_APPROX_CONFIDENCE = float(os.getenv('STATS_APPROX_CONFIDENCE', 0.99))
+    STATS_SAMPLE_ROWS = int(os.getenv('STATS_SAMPLE_ROWS', 100_000))
+    # Streamed distinct counts stay exact up to this many values per column (8 bytes each),
+    # about the size of the HyperLogLog sketch they switch to
+    STATS_EXACT_DISTINCT_LIMIT = int(os.getenv('STATS_EXACT_DISTINCT_LIMIT', 2048))
+
+    # Column profile pages of wide datasets (see column_utils.column_page). Results carry the
+    # profiles of the first COLUMN_INLINE_MAX columns; /api/columns pages through the rest
+    COLUMN_INLINE_MAX = int(os.getenv('COLUMN_INLINE_MAX', 200))
+    COLUMN_PAGE_SIZE = int(os.getenv('COLUMN_PAGE_SIZE', 100))
+    COLUMN_PAGE_MAX = int(os.getenv('COLUMN_PAGE_MAX', 1000))
+    COLUMN_PROFILE_BLOCK = int(os.getenv('COLUMN_PROFILE_BLOCK', 250))
+    COLUMN_PROFILE_CACHE_MAX_ENTRIES = int(os.getenv('COLUMN_PROFILE_CACHE_MAX_ENTRIES', 200_000))
+    COLUMN_PROFILE_CACHE_MAX_BYTES = int(os.getenv('COLUMN_PROFILE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Streaming upload ingestion (see ingest_utils._ingest_upload)
+    UPLOAD_CHUNK_ROWS = int(os.getenv('UPLOAD_CHUNK_ROWS', 100_000))
+    UPLOAD_SPILL_BYTES = int(os.getenv('UPLOAD_SPILL_BYTES', 512 * 1024 * 1024))
+    UPLOAD_CATEGORY_MAX_UNIQUE = int(os.getenv('UPLOAD_CATEGORY_MAX_UNIQUE', 1000))
+    DATASET_DIR = os.getenv('DATASET_DIR', os.path.join(tempfile.gettempdir(), 'agentic_ai_datasets'))
+
+    # Dataset exports (see export_utils.EXPORT_CACHE)
+    EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(DATASET_DIR, 'exports'))
+    EXPORT_CACHE_MAX_ENTRIES = int(os.getenv('EXPORT_CACHE_MAX_ENTRIES', 64))
+    EXPORT_CACHE_MAX_BYTES = int(os.getenv('EXPORT_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+    EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', 50_000))
+
+    # Versioned results and deltas of preprocess/analytics responses (see delta_utils.versioned)
+    DELTA_SNAPSHOT_DIR = os.getenv('DELTA_SNAPSHOT_DIR', os.path.join(DATASET_DIR, 'snapshots'))
+    DELTA_SNAPSHOT_MAX_ENTRIES = int(os.getenv('DELTA_SNAPSHOT_MAX_ENTRIES', 2000))
+
+    # Dataset store (see dataset_store.create_dataset_store): memory | disk | tiered
+    DATASET_STORE_BACKEND = os.getenv('DATASET_STORE_BACKEND', 'tiered')
+    DATASET_STORE_USER_BYTES = int(os.getenv('DATASET_STORE_USER_BYTES', 1024 * 1024 * 1024))
+    DATASET_STORE_GLOBAL_BYTES = int(os.getenv('DATASET_STORE_GLOBAL_BYTES', 4 * 1024 * 1024 * 1024))
+
+    # Preprocessing step cache (see preprocess_utils.STEP_CACHE)
+    PIPELINE_CACHE_MAX_ENTRIES = int(os.getenv('PIPELINE_CACHE_MAX_ENTRIES', 64))
+    PIPELINE_CACHE_MAX_BYTES = int(os.getenv('PIPELINE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    # Scale/clip numeric columns in float32 unless a request says otherwise
+    PREPROCESS_FLOAT32 = os.getenv('PREPROCESS_FLOAT32', 'false').lower() in ('1', 'true')
+
+    # One-hot encoding guards (see preprocess_utils.OneHotStep); output dense | sparse | auto
+    ONEHOT_MAX_CATEGORIES = int(os.getenv('ONEHOT_MAX_CATEGORIES', 50))
+    ONEHOT_TOP_K = int(os.getenv('ONEHOT_TOP_K', 20))
+    ONEHOT_TOP_K_MIN_COVERAGE = float(os.getenv('ONEHOT_TOP_K_MIN_COVERAGE', 0.8))
+    ONEHOT_HASH_BUCKETS = int(os.getenv('ONEHOT_HASH_BUCKETS', 32))
+    ONEHOT_OUTPUT = os.getenv('ONEHOT_OUTPUT', 'auto')
+    ONEHOT_MAX_BYTES = int(os.getenv('ONEHOT_MAX_BYTES', 512 * 1024 * 1024))
+
+    # Background jobs (see jobs.JobQueue): process | thread
+    JOB_EXECUTOR = os.getenv('JOB_EXECUTOR', 'process')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', min(4, os.cpu_count() or 1)))
+    JOB_DIR = os.getenv('JOB_DIR', os.path.join(DATASET_DIR, 'jobs'))
+    JOB_TTL_SECONDS = int(os.getenv('JOB_TTL_SECONDS', 3600))
+    JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 0.25))
+
+    # External database connections (see db_pool.DatabasePools)
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 5))
+    DB_POOL_MAX_POOLS = int(os.getenv('DB_POOL_MAX_POOLS', 32))
+    DB_POOL_IDLE_SECONDS = float(os.getenv('DB_POOL_IDLE_SECONDS', 300))
+    DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', 10))
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 10))
+    DB_SCHEMA_CACHE_TTL_SECONDS = float(os.getenv('DB_SCHEMA_CACHE_TTL_SECONDS', 300))
+    # Lets db_type=sqlite open a file on this server (a local stand-in for testing)
+    DB_ALLOW_SQLITE = os.getenv('DB_ALLOW_SQLITE', 'false').lower() in ('1', 'true')
+
+    # Database-to-dataset imports (see db_import.record_batches)
+    DB_IMPORT_BATCH_ROWS = int(os.getenv('DB_IMPORT_BATCH_ROWS', 50_000))
+    DB_IMPORT_MAX_ROWS = int(os.getenv('DB_IMPORT_MAX_ROWS', 10_000_000))
+    DB_IMPORT_ALLOW_QUERIES = os.getenv('DB_IMPORT_ALLOW_QUERIES', 'true').lower() in ('1', 'true')
+
+    # Datasets loaded by the agent tools (see llm.dataset_cache.DATAFRAME_CACHE)
+    LLM_DATASET_CACHE_MAX_BYTES = int(os.getenv('LLM_DATASET_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+    LLM_SIDECAR_DIR = os.getenv('LLM_SIDECAR_DIR', os.path.join(DATASET_DIR, 'sidecars'))
+
+    # Agent replies (see llm.response_cache.RESPONSE_CACHE) and summary/method tool outputs (llm.tools_.TOOL_CACHE)
+    LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('LLM_RESPONSE_CACHE_MAX_ENTRIES', 512))
+    LLM_RESPONSE_CACHE_TTL_SECONDS = float(os.getenv('LLM_RESPONSE_CACHE_TTL_SECONDS', 15 * 60))
+    LLM_TOOL_CACHE_MAX_ENTRIES = int(os.getenv('LLM_TOOL_CACHE_MAX_ENTRIES', 1024))
+
+    # Output budgets of the DataFrame query tools (see llm.query)
+    LLM_QUERY_MAX_ROWS = int(os.getenv('LLM_QUERY_MAX_ROWS', 50))
+    LLM_QUERY_MAX_COLUMNS = int(os.getenv('LLM_QUERY_MAX_COLUMNS', 20))
+    LLM_QUERY_MAX_CHARS = int(os.getenv('LLM_QUERY_MAX_CHARS', 4000))
+
+    # Agent conversations (see llm.memory): checkpointer memory | sqlite, and prompt compaction
+    LLM_CHECKPOINTER = os.getenv('LLM_CHECKPOINTER', 'memory')
+    LLM_CHECKPOINT_PATH = os.getenv('LLM_CHECKPOINT_PATH', os.path.join(DATASET_DIR, 'conversations.sqlite'))
+    LLM_MEMORY_MAX_THREADS = int(os.getenv('LLM_MEMORY_MAX_THREADS', 1000))
+    LLM_MEMORY_KEEP_TURNS = int(os.getenv('LLM_MEMORY_KEEP_TURNS', 2))
+    LLM_MEMORY_MAX_TURNS = int(os.getenv('LLM_MEMORY_MAX_TURNS', 20))
+    LLM_MEMORY_ANSWER_CHARS = int(os.getenv('LLM_MEMORY_ANSWER_CHARS', 600))
+    LLM_MEMORY_TOOL_CHARS = int(os.getenv('LLM_MEMORY_TOOL_CHARS', 2000))
+    LLM_MEMORY_MAX_NOTES = int(os.getenv('LLM_MEMORY_MAX_NOTES', 20))
+
+    # Model evaluation tools (see llm.evaluation)
+    EVAL_CACHE_MAX_ENTRIES = int(os.getenv('EVAL_CACHE_MAX_ENTRIES', 256))
+    EVAL_N_JOBS = int(os.getenv('EVAL_N_JOBS', -1))
+    EVAL_WORKERS = int(os.getenv('EVAL_WORKERS', min(4, os.cpu_count() or 1)))
+    EVAL_QUICK_ROWS = int(os.getenv('EVAL_QUICK_ROWS', 100_000))
+    EVAL_QUICK_ESTIMATORS = int(os.getenv('EVAL_QUICK_ESTIMATORS', 30))
+
+    # Bulk dataset profiling tool (see llm.profiling)
+    PROFILE_SAMPLE_ROWS = int(os.getenv('PROFILE_SAMPLE_ROWS', 50_000))
+    PROFILE_WORKERS = int(os.getenv('PROFILE_WORKERS', min(8, (os.cpu_count() or 1) * 2)))
+    PROFILE_CACHE_MAX_ENTRIES = int(os.getenv('PROFILE_CACHE_MAX_ENTRIES', 256))
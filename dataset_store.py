@@ -0,0 +1,408 @@
+import os
+import glob
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+import pandas as pd
+import pyarrow as pa
+from cache_utils import LRUCache
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class DatasetStore(ABC):
+    """Per-user dataset storage used by app._get_user_df/_set_user_df.
+
+    Each user has named slots: ``current`` is the dataset the dashboard shows,
+    ``source`` keeps the uploaded data that preprocessing pipelines replay from.
+    """
+
+    @abstractmethod
+    def get(self, user_id: int, columns: Optional[List[str]] = None,
+            slot: str = 'current') -> Optional[pd.DataFrame]:
+        """The slot's dataset (only ``columns`` when given), or None when empty."""
+
+    @abstractmethod
+    def set(self, user_id: int, df: pd.DataFrame, slot: str = 'current') -> None:
+        """Replace the slot's dataset."""
+
+    def set_from_file(self, user_id: int, path: str, slot: str = 'current') -> None:
+        """Adopt an Arrow IPC file written elsewhere (e.g. a spilled upload)."""
+        with pa.memory_map(path, 'r') as source:
+            df = _from_arrow(pa.ipc.open_file(source).read_all())
+        os.remove(path)
+        self.set(user_id, df, slot)
+
+    @abstractmethod
+    def delete(self, user_id: int, slot: Optional[str] = None) -> None:
+        """Remove one slot, or every slot of the user when ``slot`` is None."""
+
+    @abstractmethod
+    def version(self, user_id: int, slot: str = 'current') -> Optional[int]:
+        """A number that changes whenever the slot's dataset is replaced (None when empty)."""
+
+    def dtypes(self, user_id: int, slot: str = 'current') -> Optional[pd.Series]:
+        """Column dtypes of the slot's dataset, without reading its data where the backend allows."""
+        df = self.get(user_id, slot=slot)
+        return None if df is None else df.dtypes
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Counters for /api/cache_stats."""
+
+
+# Schema metadata key listing the columns that were SparseDtype in pandas
+SPARSE_METADATA_KEY = b'sparse_columns'
+# Schema metadata key mapping Arrow field names to the non-str pandas column labels they came from
+LABELS_METADATA_KEY = b'column_labels'
+
+
+def _mixed_as_text(df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` with the object columns Arrow cannot type (mixed values such as Excel IDs 1, 2, 'X3') as text."""
+    df = df.copy(deep=False)
+    for pos, (_, series) in enumerate(df.items()):
+        if series.dtype != object:
+            continue
+        try:
+            pa.array(series, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df.isetitem(pos, series.where(series.isna(), series.astype(str)))
+    return df
+
+
+def _dense_table(df: pd.DataFrame) -> pa.Table:
+    sparse = {str(col): series for col, series in df.items() if isinstance(series.dtype, pd.SparseDtype)}
+    if not sparse:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    table = pa.Table.from_pandas(df[[c for c in df.columns if str(c) not in sparse]], preserve_index=False)
+    for col, series in sparse.items():
+        table = table.append_column(col, pa.array(series.sparse.to_dense().to_numpy()))
+    table = table.select([str(c) for c in df.columns])
+    fills = {col: series.sparse.fill_value for col, series in sparse.items()}
+    metadata = {**(table.schema.metadata or {}), SPARSE_METADATA_KEY: json.dumps(fills, default=str).encode()}
+    return table.replace_schema_metadata(metadata)
+
+
+def _arrow_table(df: pd.DataFrame) -> pa.Table:
+    """``df`` as an Arrow table.
+
+    Sparse columns (which Arrow cannot hold) are densified one at a time and
+    object columns of mixed types are stored as text. Arrow field names are
+    strings, so non-str column labels are kept in the schema metadata.
+    """
+    try:
+        table = _dense_table(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        table = _dense_table(_mixed_as_text(df))
+    labels = {str(col): col for col in df.columns if not isinstance(col, str)}
+    if labels:
+        metadata = {**(table.schema.metadata or {}), LABELS_METADATA_KEY: json.dumps(labels, default=str).encode()}
+        table = table.replace_schema_metadata(metadata)
+    return table
+
+
+def _from_arrow(table: pa.Table) -> pd.DataFrame:
+    metadata = table.schema.metadata or {}
+    sparse = json.loads(metadata.get(SPARSE_METADATA_KEY, b'{}'))
+    sparse = {col: fill for col, fill in sparse.items() if col in table.column_names}
+    if not sparse:
+        df = table.to_pandas(split_blocks=True)
+    else:
+        df = table.drop_columns(list(sparse)).to_pandas(split_blocks=True)
+        for col, fill in sparse.items():
+            df[col] = pd.arrays.SparseArray(table.column(col).to_numpy(zero_copy_only=False), fill_value=fill)
+        df = df[table.column_names]
+    labels = json.loads(metadata.get(LABELS_METADATA_KEY, b'{}'))
+    if labels:
+        df.columns = [labels.get(col, col) for col in df.columns]
+    return df
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class MemoryStore(DatasetStore):
+    """In-process LRU store bounded by a per-user and a global byte budget.
+
+    The global budget evicts the least recently used datasets first. A frame
+    that does not fit the per-user budget (all of the user's slots together) or
+    the global one is rejected: ``set`` raises ValueError, while ``try_set``,
+    used by the tiered store's memory tier, only reports it.
+    """
+
+    def __init__(self, per_user_bytes: int, global_bytes: int):
+        self.per_user_bytes = per_user_bytes
+        self.global_bytes = global_bytes
+        self.rejected = 0
+        self._slots: Dict[int, set] = {}
+        self._versions: Dict[Tuple[int, str], int] = {}
+        self._lock = threading.Lock()
+        self._frames = LRUCache(max_entries=1 << 30, max_bytes=global_bytes,
+                                sizeof=_frame_bytes, on_evict=self._forget)
+
+    def _forget(self, key: Tuple[int, str], size: int) -> None:
+        with self._lock:
+            self._slots.get(key[0], set()).discard(key[1])
+            self._versions.pop(key, None)
+
+    def _user_bytes(self, user_id: int, exclude: str) -> int:
+        with self._lock:
+            slots = list(self._slots.get(user_id, ()))
+        return sum(self._frames.size_of((user_id, s)) for s in slots if s != exclude)
+
+    def get(self, user_id: int, columns: Optional[List[str]] = None,
+            slot: str = 'current') -> Optional[pd.DataFrame]:
+        df = self._frames.get((user_id, slot))
+        if df is not None and columns is not None:
+            return df[columns]
+        return df
+
+    def set(self, user_id: int, df: pd.DataFrame, slot: str = 'current') -> None:
+        size = _frame_bytes(df)
+        if not self.try_set(user_id, df, slot, size):
+            raise ValueError(f"The dataset needs {size / 2 ** 20:.0f} MB, over the memory store's budget of "
+                             f"{self.per_user_bytes / 2 ** 20:.0f} MB per user (DATASET_STORE_USER_BYTES, "
+                             f"all datasets of the user together) or {self.global_bytes / 2 ** 20:.0f} MB "
+                             f"in all (DATASET_STORE_GLOBAL_BYTES)")
+
+    def try_set(self, user_id: int, df: pd.DataFrame, slot: str = 'current',
+                size: Optional[int] = None) -> bool:
+        """Keep ``df`` if it fits the budgets; returns whether it was kept."""
+        size = _frame_bytes(df) if size is None else size
+        # The per-user budget covers all of the user's slots together
+        if size + self._user_bytes(user_id, exclude=slot) > self.per_user_bytes:
+            self.delete(user_id, slot)
+            self.rejected += 1
+            return False
+        with self._lock:
+            self._slots.setdefault(user_id, set()).add(slot)
+            self._versions[(user_id, slot)] = time.time_ns()
+        self._frames.set((user_id, slot), df, size=size)
+        return (user_id, slot) in self._frames
+
+    def delete(self, user_id: int, slot: Optional[str] = None) -> None:
+        with self._lock:
+            slots = list(self._slots.get(user_id, ())) if slot is None else [slot]
+        for name in slots:
+            self._frames.pop((user_id, name))
+            self._forget((user_id, name), 0)
+
+    def version(self, user_id: int, slot: str = 'current') -> Optional[int]:
+        if (user_id, slot) not in self._frames:
+            return None
+        with self._lock:
+            return self._versions.get((user_id, slot))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._frames.stats()
+        return {
+            'backend': 'memory',
+            'datasets': stats['entries'],
+            'bytes_resident': stats['bytes'],
+            'per_user_bytes': self.per_user_bytes,
+            'global_bytes': stats['max_bytes'],
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+            'evictions': stats['evictions'],
+            'rejected': self.rejected,
+        }
+
+
+class ArrowDiskStore(DatasetStore):
+    """Datasets as uncompressed Arrow IPC (Feather v2) files in a shared directory.
+
+    Every worker on the host sees the same files. Reads are memory-mapped, so
+    numeric columns are zero-copy views of the page cache. Each write publishes
+    a new versioned file (``user_<id>-<slot>.<version>.arrow``) with an atomic rename,
+    so readers never observe a partial file and a mapped old version is never
+    overwritten in place.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def _pattern(self, user_id: int, slot: str = '*') -> str:
+        return os.path.join(self.directory, f'user_{user_id}-{slot}.*.arrow')
+
+    def new_path(self, user_id: int, slot: str = 'current') -> str:
+        return os.path.join(self.directory, f'user_{user_id}-{slot}.{time.time_ns()}.arrow.tmp')
+
+    def latest(self, user_id: int, slot: str = 'current') -> Optional[Tuple[str, int]]:
+        """Path and version of the newest published file for a user's slot."""
+        versions = []
+        for path in glob.glob(self._pattern(user_id, slot)):
+            try:
+                versions.append((int(path.rsplit('.', 2)[-2]), path))
+            except ValueError:
+                continue
+        if not versions:
+            return None
+        version, path = max(versions)
+        return path, version
+
+    def get(self, user_id: int, columns: Optional[List[str]] = None,
+            slot: str = 'current') -> Optional[pd.DataFrame]:
+        latest = self.latest(user_id, slot)
+        if latest is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            df = self._read(latest[0], columns)
+        except FileNotFoundError:
+            # Replaced by another worker between listing and opening
+            return self.get(user_id, columns, slot)
+        with self._lock:
+            self.hits += 1
+        return df
+
+    def _read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select([str(col) for col in columns])
+        return _from_arrow(table)
+
+    def set(self, user_id: int, df: pd.DataFrame, slot: str = 'current') -> None:
+        self.write(user_id, df, slot)
+
+    def write(self, user_id: int, df: pd.DataFrame, slot: str = 'current') -> int:
+        """Publish ``df`` as the slot's dataset and return its version."""
+        tmp_path = self.new_path(user_id, slot)
+        table = _arrow_table(df)
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return self._publish(user_id, tmp_path, slot)
+
+    def set_from_file(self, user_id: int, path: str, slot: str = 'current') -> None:
+        self._publish(user_id, path, slot)
+
+    def _publish(self, user_id: int, tmp_path: str, slot: str) -> int:
+        version = time.time_ns()
+        final_path = os.path.join(self.directory, f'user_{user_id}-{slot}.{version}.arrow')
+        os.replace(tmp_path, final_path)
+        with self._lock:
+            self.writes += 1
+        self._remove_versions(user_id, slot, keep=final_path)
+        return version
+
+    def _remove_versions(self, user_id: int, slot: str = '*', keep: Optional[str] = None) -> None:
+        for path in glob.glob(self._pattern(user_id, slot)):
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # Still mapped by a reader on platforms that lock open files
+                pass
+
+    def delete(self, user_id: int, slot: Optional[str] = None) -> None:
+        self._remove_versions(user_id, slot or '*')
+
+    def version(self, user_id: int, slot: str = 'current') -> Optional[int]:
+        latest = self.latest(user_id, slot)
+        return None if latest is None else latest[1]
+
+    def dtypes(self, user_id: int, slot: str = 'current') -> Optional[pd.Series]:
+        latest = self.latest(user_id, slot)
+        if latest is None:
+            return None
+        try:
+            with pa.memory_map(latest[0], 'r') as source:
+                schema = pa.ipc.open_file(source).schema
+        except FileNotFoundError:
+            return self.dtypes(user_id, slot)
+        # Only the schema is read; an empty table carries the pandas dtypes
+        return _from_arrow(schema.empty_table()).dtypes
+
+    def stats(self) -> Dict[str, Any]:
+        files = glob.glob(os.path.join(self.directory, 'user_*.arrow'))
+        return {
+            'backend': 'arrow_disk',
+            'directory': self.directory,
+            'files': len(files),
+            'bytes_on_disk': sum(os.path.getsize(f) for f in files if os.path.exists(f)),
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+        }
+
+
+class TieredDatasetStore(DatasetStore):
+    """Memory LRU in front of the shared Arrow disk store.
+
+    Writes go through to disk so every worker (and a restarted worker) can read
+    them. The memory copy remembers the disk version it came from and is
+    refreshed when another worker has published a newer one.
+    """
+
+    def __init__(self, memory: MemoryStore, disk: ArrowDiskStore):
+        self.memory = memory
+        self.disk = disk
+        self._versions: Dict[Tuple[int, str], int] = {}
+
+    def get(self, user_id: int, columns: Optional[List[str]] = None,
+            slot: str = 'current') -> Optional[pd.DataFrame]:
+        latest = self.disk.latest(user_id, slot)
+        if latest is None:
+            self.memory.delete(user_id, slot)
+            return None
+        if self._versions.get((user_id, slot)) == latest[1]:
+            df = self.memory.get(user_id, columns, slot)
+            if df is not None:
+                return df
+        df = self.disk.get(user_id, columns, slot)
+        # Only a whole frame is promoted; column reads leave the memory tier alone
+        if df is not None and columns is None and self.memory.try_set(user_id, df, slot):
+            self._versions[(user_id, slot)] = latest[1]
+        return df
+
+    def set(self, user_id: int, df: pd.DataFrame, slot: str = 'current') -> None:
+        version = self.disk.write(user_id, df, slot)
+        if self.memory.try_set(user_id, df, slot):
+            self._versions[(user_id, slot)] = version
+
+    def set_from_file(self, user_id: int, path: str, slot: str = 'current') -> None:
+        # Large spilled uploads stay on disk until something reads them
+        self.disk.set_from_file(user_id, path, slot)
+        self.memory.delete(user_id, slot)
+        self._versions.pop((user_id, slot), None)
+
+    def delete(self, user_id: int, slot: Optional[str] = None) -> None:
+        self.memory.delete(user_id, slot)
+        self.disk.delete(user_id, slot)
+        for key in [k for k in self._versions if k[0] == user_id and slot in (None, k[1])]:
+            self._versions.pop(key, None)
+
+    def version(self, user_id: int, slot: str = 'current') -> Optional[int]:
+        return self.disk.version(user_id, slot)
+
+    def dtypes(self, user_id: int, slot: str = 'current') -> Optional[pd.Series]:
+        latest = self.disk.latest(user_id, slot)
+        if latest is not None and self._versions.get((user_id, slot)) == latest[1]:
+            df = self.memory.get(user_id, slot=slot)
+            if df is not None:
+                return df.dtypes
+        return self.disk.dtypes(user_id, slot)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': 'tiered', 'memory': self.memory.stats(), 'disk': self.disk.stats()}
+
+
+def create_dataset_store(config: Dict[str, Any]) -> DatasetStore:
+    backend = config['DATASET_STORE_BACKEND']
+    if backend == 'memory':
+        return MemoryStore(config['DATASET_STORE_USER_BYTES'], config['DATASET_STORE_GLOBAL_BYTES'])
+    if backend == 'disk':
+        return ArrowDiskStore(config['DATASET_DIR'])
+    if backend == 'tiered':
+        return TieredDatasetStore(
+            MemoryStore(config['DATASET_STORE_USER_BYTES'], config['DATASET_STORE_GLOBAL_BYTES']),
+            ArrowDiskStore(config['DATASET_DIR']))
+    raise ValueError(f"Unknown DATASET_STORE_BACKEND '{backend}'")
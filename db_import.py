@@ -0,0 +1,176 @@
+import json
+import uuid
+import itertools
+import pyarrow as pa
+from contextlib import contextmanager
+from db_pool import ConnectionPool
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple
+
+
+def _quote(name: str, db_type: str) -> str:
+    """Quote an identifier so table and column names are never parsed as SQL."""
+    quote = '`' if db_type == 'mysql' else '"'
+    return quote + str(name).replace(quote, quote * 2) + quote
+
+
+def _select_sql(db_type: str, source: str, columns: Optional[Sequence[str]], limit: int) -> str:
+    projection = ', '.join(_quote(c, db_type) for c in columns) if columns else '*'
+    return f'SELECT {projection} FROM {source} LIMIT {int(limit)}'
+
+
+def _query_source(query: str) -> str:
+    """``query`` as a subquery; it must be a single statement.
+
+    The drivers send the text as a simple query, so a ``;`` inside it could
+    end the read-only transaction and run further statements.
+    """
+    query = query.strip()
+    query = query[:-1].rstrip() if query.endswith(';') else query
+    if ';' in query:
+        raise ValueError("The query must be a single statement without ';'")
+    return f'({query}) AS import_query'
+
+
+def _arrow_column(values: Sequence[Any]) -> pa.Array:
+    try:
+        array = pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        # Mixed or driver-specific types (UUIDs, ObjectIds, nested documents) become text
+        array = pa.array([None if v is None else json.dumps(v, default=str) if isinstance(v, (dict, list))
+                          else str(v) for v in values], type=pa.string())
+    if pa.types.is_decimal(array.type):
+        array = array.cast(pa.float64())
+    return array
+
+
+def _record_batch(names: List[str], rows: Sequence[Sequence[Any]]) -> pa.RecordBatch:
+    """One fetched batch of rows, transposed column by column into Arrow arrays."""
+    columns = list(zip(*rows)) if rows else [() for _ in names]
+    return pa.RecordBatch.from_arrays([_arrow_column(c) for c in columns], names=names)
+
+
+@contextmanager
+def _read_only(conn: Any, db_type: str) -> Iterator[None]:
+    # A pooled connection may be mid-transaction after its liveness ping
+    conn.rollback()
+    cur = conn.cursor()
+    if db_type == 'postgresql':
+        cur.execute('SET TRANSACTION READ ONLY')
+    elif db_type == 'mysql':
+        cur.execute('START TRANSACTION READ ONLY')
+    else:
+        cur.execute('PRAGMA query_only = ON')
+    try:
+        yield
+    finally:
+        if db_type == 'sqlite':
+            cur.execute('PRAGMA query_only = OFF')
+        cur.close()
+
+
+def _sql_batches(conn: Any, db_type: str, sql: str, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    """Arrow record batches of ``sql`` read through a server-side cursor.
+
+    PostgreSQL uses a named cursor and MySQL an unbuffered SSCursor, so the
+    server streams ``batch_rows`` rows per round trip and at most one batch of
+    driver rows exists at a time.
+    """
+    with _read_only(conn, db_type):
+        if db_type == 'postgresql':
+            cur = conn.cursor(name=f'import_{uuid.uuid4().hex}')
+            cur.itersize = batch_rows
+        elif db_type == 'mysql':
+            import pymysql.cursors
+            cur = conn.cursor(pymysql.cursors.SSCursor)
+        else:
+            cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield _record_batch([d[0] for d in cur.description], rows)
+        finally:
+            cur.close()
+
+
+def _mongo_batches(client: Any, database: str, collection: str, columns: Optional[Sequence[str]],
+                   filter_: Optional[Dict[str, Any]], limit: int, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    """Arrow record batches of a collection, fetched ``batch_rows`` documents per round trip.
+
+    Without ``columns`` the fields of the first batch become the columns.
+    """
+    projection = {c: 1 for c in columns} if columns else None
+    if projection is not None and '_id' not in columns:
+        projection['_id'] = 0
+    cursor = client[database][collection].find(filter_ or {}, projection, batch_size=batch_rows, limit=limit)
+    names: Optional[List[str]] = list(columns) if columns else None
+    try:
+        while True:
+            docs = list(itertools.islice(cursor, batch_rows))
+            if not docs:
+                break
+            if names is None:
+                names = list(dict.fromkeys(k for doc in docs for k in doc))
+            yield _record_batch(names, [[doc.get(name) for name in names] for doc in docs])
+    finally:
+        cursor.close()
+
+
+def _validate_columns(columns: Any) -> Optional[List[str]]:
+    if not columns:
+        return None
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(',') if c.strip()]
+    if not isinstance(columns, list) or not all(isinstance(c, str) and c for c in columns):
+        raise ValueError('columns must be a list of column names')
+    return columns
+
+
+def record_batches(pool: ConnectionPool, tables: List[Tuple[str, str]], table: Optional[str] = None,
+                   schema: Optional[str] = None, query: Optional[str] = None, columns: Any = None,
+                   filter_: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+                   max_rows: int = 1_000_000, batch_rows: int = 50_000,
+                   allow_queries: bool = True) -> Iterator[pa.RecordBatch]:
+    """Stream a table, collection or read-only query from ``pool`` as Arrow record batches.
+
+    ``table`` (and ``schema``) must be one of ``tables``, the database's
+    listing. ``columns`` projects on the server, and at most ``limit`` rows
+    (capped at ``max_rows``) are read. SQL runs in a read-only transaction;
+    ``filter_`` is a MongoDB query document.
+    """
+    columns = _validate_columns(columns)
+    limit = min(int(limit), max_rows) if limit else max_rows
+    if limit <= 0:
+        raise ValueError('limit must be positive')
+    if query and pool.db_type != 'mongodb':
+        if not allow_queries:
+            raise ValueError('Importing query results is disabled (DB_IMPORT_ALLOW_QUERIES)')
+        source = _query_source(query)
+    else:
+        matches = [(s, t) for s, t in tables if t == table and schema in (None, '', s)]
+        if not matches:
+            raise ValueError(f"Unknown table '{table}'")
+        schema, table = matches[0]
+        source = f'{_quote(schema, pool.db_type)}.{_quote(table, pool.db_type)}'
+
+    with pool.connection() as conn:
+        if pool.db_type == 'mongodb':
+            batches = _mongo_batches(conn, schema, table, columns, filter_, limit, batch_rows)
+        else:
+            batches = _sql_batches(conn, pool.db_type, _select_sql(pool.db_type, source, columns, limit),
+                                   batch_rows)
+        rows = 0
+        try:
+            for batch in batches:
+                # Drivers that ignore LIMIT in subqueries still stop at the cap
+                batch = batch.slice(0, limit - rows)
+                rows += batch.num_rows
+                yield batch
+                if rows >= limit:
+                    break
+        finally:
+            # Close the cursor before the connection goes back to the pool
+            batches.close()
+
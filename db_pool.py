@@ -0,0 +1,327 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from cache_utils import LRUCache
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+# Reused connections idle longer than this are pinged before being handed out
+PING_AFTER_SECONDS = 30
+CONNECTION_FIELDS = ('db_type', 'host', 'port', 'database', 'username', 'password')
+
+
+def _connect_postgresql(p: Dict[str, Any], timeout: int) -> Any:
+    import psycopg2
+    return psycopg2.connect(host=p['host'], port=p['port'], dbname=p['database'], user=p['username'],
+                            password=p['password'], connect_timeout=timeout)
+
+
+def _connect_mysql(p: Dict[str, Any], timeout: int) -> Any:
+    import pymysql
+    return pymysql.connect(host=p['host'], port=int(p['port']), user=p['username'], password=p['password'],
+                           db=p['database'], connect_timeout=timeout)
+
+
+def _connect_mongodb(p: Dict[str, Any], timeout: int, max_size: int = 5, idle_seconds: float = 300) -> Any:
+    from pymongo import MongoClient
+    # MongoClient pools its own sockets; one client is kept per connection key
+    return MongoClient(host=p['host'], port=int(p['port']), username=p['username'] or None,
+                       password=p['password'] or None, maxPoolSize=max_size,
+                       maxIdleTimeMS=int(idle_seconds * 1000), serverSelectionTimeoutMS=timeout * 1000)
+
+
+def _connect_sqlite(p: Dict[str, Any], timeout: int) -> Any:
+    return sqlite3.connect(p['database'], timeout=timeout, check_same_thread=False)
+
+
+DRIVERS: Dict[str, Callable[..., Any]] = {
+    'postgresql': _connect_postgresql,
+    'mysql': _connect_mysql,
+    'mongodb': _connect_mongodb,
+    'sqlite': _connect_sqlite,
+}
+
+# Catalog queries by DB-API driver: rows of (schema, table)
+CATALOG_QUERIES = {
+    'postgresql': """SELECT table_schema, table_name
+                     FROM information_schema.tables
+                     WHERE table_schema NOT IN ('information_schema', 'pg_catalog')
+                     ORDER BY table_schema, table_name;""",
+    'mysql': "SELECT DATABASE(), table_name FROM information_schema.tables "
+             "WHERE table_schema = DATABASE() ORDER BY table_name;",
+    'sqlite': "SELECT 'main', name FROM sqlite_master WHERE type IN ('table', 'view') ORDER BY name;",
+}
+
+
+def _connection_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: params.get(field) or '' for field in CONNECTION_FIELDS}
+
+
+def public_params(params: Dict[str, Any]) -> Dict[str, Any]:
+    """The connection parameters without the password, e.g. to keep in the session."""
+    return {field: value for field, value in _connection_params(params).items() if field != 'password'}
+
+
+def _pool_id(params: Dict[str, Any]) -> str:
+    """Stable ID for a set of connection parameters (the password only enters the digest)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for field in CONNECTION_FIELDS:
+        digest.update(str(params.get(field) or '').encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def _alive(conn: Any) -> bool:
+    if getattr(conn, 'closed', 0):
+        return False
+    try:
+        if hasattr(conn, 'ping'):
+            conn.ping(reconnect=False)
+        else:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+        return True
+    except Exception:
+        return False
+
+
+def _close(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """At most ``max_size`` DB-API connections to one database.
+
+    Idle connections are reused (pinged first when idle for a while) and closed
+    after ``idle_seconds``. When all connections are checked out, callers wait
+    up to ``acquire_timeout`` seconds. MongoDB gets a single shared MongoClient,
+    which pools its sockets internally with the same limits.
+    """
+
+    def __init__(self, params: Dict[str, Any], max_size: int, idle_seconds: float, acquire_timeout: float,
+                 connect_timeout: int):
+        self.params = params
+        self.db_type = params['db_type']
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self.acquire_timeout = acquire_timeout
+        self.connect_timeout = connect_timeout
+        self.last_used = time.monotonic()
+        self._idle: List[Tuple[Any, float]] = []
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._client: Any = None
+        # Blocks currently using the Mongo client; the reaper leaves it open while any do
+        self._client_users = 0
+        self.created = 0
+        self.reused = 0
+
+    def _connect(self) -> Any:
+        self.created += 1
+        if self.db_type == 'mongodb':
+            return DRIVERS['mongodb'](self.params, self.connect_timeout, self.max_size, self.idle_seconds)
+        return DRIVERS[self.db_type](self.params, self.connect_timeout)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """A connection for the duration of the block; a failing block's connection is discarded."""
+        self.last_used = time.monotonic()
+        if self.db_type == 'mongodb':
+            with self._lock:
+                if self._client is None:
+                    self._client = self._connect()
+                else:
+                    self.reused += 1
+                self._client_users += 1
+                client = self._client
+            try:
+                yield client
+            finally:
+                with self._lock:
+                    self._client_users -= 1
+                    self.last_used = time.monotonic()
+            return
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise TimeoutError(f"All {self.max_size} connections to "
+                               f"{self.params['host'] or self.params['database']} are busy")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except BaseException:
+            if conn is not None:
+                _close(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._checkin(conn)
+            self._slots.release()
+
+    def _checkout(self) -> Any:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, since = self._idle.pop()
+            if time.monotonic() - since < PING_AFTER_SECONDS or _alive(conn):
+                self.reused += 1
+                return conn
+            _close(conn)
+        return self._connect()
+
+    def _checkin(self, conn: Any) -> None:
+        try:
+            # End the read transaction so the server does not hold it open while idle
+            conn.rollback()
+        except Exception:
+            _close(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    def close_idle(self, now: Optional[float] = None) -> int:
+        """Close connections idle longer than idle_seconds (the Mongo client once unused for that long)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [c for c, since in self._idle if now - since >= self.idle_seconds]
+            self._idle = [(c, since) for c, since in self._idle if now - since < self.idle_seconds]
+            if (self._client is not None and not self._client_users
+                    and now - self.last_used >= self.idle_seconds):
+                expired.append(self._client)
+                self._client = None
+        for conn in expired:
+            _close(conn)
+        return len(expired)
+
+    def close(self) -> None:
+        with self._lock:
+            conns = [c for c, _ in self._idle] + ([self._client] if self._client is not None else [])
+            self._idle, self._client = [], None
+        for conn in conns:
+            _close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'db_type': self.db_type, 'host': self.params.get('host'), 'idle': len(self._idle),
+                    'created': self.created, 'reused': self.reused}
+
+
+class DatabasePools:
+    """Connection pools keyed by connection parameters, and a TTL cache of their table listings.
+
+    Pools are created on first use; at most ``max_pools`` are kept (the least
+    recently used is closed). A daemon reaper closes idle connections.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.max_pools = config['DB_POOL_MAX_POOLS']
+        self.max_size = config['DB_POOL_MAX_SIZE']
+        self.idle_seconds = config['DB_POOL_IDLE_SECONDS']
+        self.acquire_timeout = config['DB_POOL_ACQUIRE_TIMEOUT']
+        self.connect_timeout = config['DB_CONNECT_TIMEOUT']
+        self.allow_sqlite = config['DB_ALLOW_SQLITE']
+        self.schemas = LRUCache(max_entries=256, ttl_seconds=config['DB_SCHEMA_CACHE_TTL_SECONDS'])
+        self._pools: "OrderedDict[str, ConnectionPool]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+
+    def register(self, params: Dict[str, Any]) -> str:
+        """Validate connection parameters and return the ID of their pool."""
+        params = _connection_params(params)
+        if params['db_type'] not in DRIVERS or (params['db_type'] == 'sqlite' and not self.allow_sqlite):
+            raise ValueError(f"Unsupported database type '{params['db_type']}'")
+        pool_id = _pool_id(params)
+        evicted = []
+        with self._lock:
+            if pool_id in self._pools:
+                self._pools.move_to_end(pool_id)
+            else:
+                self._pools[pool_id] = ConnectionPool(params, self.max_size, self.idle_seconds,
+                                                      self.acquire_timeout, self.connect_timeout)
+                while len(self._pools) > self.max_pools:
+                    evicted.append(self._pools.popitem(last=False)[1])
+            self._start_reaper()
+        for pool in evicted:
+            pool.close()
+        return pool_id
+
+    def resolve(self, pool_id: str, params: Dict[str, Any]) -> str:
+        """``pool_id``, re-registered from ``params`` when this process has no such pool.
+
+        Pools only exist in the process that registered them, so another web
+        worker rebuilds the pool from the parameters, which must be the ones
+        ``pool_id`` was derived from (password included).
+        """
+        with self._lock:
+            if pool_id in self._pools:
+                self._pools.move_to_end(pool_id)
+                return pool_id
+        if _pool_id(_connection_params(params)) != pool_id:
+            raise KeyError('Database connection expired; connect again')
+        return self.register(params)
+
+    def pool(self, pool_id: str) -> ConnectionPool:
+        with self._lock:
+            pool = self._pools.get(pool_id)
+        if pool is None:
+            raise KeyError('Database connection expired; connect again')
+        return pool
+
+    def connection(self, pool_id: str) -> Any:
+        return self.pool(pool_id).connection()
+
+    def list_tables(self, pool_id: str, refresh: bool = False) -> Tuple[List[Tuple[str, str]], bool]:
+        """(schema, table) pairs of the database, and whether they came from the cache."""
+        if not refresh:
+            tables = self.schemas.get(pool_id)
+            if tables is not None:
+                return tables, True
+        pool = self.pool(pool_id)
+        with pool.connection() as conn:
+            if pool.db_type == 'mongodb':
+                database = pool.params['database']
+                tables = [(database, c) for c in sorted(conn[database].list_collection_names())]
+            else:
+                cur = conn.cursor()
+                cur.execute(CATALOG_QUERIES[pool.db_type])
+                tables = [(str(schema), str(table)) for schema, table in cur.fetchall()]
+                cur.close()
+        self.schemas.set(pool_id, tables)
+        return tables, False
+
+    def close_idle(self) -> int:
+        with self._lock:
+            pools = list(self._pools.values())
+        return sum(pool.close_idle() for pool in pools)
+
+    def close_all(self) -> None:
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def _start_reaper(self) -> None:
+        # Started lazily (caller holds the lock) so forked workers each get their own
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+
+        def reap() -> None:
+            while True:
+                time.sleep(max(1.0, self.idle_seconds / 2))
+                self.close_idle()
+
+        self._reaper = threading.Thread(target=reap, name='db-pool-reaper', daemon=True)
+        self._reaper.start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pools = list(self._pools.values())
+        return {'pools': [pool.stats() for pool in pools], 'schemas': self.schemas.stats()}
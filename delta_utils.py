@@ -0,0 +1,130 @@
+import os
+import json
+import uuid
+import hashlib
+from config import Config
+from typing import Dict, Any, List, Optional, Tuple
+
+
+def _part_id(*path: Any) -> str:
+    return json.dumps([str(p) for p in path])
+
+
+def _parts(result: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """``result`` as (part ID, value) pairs; the ID is the JSON path of the part.
+
+    ``column_info`` entries and ``statistics`` are split per column, ``plots``
+    per chart and, for chart data, per column of each chart list. Columns are
+    identified by position plus name, so duplicate names (or ``1`` and ``'1'``)
+    get parts of their own.
+    """
+    parts = []
+    for key, value in result.items():
+        if key == 'column_info' and value:
+            parts.extend((_part_id(key, pos, entry['name']), entry) for pos, entry in enumerate(value))
+        elif key == 'statistics' and value:
+            parts.extend((_part_id(key, pos, col), stats) for pos, (col, stats) in enumerate(value.items()))
+        elif key == 'plots' and value:
+            for chart, data in value.items():
+                if isinstance(data, list) and data and all(isinstance(d, dict) and 'column' in d for d in data):
+                    parts.extend((_part_id(key, chart, pos, d['column']), d) for pos, d in enumerate(data))
+                else:
+                    parts.append((_part_id(key, chart), data))
+        else:
+            parts.append((_part_id(key), value))
+    return parts
+
+
+def _digest(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _version(digests: Dict[str, str]) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part_id, part_digest in digests.items():
+        digest.update(f'{part_id}={part_digest}\x00'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class SnapshotStore:
+    """Per-part digests of the results that were sent, by version, as JSON files.
+
+    Files live in a shared directory so any web worker or job process can
+    compute a delta against a version another one produced. At most
+    ``max_entries`` snapshots are kept; the oldest are removed first.
+    """
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def _path(self, version: str) -> str:
+        return os.path.join(self.directory, f'{version}.json')
+
+    def save(self, version: str, digests: Dict[str, str]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(version)
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(digests, f)
+        os.replace(tmp_path, path)
+        self._prune()
+
+    def load(self, version: str) -> Optional[Dict[str, str]]:
+        if not version or not all(c in '0123456789abcdef' for c in version):
+            return None
+        try:
+            with open(self._path(version)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _prune(self) -> None:
+        names = [n for n in os.listdir(self.directory) if n.endswith('.json')]
+        if len(names) <= self.max_entries:
+            return
+        paths = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                paths.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        # Drop a tenth at a time so pruning is not paid on every save
+        for _, path in sorted(paths)[:len(paths) - self.max_entries + self.max_entries // 10]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+SNAPSHOTS = SnapshotStore(Config.DELTA_SNAPSHOT_DIR, Config.DELTA_SNAPSHOT_MAX_ENTRIES)
+
+
+def versioned(result: Dict[str, Any], since: Optional[str] = None, partial: bool = False,
+              snapshots: SnapshotStore = SNAPSHOTS) -> Dict[str, Any]:
+    """``result`` with its ``version``, or only what changed since the version the client holds.
+
+    The version is a digest of every part, used as the response ETag. When
+    ``since`` names a known snapshot, the reply is ``{'delta': True,
+    'order': [...all part IDs...], 'parts': {changed part ID: value}}`` and
+    the client rebuilds the full result from its copy. ``partial`` results
+    (job progress before the plots exist) only cover the sections they
+    contain and are not saved as snapshots.
+    """
+    parts = _parts(result)
+    digests = {part_id: _digest(value) for part_id, value in parts}
+    version = _version(digests)
+    if not partial:
+        snapshots.save(version, digests)
+    previous = snapshots.load(since) if since else None
+    if previous is None:
+        # A partial result's version is never saved, so it is not offered for later deltas
+        return dict(result) if partial else {**result, 'version': version}
+    return {'version': version, 'since': since, 'delta': True, 'partial': partial,
+            'order': [part_id for part_id, _ in parts],
+            'parts': {part_id: value for part_id, value in parts if previous.get(part_id) != digests[part_id]}}
@@ -0,0 +1,147 @@
+import os
+import glob
+import uuid
+import zlib
+import pandas as pd
+import pyarrow as pa
+from config import Config
+from cache_utils import LRUCache, _frame_fingerprint
+from dataset_store import _arrow_table
+from typing import Dict, Any, Hashable, Iterator, Optional, Tuple
+
+# Export formats: (MIME type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+    'feather': ('application/vnd.apache.arrow.file', '.feather'),
+    'arrow': ('application/vnd.apache.arrow.stream', '.arrows'),
+}
+
+
+def _csv_chunks(df: pd.DataFrame, chunk_rows: int, gzip: bool = False) -> Iterator[bytes]:
+    """``df`` as CSV, ``chunk_rows`` rows at a time (gzip-compressed when asked)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    for start in range(0, max(len(df), 1), chunk_rows):
+        text = df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0)
+        data = text.encode('utf-8')
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def _write_binary(df: pd.DataFrame, fmt: str, path: str, chunk_rows: int) -> None:
+    table = _arrow_table(df)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, path, row_group_size=chunk_rows)
+    elif fmt == 'feather':
+        import pyarrow.feather as feather
+        feather.write_feather(table, path, chunksize=chunk_rows)
+    else:
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=chunk_rows)
+
+
+class ExportCache:
+    """Serialized datasets on disk, keyed by frame fingerprint, format and compression.
+
+    Files are named after their key, so every worker on the host shares them;
+    this process's index evicts the least recently used files beyond
+    ``max_bytes``. CSV is streamed to the client while it is written to the
+    cache, and only a completed file is published (with ``os.replace``), so
+    concurrent downloads never see each other's partial output.
+    """
+
+    def __init__(self, directory: str, max_entries: int, max_bytes: int, chunk_rows: int):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self._index = LRUCache(max_entries=max_entries, max_bytes=max_bytes, on_evict=self._remove)
+
+    def _path(self, key: Tuple[str, str, bool]) -> str:
+        fingerprint, fmt, gzip = key
+        return os.path.join(self.directory, f'{fingerprint}{EXPORT_FORMATS[fmt][1]}{".gz" if gzip else ""}')
+
+    def _remove(self, key: Hashable, size: int) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _publish(self, key: Tuple[str, str, bool], tmp_path: str) -> str:
+        path = self._path(key)
+        os.replace(tmp_path, path)
+        self._index.set(key, path, size=os.path.getsize(path))
+        return path
+
+    def lookup(self, key: Tuple[str, str, bool]) -> Optional[str]:
+        cached = self._index.get(key)
+        path = self._path(key)
+        if not os.path.exists(path):
+            if cached is not None:
+                self._index.pop(key)
+            return None
+        if cached is None:
+            # Written by another worker
+            self._index.set(key, path, size=os.path.getsize(path))
+        return path
+
+    def export(self, df: pd.DataFrame, fmt: str = 'csv', gzip: bool = False
+               ) -> Tuple[Optional[str], Optional[Iterator[bytes]]]:
+        """The cached file's path, or (for a CSV miss) a chunk stream that fills the cache.
+
+        Binary formats are written to the cache first (Parquet needs its
+        footer written last) and then served from there.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'. Choose from {sorted(EXPORT_FORMATS)}")
+        key = (_frame_fingerprint(df), fmt, bool(gzip) and fmt == 'csv')
+        path = self.lookup(key)
+        if path is not None:
+            return path, None
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f'{self._path(key)}.{uuid.uuid4().hex}.tmp'
+        if fmt != 'csv':
+            try:
+                _write_binary(df, fmt, tmp_path, self.chunk_rows)
+            except BaseException:
+                self._discard(tmp_path)
+                raise
+            return self._publish(key, tmp_path), None
+        return None, self._tee(key, tmp_path, _csv_chunks(df, self.chunk_rows, key[2]))
+
+    def _tee(self, key: Tuple[str, str, bool], tmp_path: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        completed = False
+        try:
+            with open(tmp_path, 'wb') as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
+            completed = True
+        finally:
+            # A client that disconnects mid-download leaves no partial file behind
+            if completed:
+                self._publish(key, tmp_path)
+            else:
+                self._discard(tmp_path)
+
+    @staticmethod
+    def _discard(tmp_path: str) -> None:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        self._index.clear()
+        for path in glob.glob(os.path.join(self.directory, '*')):
+            self._discard(path)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._index.stats()
+
+
+EXPORT_CACHE = ExportCache(Config.EXPORT_DIR, Config.EXPORT_CACHE_MAX_ENTRIES, Config.EXPORT_CACHE_MAX_BYTES,
+                           Config.EXPORT_CHUNK_ROWS)
@@ -0,0 +1,220 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from config import Config
+from stats_utils import StreamingStats, _compute_overview_and_stats
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple, IO
+
+
+def _downcast_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Shrink numeric columns to the smallest dtype that holds them exactly."""
+    for col, dtype in chunk.dtypes.items():
+        if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+            series = chunk[col]
+            kind = 'unsigned' if len(series) and series.min() >= 0 else 'integer'
+            chunk[col] = pd.to_numeric(series, downcast=kind)
+        elif pd.api.types.is_float_dtype(dtype) and dtype == np.float64:
+            values = chunk[col].to_numpy()
+            narrowed = values.astype(np.float32)
+            # Only keep float32 when the round trip is lossless
+            if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+                chunk[col] = narrowed
+    return chunk
+
+
+class _CategoryTracker:
+    """Tracks per-column distinct strings to decide which columns become categories."""
+
+    def __init__(self, max_unique: int):
+        self.max_unique = max_unique
+        self.values: Dict[Any, Optional[set]] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        for col, dtype in chunk.dtypes.items():
+            if dtype != object:
+                # A column that is numeric in any chunk is not a category column
+                self.values[col] = None
+                continue
+            seen = self.values.setdefault(col, set())
+            if seen is None:
+                continue
+            seen.update(chunk[col].dropna().unique().tolist())
+            if len(seen) > self.max_unique:
+                self.values[col] = None
+
+    def category_columns(self, num_rows: int) -> List[Any]:
+        return [col for col, seen in self.values.items()
+                if seen and all(isinstance(v, str) for v in seen)
+                and len(seen) <= max(1, num_rows // 2)]
+
+
+def _read_chunks(file: IO, filename: str, chunk_rows: int):
+    if filename.endswith('.csv'):
+        yield from pd.read_csv(file, chunksize=chunk_rows)
+    else:
+        # Excel cannot be parsed incrementally; the sheet is processed as one chunk
+        yield pd.read_excel(file)
+
+
+def _upload_size(file: Any) -> Optional[int]:
+    stream = getattr(file, 'stream', file)
+    try:
+        position = stream.tell()
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    """Non-missing values of ``series`` as str (missing values stay missing)."""
+    return series.astype(object).where(series.isna(), series.astype(str))
+
+
+def _to_categories(df: pd.DataFrame, columns: List[Any]) -> pd.DataFrame:
+    for col in columns:
+        categories = sorted(df[col].dropna().unique())
+        df[col] = pd.Categorical(df[col], categories=categories)
+    return df
+
+
+def _write_spill(parts: List[str], heads: List[pd.DataFrame], categories: Dict[Any, List[str]],
+                 text_columns: List[Any], path: str) -> None:
+    # Chunks may have been downcast differently (int8 in one, int16 in the next);
+    # pandas' own concat rules pick the common dtype, and every part is cast to it
+    # while being copied into the final file. ``text_columns`` (numeric in some
+    # chunks, text in others) are cast to string. Category columns are dictionary
+    # encoded against one shared, sorted dictionary.
+    head = pd.concat(heads, ignore_index=True)
+    for col in text_columns:
+        head[col] = _as_text(head[col])
+    for col, values in categories.items():
+        head[col] = pd.Categorical(head[col], categories=values)
+    schema = pa.Schema.from_pandas(head, preserve_index=False)
+    dictionaries = {str(col): pa.array(values, type=pa.string()) for col, values in categories.items()}
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for part in parts:
+            with pa.memory_map(part, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            columns = []
+            for field in schema:
+                column = table.column(field.name)
+                if field.name in dictionaries:
+                    dictionary = dictionaries[field.name]
+                    indices = pc.index_in(column.combine_chunks(), value_set=dictionary)
+                    column = pa.DictionaryArray.from_arrays(indices.cast(field.type.index_type), dictionary)
+                else:
+                    column = column.cast(field.type)
+                columns.append(column)
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+    for part in parts:
+        os.remove(part)
+
+
+def _ingest_chunks(chunks: Iterable[pd.DataFrame], spill_path: str, spill: Optional[bool] = None,
+                   spill_bytes: int = Config.UPLOAD_SPILL_BYTES,
+                   category_max_unique: int = Config.UPLOAD_CATEGORY_MAX_UNIQUE,
+                   progress: Optional[Callable[[int], None]] = None
+                   ) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+    """Downcast ``chunks`` and build the overview statistics.
+
+    With ``spill`` True every chunk is written to ``spill_path`` as Arrow IPC
+    (for DatasetStore.set_from_file); with None the chunks stay resident until
+    they exceed ``spill_bytes`` and are spilled from then on. ``progress`` is
+    called with the number of rows read after every chunk.
+
+    Resident frames get exact statistics. Spilled chunks are folded into
+    StreamingStats one at a time, and the payload's ``approximation`` block
+    says which of its numbers are estimates.
+
+    Returns:
+        The DataFrame (None when spilled to ``spill_path``) and the
+        overview/statistics payload.
+    """
+    stats = StreamingStats()
+    tracker = _CategoryTracker(category_max_unique)
+    chunks_kept: List[pd.DataFrame] = []
+    parts: List[str] = []
+    heads: List[pd.DataFrame] = []
+    resident = 0
+    rows = 0
+    # Columns read as text in some chunks and as numbers in others
+    text_seen, other_seen = set(), set()
+
+    def write_part(chunk: pd.DataFrame) -> None:
+        part = f'{spill_path}.part{len(parts):05d}'
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        with pa.OSFile(part, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        parts.append(part)
+        # Copy so the one-row head does not keep the whole chunk alive
+        heads.append(chunk.head(1).copy())
+
+    for chunk in chunks:
+        chunk = _downcast_chunk(chunk)
+        rows += len(chunk)
+        tracker.update(chunk)
+        for col, dtype in chunk.dtypes.items():
+            (text_seen if dtype == object else other_seen).add(col)
+        if spill is None:
+            resident += int(chunk.memory_usage(index=False, deep=True).sum())
+            if resident > spill_bytes:
+                spill = True
+                for kept in chunks_kept:
+                    stats.update(kept)
+                    write_part(kept)
+                chunks_kept = []
+        if spill:
+            if not parts:
+                os.makedirs(os.path.dirname(spill_path) or '.', exist_ok=True)
+            stats.update(chunk)
+            write_part(chunk)
+        else:
+            chunks_kept.append(chunk)
+        if progress is not None:
+            progress(rows)
+
+    category_cols = tracker.category_columns(rows)
+    text_cols = list(text_seen & other_seen)
+    if parts:
+        categories = {col: sorted(tracker.values[col]) for col in category_cols}
+        _write_spill(parts, heads, categories, text_cols, spill_path)
+        dtypes = pd.concat(heads, ignore_index=True).dtypes.astype(object)
+        for col in text_cols:
+            dtypes[col] = np.dtype(object)
+        for col in category_cols:
+            dtypes[col] = pd.CategoricalDtype()
+        computed = stats.result(dtypes)
+        approximation = stats.approximation()
+        if approximation is not None:
+            computed['approximation'] = approximation
+        return None, computed
+
+    df = (pd.concat(chunks_kept, ignore_index=True) if len(chunks_kept) > 1
+          else (chunks_kept[0] if chunks_kept else pd.DataFrame()))
+    for col in text_cols:
+        df[col] = _as_text(df[col])
+    df = _to_categories(df, category_cols)
+    return df, _compute_overview_and_stats(df)
+
+
+def _ingest_upload(file: IO, filename: str, spill_path: str,
+                   chunk_rows: int = Config.UPLOAD_CHUNK_ROWS,
+                   spill_bytes: int = Config.UPLOAD_SPILL_BYTES,
+                   category_max_unique: int = Config.UPLOAD_CATEGORY_MAX_UNIQUE,
+                   progress: Optional[Callable[[int], None]] = None
+                   ) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+    """Parse an uploaded CSV/Excel file chunk by chunk.
+
+    Uploads larger than ``spill_bytes`` are written to ``spill_path`` as an
+    Arrow IPC file (see _ingest_chunks) instead of being kept as a resident
+    DataFrame.
+    """
+    size = _upload_size(file)
+    spill = size is not None and size > spill_bytes
+    return _ingest_chunks(_read_chunks(file, filename, chunk_rows), spill_path, spill,
+                          spill_bytes=spill_bytes, category_max_unique=category_max_unique, progress=progress)
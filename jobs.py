@@ -0,0 +1,306 @@
+import os
+import re
+import json
+import time
+import uuid
+import threading
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from config import Config
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Iterable, List, Optional, IO
+from ingest_utils import _ingest_chunks, _ingest_upload, _upload_size
+from plot_utils import _generate_plots, _chart_data, PLOT_POOL
+from stats_utils import _compute_overview_and_stats, _inline_columns, _approx_sample, _approximation_info
+from preprocess_utils import PreprocessingPipeline
+from delta_utils import versioned
+from dataset_store import DatasetStore, create_dataset_store
+
+Report = Callable[..., None]
+
+
+def _no_report(**fields: Any) -> None:
+    pass
+
+
+# Tasks. The synchronous routes call these directly; jobs run them on the pool
+# and publish each partial result through ``report`` as soon as it exists, so
+# the overview and statistics reach the dashboard before the plots.
+
+def _source_df(store: DatasetStore, user_id: int) -> Optional[pd.DataFrame]:
+    """The uploaded dataset that preprocessing pipelines are replayed from."""
+    source = store.get(user_id, slot='source')
+    if source is None:
+        # Nothing preprocessed since the upload: the current dataset is the source
+        source = store.get(user_id)
+        if source is not None:
+            store.set(user_id, source, slot='source')
+    return source
+
+
+def _plots(df: pd.DataFrame, plot_mode: str = 'image', sample: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    # 'data' sends chart data for the dashboard to draw instead of rendered PNGs
+    if plot_mode == 'data':
+        return _chart_data(df, sample=sample)
+    return _generate_plots(df, sample=sample)
+
+
+def _spill_path(config: Dict[str, Any], user_id: int) -> str:
+    return os.path.join(config['DATASET_DIR'], f'upload_{user_id}_{uuid.uuid4().hex}.arrow.tmp')
+
+
+def _upload_task(store: DatasetStore, user_id: int, file: IO, filename: str,
+                 config: Dict[str, Any], report: Report = _no_report,
+                 plot_mode: str = 'image') -> Dict[str, Any]:
+    size = _upload_size(file)
+
+    def progress(rows: int) -> None:
+        position = getattr(file, 'tell', lambda: None)()
+        fraction = position / size if size and position is not None else 0.0
+        report(stage='reading', progress=round(0.5 * min(fraction, 1.0), 3), rows_read=rows)
+
+    # Parsed in chunks; stats are built during the read and big files go to disk
+    spill_path = _spill_path(config, user_id)
+    df, computed = _ingest_upload(
+        file, filename, spill_path,
+        chunk_rows=config['UPLOAD_CHUNK_ROWS'],
+        spill_bytes=config['UPLOAD_SPILL_BYTES'],
+        category_max_unique=config['UPLOAD_CATEGORY_MAX_UNIQUE'],
+        progress=progress)
+    return _store_ingested(store, user_id, df, computed, spill_path, report, plot_mode)
+
+
+def _store_ingested(store: DatasetStore, user_id: int, df: Optional[pd.DataFrame], computed: Dict[str, Any],
+                    spill_path: str, report: Report = _no_report, plot_mode: str = 'image') -> Dict[str, Any]:
+    if df is None:
+        store.set_from_file(user_id, spill_path)
+        # Plots only need the numeric columns
+        df = store.get(user_id, columns=list(computed['statistics']))
+    else:
+        store.set(user_id, df)
+    # A new upload starts a new source dataset
+    store.delete(user_id, slot='source')
+    computed = _inline_columns(computed, Config.COLUMN_INLINE_MAX)
+    report(stage='plots', progress=0.6, result=computed)
+    return {**computed, 'plots': _plots(df, plot_mode)}
+
+
+def _import_task(store: DatasetStore, user_id: int, batches: Iterable[pa.RecordBatch],
+                 config: Dict[str, Any], report: Report = _no_report,
+                 plot_mode: str = 'image') -> Dict[str, Any]:
+    """Make a stream of Arrow record batches (see db_import.record_batches) the user's dataset.
+
+    Each batch goes through the same downcasting, statistics and spill path as
+    an upload chunk; once the resident batches exceed UPLOAD_SPILL_BYTES the
+    import continues straight into an Arrow IPC file.
+    """
+    def progress(rows: int) -> None:
+        report(stage='reading', rows_read=rows)
+
+    spill_path = _spill_path(config, user_id)
+    df, computed = _ingest_chunks(
+        (batch.to_pandas() for batch in batches), spill_path,
+        spill_bytes=config['UPLOAD_SPILL_BYTES'],
+        category_max_unique=config['UPLOAD_CATEGORY_MAX_UNIQUE'],
+        progress=progress)
+    return _store_ingested(store, user_id, df, computed, spill_path, report, plot_mode)
+
+
+def _upload_file_task(store: DatasetStore, user_id: int, path: str, filename: str,
+                      config: Dict[str, Any], report: Report = _no_report,
+                      plot_mode: str = 'image') -> Dict[str, Any]:
+    # Jobs get the upload as a file saved by the request
+    try:
+        with open(path, 'rb') as file:
+            return _upload_task(store, user_id, file, filename, config, report, plot_mode)
+    finally:
+        os.remove(path)
+
+
+def _preprocess_task(store: DatasetStore, user_id: int, steps: List[str], float32: bool,
+                     report: Report = _no_report, plot_mode: str = 'image') -> Dict[str, Any]:
+    source = _source_df(store, user_id)
+    if source is None:
+        raise ValueError('No dataset uploaded yet')
+    report(stage='preprocessing', progress=0.1)
+    # The selected steps are applied to the uploaded data; steps shared with
+    # the previous request come from the step cache
+    new_df = PreprocessingPipeline(steps, float32=float32).fit_transform(source)
+    store.set(user_id, new_df)
+    report(stage='statistics', progress=0.4)
+    computed = _compute_overview_and_stats(new_df, max_columns=Config.COLUMN_INLINE_MAX)
+    report(stage='plots', progress=0.6, result=computed)
+    return {**computed, 'plots': _plots(new_df, plot_mode)}
+
+
+def _analytics_task(store: DatasetStore, user_id: int, approximate: bool = False,
+                    report: Report = _no_report, plot_mode: str = 'image',
+                    epsilon: float = Config.STATS_APPROX_EPSILON) -> Dict[str, Any]:
+    df = store.get(user_id)
+    if df is None:
+        raise ValueError('No dataset uploaded yet')
+    computed = _compute_overview_and_stats(df, approximate=approximate, max_columns=Config.COLUMN_INLINE_MAX)
+    # Large frames are plotted from a row sample sized for the requested rank error
+    sample = _approx_sample(len(df), epsilon) if approximate else None
+    if sample is not None:
+        computed['approximation'] = _approximation_info(len(df), sample, epsilon, Config.STATS_APPROX_CONFIDENCE)
+    report(stage='plots', progress=0.5, result=computed)
+    return {**computed, 'plots': _plots(df, plot_mode, sample)}
+
+
+TASKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    'upload': _upload_file_task,
+    'preprocess': _preprocess_task,
+    'analytics': _analytics_task,
+}
+
+
+class JobStore:
+    """Job records as JSON files in a shared directory.
+
+    Any web worker on the host can answer a status poll, and pool processes
+    publish progress by rewriting the record (atomically, via ``os.replace``).
+    """
+
+    ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+    def __init__(self, directory: str, ttl_seconds: int):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def _write(self, job: Dict[str, Any]) -> None:
+        tmp_path = f"{self._path(job['id'])}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._path(job['id']))
+
+    def create(self, kind: str, user_id: int) -> Dict[str, Any]:
+        now = time.time()
+        job = {'id': uuid.uuid4().hex, 'kind': kind, 'user_id': user_id, 'status': 'queued',
+               'stage': 'queued', 'progress': 0.0, 'result': {}, 'error': None,
+               'created': now, 'updated': now}
+        self._write(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not self.ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def update(self, job_id: str, result: Optional[Dict[str, Any]] = None, **fields: Any) -> None:
+        job = self.get(job_id)
+        if job is None:
+            return
+        if result:
+            # Partial results accumulate: overview first, plots later
+            job['result'].update(result)
+        job.update(fields)
+        job['updated'] = time.time()
+        self._write(job)
+
+    def cleanup(self) -> int:
+        """Remove records not updated within the TTL."""
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+# Per-process state of the pool workers, set by _init_worker
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    _WORKER['config'] = config
+    _WORKER['store'] = create_dataset_store(config)
+    _WORKER['jobs'] = JobStore(config['JOB_DIR'], config['JOB_TTL_SECONDS'])
+    # Job workers share the cores for plot rendering instead of each taking all of them.
+    # They render on threads: multiprocessing's exit handler joins a nested process
+    # pool's workers before concurrent.futures stops them, so the job worker never exits.
+    PLOT_POOL.resize(max(1, config['PLOT_WORKERS'] // config['JOB_WORKERS']), executor='thread')
+
+
+def _run_job(job_id: str, kind: str, user_id: int, kwargs: Dict[str, Any]) -> None:
+    jobs: JobStore = _WORKER['jobs']
+    jobs.update(job_id, status='running', stage='started')
+    # Results are versioned, and only the parts changed since the client's version are sent
+    since = kwargs.pop('since', None)
+
+    def report(result: Optional[Dict[str, Any]] = None, **fields: Any) -> None:
+        jobs.update(job_id, result=versioned(result, since, partial=True) if result else result, **fields)
+
+    try:
+        result = TASKS[kind](_WORKER['store'], user_id, report=report, **kwargs)
+        jobs.update(job_id, result=versioned(result, since), status='done', stage='done', progress=1.0)
+    except Exception as e:
+        jobs.update(job_id, status='error', error=str(e))
+
+
+class JobQueue:
+    """Runs upload/preprocess/analytics tasks off the request thread.
+
+    Jobs go to a process pool (spawn context) whose workers open their own
+    dataset store on the shared Arrow directory. With the memory-only dataset
+    store nothing is shared across processes, so a thread pool is used instead.
+    The pool is started on the first submit.
+    """
+
+    def __init__(self, config: Dict[str, Any], dataset_store: DatasetStore):
+        # Only plain settings are passed to the worker processes
+        self.config = {k: v for k, v in config.items()
+                       if isinstance(v, (str, int, float, bool, type(None)))}
+        self.dataset_store = dataset_store
+        self.jobs = JobStore(config['JOB_DIR'], config['JOB_TTL_SECONDS'])
+        self.use_processes = (config['JOB_EXECUTOR'] == 'process'
+                              and config['DATASET_STORE_BACKEND'] != 'memory')
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                workers = self.config['JOB_WORKERS']
+                if self.use_processes:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker, initargs=(self.config,))
+                else:
+                    _WORKER.update(config=self.config, store=self.dataset_store, jobs=self.jobs)
+                    self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+            return self._executor
+
+    def submit(self, kind: str, user_id: int, **kwargs: Any) -> Dict[str, Any]:
+        self.jobs.cleanup()
+        job = self.jobs.create(kind, user_id)
+        future = self._get_executor().submit(_run_job, job['id'], kind, user_id, kwargs)
+        future.add_done_callback(lambda f: self._on_done(job['id'], f))
+        return job
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        # _run_job records its own errors; this catches a crashed worker process
+        error = future.exception()
+        if error is not None:
+            self.jobs.update(job_id, status='error', error=str(error) or type(error).__name__)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
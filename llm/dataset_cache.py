@@ -0,0 +1,187 @@
+import os
+import glob
+import hashlib
+import threading
+import contextvars
+import pandas as pd
+import pyarrow.feather as feather
+from config import Config
+from contextlib import contextmanager
+from cache_utils import LRUCache
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+
+# Formats read directly; anything else goes through pd.read_csv
+READERS = {
+    '.parquet': pd.read_parquet,
+    '.feather': pd.read_feather,
+    '.arrow': pd.read_feather,
+}
+
+
+def _file_key(path: str) -> Tuple[str, int, int]:
+    """(resolved path, mtime, size): changes whenever the file's contents may have."""
+    resolved = os.path.realpath(path)
+    stat = os.stat(resolved)  # FileNotFoundError for a missing file, as pd.read_csv raises
+    return resolved, stat.st_mtime_ns, stat.st_size
+
+
+## Read tracking
+# Files and directory listings the current agent run has read, as
+# (kind, path, version) tuples; the response cache stores them with the reply.
+_READS: contextvars.ContextVar[Optional[Set[Tuple[str, str, Any]]]] = contextvars.ContextVar('dataset_reads', default=None)
+
+
+def _record(kind: str, path: str, version: Any) -> None:
+    reads = _READS.get()
+    if reads is not None:
+        reads.add((kind, path, version))
+
+
+@contextmanager
+def track_reads() -> Iterator[Set[Tuple[str, str, Any]]]:
+    """Collect the dependencies read inside the block.
+
+    The set lives in a context variable, which new threads do not inherit:
+    work fanned out to a pool must run in ``contextvars.copy_context()`` (see
+    profiling.profile_directory) for its reads to be recorded.
+    """
+    reads: Set[Tuple[str, str, Any]] = set()
+    token = _READS.set(reads)
+    try:
+        yield reads
+    finally:
+        try:
+            _READS.reset(token)
+        except ValueError:
+            # A generator closed from another context
+            _READS.set(None)
+
+
+def _csv_listing(directory: str) -> Tuple[str, ...]:
+    return tuple(sorted(os.path.basename(p) for p in glob.glob(os.path.join(directory, '*.csv'))))
+
+
+def list_csv_paths(directory: Optional[str] = None) -> List[str]:
+    """Sorted CSV paths in ``directory`` (default: the working directory), recorded as a read."""
+    directory = os.path.realpath(directory or os.getcwd())
+    listing = _csv_listing(directory)
+    _record('dir', directory, listing)
+    return [os.path.join(directory, name) for name in listing]
+
+
+def _is_current(dependency: Tuple[str, str, Any]) -> bool:
+    """Whether a recorded read would still see the same version."""
+    kind, path, version = dependency
+    try:
+        if kind == 'file':
+            return _file_key(path)[1:] == version
+        return _csv_listing(path) == version
+    except OSError:
+        return False
+
+
+class DatasetCache:
+    """DataFrames loaded by the agent tools, shared by every tool and thread.
+
+    Entries are keyed by the resolved path plus the file's mtime and size, so an
+    edited file is reloaded instead of served stale. Memory is bounded by an LRU
+    byte budget. The first read of a CSV also writes a Feather sidecar (keyed the
+    same way) that later cold loads, e.g. after eviction or a restart, read instead.
+    """
+
+    def __init__(self, max_bytes: int, sidecar_dir: str):
+        self.sidecar_dir = sidecar_dir
+        self.sidecar_reads = 0
+        self.sidecar_writes = 0
+        self._frames = LRUCache(max_entries=1 << 30, max_bytes=max_bytes)
+        self._versions: Dict[str, Tuple[str, int, int]] = {}
+        self._loading: Dict[Tuple[str, int, int], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _sidecar_path(self, key: Tuple[str, int, int], version: str = '') -> str:
+        digest = hashlib.blake2b(key[0].encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.sidecar_dir, f"{digest}.{version or f'{key[1]}-{key[2]}'}.feather")
+
+    def key(self, path: str) -> Tuple[str, int, int]:
+        """The current version key of ``path``, recorded as a read of this run."""
+        key = _file_key(path)
+        _record('file', key[0], key[1:])
+        return key
+
+    def cached(self, path: str) -> bool:
+        """Whether the current version of ``path`` is in memory."""
+        try:
+            return self.key(path) in self._frames
+        except OSError:
+            return False
+
+    def get(self, path: str) -> pd.DataFrame:
+        key = self.key(path)
+        df = self._frames.get(key)
+        if df is not None:
+            return df
+        # One load per file version; concurrent callers wait for it instead of re-reading
+        with self._lock:
+            lock = self._loading.setdefault(key, threading.Lock())
+        with lock:
+            df = self._frames.get(key)
+            if df is None:
+                df = self._load(key)
+                self._frames.set(key, df)
+                with self._lock:
+                    previous = self._versions.get(key[0])
+                    self._versions[key[0]] = key
+                if previous is not None and previous != key:
+                    # The file changed; drop the stale version
+                    self._frames.pop(previous)
+        with self._lock:
+            self._loading.pop(key, None)
+        return df
+
+    def _load(self, key: Tuple[str, int, int]) -> pd.DataFrame:
+        resolved = key[0]
+        reader = READERS.get(os.path.splitext(resolved)[1].lower())
+        if reader is not None:
+            return reader(resolved)
+        sidecar = self._sidecar_path(key)
+        if os.path.exists(sidecar):
+            try:
+                df = pd.read_feather(sidecar)
+                with self._lock:
+                    self.sidecar_reads += 1
+                return df
+            except Exception:
+                # Truncated or unreadable sidecar: fall back to the CSV and rewrite it
+                pass
+        df = pd.read_csv(resolved)
+        self._write_sidecar(key, df)
+        return df
+
+    def _write_sidecar(self, key: Tuple[str, int, int], df: pd.DataFrame) -> None:
+        sidecar = self._sidecar_path(key)
+        tmp_path = f'{sidecar}.{threading.get_ident()}.tmp'
+        try:
+            os.makedirs(self.sidecar_dir, exist_ok=True)
+            feather.write_feather(df, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, sidecar)
+            with self._lock:
+                self.sidecar_writes += 1
+        except Exception:
+            # Frames Feather cannot hold (e.g. mixed-type object columns) just skip the sidecar
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        # Sidecars of older versions of the same file are no longer reachable
+        for old in glob.glob(self._sidecar_path(key, version='*')):
+            if old != sidecar:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._frames.stats(), 'sidecar_reads': self.sidecar_reads,
+                'sidecar_writes': self.sidecar_writes}
+
+
+DATAFRAME_CACHE = DatasetCache(Config.LLM_DATASET_CACHE_MAX_BYTES, Config.LLM_SIDECAR_DIR)
@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import time
+import pickle
+import multiprocessing
+import numpy as np
+import pandas as pd
+from config import Config
+from concurrent.futures import ProcessPoolExecutor
+from cache_utils import LRUCache, _frame_fingerprint
+from llm.dataset_cache import DATAFRAME_CACHE
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, r2_score, mean_squared_error
+from sklearn.ensemble import (RandomForestClassifier, RandomForestRegressor, ExtraTreesClassifier,
+                              ExtraTreesRegressor, HistGradientBoostingClassifier,
+                              HistGradientBoostingRegressor)
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Estimators by model name and task
+MODELS = {
+    'random_forest': {'classification': RandomForestClassifier, 'regression': RandomForestRegressor},
+    'extra_trees': {'classification': ExtraTreesClassifier, 'regression': ExtraTreesRegressor},
+    'hist_gradient_boosting': {'classification': HistGradientBoostingClassifier,
+                               'regression': HistGradientBoostingRegressor},
+}
+
+# Memoized scores keyed by (dataset fingerprint, task, target, model config, quick)
+EVAL_CACHE = LRUCache(max_entries=Config.EVAL_CACHE_MAX_ENTRIES)
+
+
+def _model_config(model: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalize a model spec like {'name': 'random_forest', 'n_estimators': 200}."""
+    config = {'name': 'random_forest', **(model or {})}
+    if config['name'] not in MODELS:
+        raise ValueError(f"Unknown model '{config['name']}'. Choose from {sorted(MODELS)}")
+    return config
+
+
+def _build_estimator(task: str, config: Dict[str, Any], n_jobs: int, quick: bool) -> Any:
+    params = {k: v for k, v in config.items() if k != 'name'}
+    estimator_cls = MODELS[config['name']][task]
+    if config['name'] == 'hist_gradient_boosting':
+        # Boosting stops once the held-out loss stops improving
+        params.setdefault('early_stopping', True if quick else 'auto')
+    else:
+        params.setdefault('n_jobs', n_jobs)
+        if quick:
+            params.setdefault('n_estimators', Config.EVAL_QUICK_ESTIMATORS)
+    params.setdefault('random_state', 42)
+    return estimator_cls(**params)
+
+
+def _features(df: pd.DataFrame, target: str, task: str) -> Tuple[pd.DataFrame, pd.Series]:
+    """Feature matrix the tree models accept: numeric as-is (NaN is supported), others as codes."""
+    df = df[df[target].notna()]
+    X = df.drop(columns=[target])
+    encoded = {}
+    for col, dtype in X.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype) or not pd.api.types.is_numeric_dtype(dtype):
+            codes = pd.Categorical(X[col]).codes.astype(np.float32)
+            codes[codes < 0] = np.nan
+            encoded[col] = codes
+        elif not isinstance(dtype, np.dtype):
+            # Nullable extension dtypes (Int64, Float64)
+            encoded[col] = X[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    if encoded:
+        X = X.assign(**encoded)
+    y = df[target]
+    if task == 'classification' and not (pd.api.types.is_integer_dtype(y.dtype) or pd.api.types.is_float_dtype(y.dtype)):
+        y = y.astype(str)
+    return X, y
+
+
+def _quick_rows(X: pd.DataFrame, y: pd.Series, task: str, max_rows: int) -> Tuple[pd.DataFrame, pd.Series]:
+    """Subsample (stratified for classification) for a quick estimate on a large frame."""
+    if len(X) <= max_rows:
+        return X, y
+    stratify = y if task == 'classification' and y.value_counts().min() >= 2 else None
+    X, _, y, _ = train_test_split(X, y, train_size=max_rows, stratify=stratify, random_state=42)
+    return X, y
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return int(peak if sys.platform == 'darwin' else peak * 1024)
+
+
+def _evaluate(df: pd.DataFrame, target: str, task: str, model: Dict[str, Any],
+              quick: bool, n_jobs: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    X, y = _features(df, target, task)
+    full_rows = len(X)
+    if quick:
+        X, y = _quick_rows(X, y, task, Config.EVAL_QUICK_ROWS)
+    stratify = y if task == 'classification' and y.value_counts().min() >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=stratify)
+    estimator = _build_estimator(task, model, n_jobs, quick)
+    fit_started = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_started
+    predict_started = time.perf_counter()
+    y_pred = estimator.predict(X_test)
+    predict_seconds = time.perf_counter() - predict_started
+
+    if task == 'classification':
+        scores = {'accuracy': float(accuracy_score(y_test, y_pred))}
+    else:
+        scores = {'r2_score': float(r2_score(y_test, y_pred)),
+                  'mean_squared_error': float(mean_squared_error(y_test, y_pred))}
+    return {
+        **scores,
+        'metrics': {
+            'fit_seconds': round(fit_seconds, 4),
+            'predict_seconds': round(predict_seconds, 4),
+            'total_seconds': round(time.perf_counter() - started, 4),
+            'feature_bytes': int(X.memory_usage(index=False, deep=True).sum()),
+            'model_bytes': len(pickle.dumps(estimator, protocol=pickle.HIGHEST_PROTOCOL)),
+            # High-water mark of the evaluating process (tracemalloc would double the fit time)
+            'peak_rss_bytes': _peak_rss_bytes(),
+            'train_rows': int(len(X_train)),
+            'test_rows': int(len(X_test)),
+            'total_rows': int(full_rows),
+            'features': int(X.shape[1]),
+            'n_jobs': n_jobs,
+            'quick': quick,
+        },
+    }
+
+
+def evaluate(file_name: str, target: str, task: str, model: Optional[Dict[str, Any]] = None,
+             quick: bool = False, n_jobs: int = Config.EVAL_N_JOBS,
+             cache: Optional[LRUCache] = EVAL_CACHE) -> Dict[str, Any]:
+    """Train/test-split score for one target and model on a cached dataset.
+
+    Results are memoized by the dataset's content fingerprint, so asking again
+    (or about an identical copy of the file) returns without retraining.
+    ``quick`` subsamples large frames to EVAL_QUICK_ROWS and uses fewer trees
+    or early stopping.
+    """
+    df = DATAFRAME_CACHE.get(file_name)
+    if target not in df.columns:
+        return {"error": f"Target column '{target}' not found in '{file_name}'."}
+    config = _model_config(model)
+    key = (_frame_fingerprint(df), task, target, json.dumps(config, sort_keys=True), quick)
+    result = cache.get(key) if cache is not None else None
+    if result is not None:
+        return {**result, 'cached': True}
+    result = _evaluate(df, target, task, config, quick, n_jobs)
+    if cache is not None:
+        cache.set(key, result)
+    return {**result, 'cached': False}
+
+
+def _evaluate_candidate(args: Tuple[str, str, str, Optional[Dict[str, Any]], bool, int]) -> Dict[str, Any]:
+    file_name, target, task, model, quick, n_jobs = args
+    try:
+        return evaluate(file_name, target, task, model, quick, n_jobs)
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def evaluate_many(file_name: str, task: str, targets: List[str],
+                  models: Optional[List[Dict[str, Any]]] = None, quick: bool = False,
+                  workers: int = Config.EVAL_WORKERS) -> List[Dict[str, Any]]:
+    """Evaluate every (target, model) pair, in parallel on a process pool.
+
+    The cores are split between the workers (each model gets n_jobs =
+    cores // workers). Memoized pairs are answered here without a worker, and
+    new results are added to this process's cache.
+    """
+    configs = [_model_config(m) for m in (models or [None])]
+    candidates = [(target, config) for target in targets for config in configs]
+    results: List[Optional[Dict[str, Any]]] = [None] * len(candidates)
+
+    df = DATAFRAME_CACHE.get(file_name)
+    fingerprint = _frame_fingerprint(df)
+    keys = [(fingerprint, task, t, json.dumps(c, sort_keys=True), quick) for t, c in candidates]
+    pending = []
+    for i, key in enumerate(keys):
+        cached = EVAL_CACHE.get(key)
+        if cached is not None:
+            results[i] = {**cached, 'cached': True}
+        elif candidates[i][0] not in df.columns:
+            results[i] = {"error": f"Target column '{candidates[i][0]}' not found in '{file_name}'."}
+        else:
+            pending.append(i)
+
+    workers = max(1, min(workers, len(pending)))
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+    args = [(file_name, candidates[i][0], task, candidates[i][1], quick, n_jobs) for i in pending]
+    if workers == 1:
+        outputs = [_evaluate_candidate(a) for a in args]
+    else:
+        # Workers load the file through their own DATAFRAME_CACHE (from the Feather sidecar)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            outputs = list(pool.map(_evaluate_candidate, args))
+    for i, output in zip(pending, outputs):
+        if 'error' not in output:
+            EVAL_CACHE.set(keys[i], {k: v for k, v in output.items() if k != 'cached'})
+        results[i] = output
+
+    return [{'target': t, 'model': c, **r} for (t, c), r in zip(candidates, results)]
@@ -1,70 +1,262 @@
 # llm/llm.py
-from typing import TypedDict, Annotated
-from langgraph.graph import StateGraph, END, add_messages
-from langchain_community.chat_models import ChatOllama
-from langchain.agents import create_agent
+import json
+import uuid
+import threading
+from config import Config
+from typing import TypedDict, Annotated, Any, Dict, Iterator, Optional
+from llm.dataset_cache import track_reads
+from llm.response_cache import RESPONSE_CACHE
 
-# -----------------------------
-# Import your custom tools
-# -----------------------------
-from llm.tools_ import (
-    list_csv_files,
-    preload_datasets,
-    get_dataset_summaries,
-    call_dataframe_method,
-    evaluate_classification_dataset,
-    evaluate_regression_dataset,
-)
+# LangChain, LangGraph and the tools (which pull in sklearn) take seconds to
+# import, so the agent is built on first use (or by warm_up) rather than when
+# the web app imports this module.
+_AGENT: Dict[str, Any] = {}
+_AGENT_LOCK = threading.Lock()
 
-# -----------------------------
-# Define state structure
-# -----------------------------
-class AgentState(TypedDict):
-    messages: Annotated[list, add_messages]
 
-# -----------------------------
-# Initialize LLM and Tools
-# -----------------------------
-llm = ChatOllama(
-    model="llama3",   # or mistral, phi3, codellama, etc.
-    temperature=0.7
-)
+def _build_agent() -> Dict[str, Any]:
+    from langgraph.graph import StateGraph, END, add_messages
+    from langchain_community.chat_models import ChatOllama
+    from langchain.agents import create_agent
+    from llm.memory import ConversationStore, compact, create_checkpointer, _merge_notes
 
+    # -----------------------------
+    # Import your custom tools
+    # -----------------------------
+    from llm.tools_ import (
+        list_csv_files,
+        profile_datasets,
+        preload_datasets,
+        get_dataset_summaries,
+        call_dataframe_method,
+        query_dataframe,
+        evaluate_classification_dataset,
+        evaluate_regression_dataset,
+        evaluate_candidates,
+    )
 
-tools = [
-    list_csv_files,
-    preload_datasets,
-    get_dataset_summaries,
-    call_dataframe_method,
-    evaluate_classification_dataset,
-    evaluate_regression_dataset,
-]
+    # -----------------------------
+    # Define state structure
+    # -----------------------------
+    class AgentState(TypedDict):
+        messages: Annotated[list, add_messages]
+        # Facts from earlier tool results, kept across turns (see llm.memory.compact)
+        dataset_notes: Annotated[Dict[str, Dict[str, Any]], _merge_notes]
 
-# -----------------------------
-# Create ReAct Agent Node
-# -----------------------------
-agent_node = create_agent(llm, tools)
+    # -----------------------------
+    # Initialize LLM and Tools
+    # -----------------------------
+    llm = ChatOllama(
+        model="llama3",   # or mistral, phi3, codellama, etc.
+        temperature=0.7
+    )
 
-# -----------------------------
-# Build Graph
-# -----------------------------
-graph = StateGraph(AgentState)
-graph.add_node("react_agent", agent_node)
-graph.set_entry_point("react_agent")
-graph.add_edge("react_agent", END)
+    tools = [
+        list_csv_files,
+        profile_datasets,
+        preload_datasets,
+        get_dataset_summaries,
+        call_dataframe_method,
+        query_dataframe,
+        evaluate_classification_dataset,
+        evaluate_regression_dataset,
+        evaluate_candidates,
+    ]
+
+    # -----------------------------
+    # Create ReAct Agent Node
+    # -----------------------------
+    agent_node = create_agent(llm, tools)
 
-# Compile the executable graph (equivalent to old AgentExecutor)
-agent_executor = graph.compile()
+    # -----------------------------
+    # Build Graph
+    # -----------------------------
+    # Each turn first compacts the conversation so far, then runs the agent
+    graph = StateGraph(AgentState)
+    graph.add_node("compact", compact)
+    graph.add_node("react_agent", agent_node)
+    graph.set_entry_point("compact")
+    graph.add_edge("compact", "react_agent")
+    graph.add_edge("react_agent", END)
+
+    # Compile the executable graph (equivalent to old AgentExecutor); the
+    # checkpointer keeps each conversation thread's state between requests
+    checkpointer = create_checkpointer(Config.LLM_CHECKPOINTER, Config.LLM_CHECKPOINT_PATH)
+    return {"AgentState": AgentState, "llm": llm, "tools": tools, "agent_node": agent_node,
+            "graph": graph, "agent_executor": graph.compile(checkpointer=checkpointer),
+            "conversations": ConversationStore(checkpointer, Config.LLM_MEMORY_MAX_THREADS)}
+
+
+def get_agent() -> Any:
+    """The compiled agent graph, built once per process on first call."""
+    if not _AGENT:
+        with _AGENT_LOCK:
+            if not _AGENT:
+                _AGENT.update(_build_agent())
+    return _AGENT["agent_executor"]
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps ``from llm.llm import agent_executor`` (and llm, tools, graph, ...) working
+    if name in ("AgentState", "llm", "tools", "agent_node", "graph", "agent_executor", "conversations"):
+        get_agent()
+        return _AGENT[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # -----------------------------
 # Ask Agent Function (for Flask)
 # -----------------------------
-def ask_agent(question: str) -> str:
-    """Send user input to the LangGraph agent and return response."""
+def _run_agent(executor: Any, question: str, config: Dict[str, Any]) -> str:
+    result = executor.invoke({
+        "messages": [{"role": "user", "content": question}]
+    }, config)
+    return result["messages"][-1].content
+
+
+def ask_agent(question: str, thread_id: Optional[str] = None) -> str:
+    """Send user input to the LangGraph agent and return response.
+
+    With ``thread_id`` the question continues that conversation; without one it
+    is asked in a fresh conversation that is discarded afterwards. Repeated
+    questions in the same context about unchanged datasets are answered from
+    RESPONSE_CACHE, and identical questions asked concurrently share one run.
+    """
     try:
-        result = agent_executor.invoke({
-            "messages": [{"role": "user", "content": question}]
-        })
-        return result["messages"][-1].content
+        executor = get_agent()
+        conversations = _AGENT["conversations"]
+        thread = thread_id or f"oneshot-{uuid.uuid4().hex}"
+        try:
+            with conversations.lock(thread):
+                context = conversations.context(executor, thread)
+                ran = []
+
+                def run() -> str:
+                    ran.append(True)
+                    return _run_agent(executor, question, conversations.config(thread))
+
+                reply = RESPONSE_CACHE.answer(question, run, context)
+                if ran:
+                    conversations.prune(executor, thread)
+                elif thread_id:
+                    conversations.append(executor, thread, question, reply)
+                return reply
+        finally:
+            if thread_id is None:
+                conversations.reset(thread)
     except Exception as e:
         return f"⚠️ Error: {e}"
+
+
+def reset_conversation(thread_id: str) -> None:
+    """Forget a conversation thread (its messages and dataset notes)."""
+    if _AGENT:
+        _AGENT["conversations"].reset(thread_id)
+
+
+# -----------------------------
+# Streaming (for the SSE chat endpoint)
+# -----------------------------
+# Tool results are echoed to the client only as a short preview
+TOOL_PREVIEW_CHARS = 300
+
+
+def _agent_events(executor: Any, question: str, config: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Run the agent and yield events as they happen.
+
+    ``token`` events carry LLM text as it is generated, ``tool_call`` and
+    ``tool_result`` report the ReAct loop's progress, and a final ``done``
+    carries the complete reply (or ``error`` if the run failed).
+    """
+    from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+
+    reply = ""
+    # The parent graph re-reports the agent node's messages when it finishes,
+    # and those include the conversation's earlier turns
+    seen = {m.id for m in executor.get_state(config).values.get("messages", [])} if config else set()
+    try:
+        # "messages" yields LLM tokens as they are generated, "updates" yields each
+        # finished node step; subgraphs=True reaches into the agent node's graph
+        for _, mode, data in executor.stream(
+                {"messages": [{"role": "user", "content": question}]}, config,
+                stream_mode=["messages", "updates"], subgraphs=True):
+            if mode == "messages":
+                chunk, _ = data
+                if isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and chunk.content:
+                    yield {"type": "token", "text": chunk.content}
+                continue
+            for node, update in data.items():
+                if node == "compact":
+                    # Rewrites earlier turns; nothing new happened
+                    continue
+                for message in (update or {}).get("messages", []):
+                    if message.id in seen:
+                        continue
+                    seen.add(message.id)
+                    if isinstance(message, AIMessage):
+                        for call in message.tool_calls:
+                            yield {"type": "tool_call", "name": call["name"], "args": call["args"]}
+                        if not message.tool_calls and isinstance(message.content, str):
+                            reply = message.content
+                    elif isinstance(message, ToolMessage):
+                        content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+                        yield {"type": "tool_result", "name": message.name,
+                               "preview": content[:TOOL_PREVIEW_CHARS]}
+        yield {"type": "done", "reply": reply}
+    except Exception as e:
+        yield {"type": "error", "error": f"⚠️ Error: {e}"}
+
+
+def stream_agent(question: str, thread_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Streaming counterpart of ask_agent (same conversations, cache and coalescing).
+
+    A cached or shared reply arrives as a single ``done`` event with ``cached``.
+    """
+    try:
+        executor = get_agent()
+    except Exception as e:
+        yield {"type": "error", "error": f"⚠️ Error: {e}"}
+        return
+    conversations = _AGENT["conversations"]
+    thread = thread_id or f"oneshot-{uuid.uuid4().hex}"
+    try:
+        with conversations.lock(thread):
+            yield from _stream_turn(executor, conversations, question, thread)
+    finally:
+        if thread_id is None:
+            conversations.reset(thread)
+
+
+def _stream_turn(executor: Any, conversations: Any, question: str, thread: str) -> Iterator[Dict[str, Any]]:
+    context = conversations.context(executor, thread)
+    reply = RESPONSE_CACHE.get(question, context)
+    if reply is None:
+        future, leader = RESPONSE_CACHE.claim(question, context)
+        if not leader:
+            # The same question is already running for another request
+            try:
+                reply = future.result()
+            except Exception as e:
+                yield {"type": "error", "error": f"⚠️ Error: {e}"}
+                return
+    if reply is not None:
+        conversations.append(executor, thread, question, reply)
+        yield {"type": "done", "reply": reply, "cached": True}
+        return
+
+    error: BaseException = RuntimeError("The agent run was interrupted")
+    try:
+        with track_reads() as reads:
+            for event in _agent_events(executor, question, conversations.config(thread)):
+                if event["type"] == "done":
+                    RESPONSE_CACHE.resolve(question, future, event["reply"], frozenset(reads), context)
+                    conversations.prune(executor, thread)
+                elif event["type"] == "error":
+                    error = RuntimeError(event["error"])
+                yield event
+    except Exception as e:
+        error = e
+        yield {"type": "error", "error": f"⚠️ Error: {e}"}
+    finally:
+        # Failed or abandoned (client disconnected) runs release the claim uncached
+        if not future.done():
+            RESPONSE_CACHE.fail(question, future, error, context)
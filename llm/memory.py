@@ -0,0 +1,247 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from config import Config
+from langchain_core.messages import (AIMessage, AnyMessage, HumanMessage, RemoveMessage, SystemMessage,
+                                     ToolMessage)
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+from llm.dataset_cache import _file_key
+from typing import Dict, Any, List, Optional, Tuple
+
+# The system message that carries the dataset notes; rewritten every turn
+NOTES_ID = 'dataset-notes'
+# Columns listed per dataset in the notes
+NOTES_MAX_COLUMNS = 50
+
+
+def _merge_notes(left: Dict[str, Dict[str, Any]], right: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Reducer for AgentState.dataset_notes: per-file fields update, touched files move last."""
+    merged = dict(left or {})
+    for file, note in (right or {}).items():
+        previous = merged.pop(file, {})
+        if note.get('version') != previous.get('version'):
+            # The file changed since the earlier notes were taken
+            previous = {}
+        evaluations = {**previous.get('evaluations', {}), **note.get('evaluations', {})}
+        merged[file] = {**previous, **note, **({'evaluations': evaluations} if evaluations else {})}
+    return merged
+
+
+def _note_key(path: str) -> str:
+    """One key per file however the agent spelled its path (relative to the working directory)."""
+    return os.path.relpath(os.path.realpath(path)) if path else ''
+
+
+def _file_version(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        return _file_key(path)[1:]
+    except OSError:
+        return None
+
+
+def _tool_output(message: ToolMessage) -> Any:
+    try:
+        return json.loads(message.content) if isinstance(message.content, str) else message.content
+    except ValueError:
+        return None
+
+
+def _extract_notes(messages: List[AnyMessage]) -> Dict[str, Dict[str, Any]]:
+    """Dataset facts from the tool results in ``messages`` (summaries, profiles, evaluations)."""
+    calls = {call['id']: call for m in messages if isinstance(m, AIMessage) for call in m.tool_calls}
+    notes: Dict[str, Dict[str, Any]] = {}
+
+    def note(path: str) -> Dict[str, Any]:
+        file = _note_key(path)
+        if file not in notes:
+            notes[file] = {'version': _file_version(file)}
+        return notes[file]
+
+    for message in messages:
+        if not isinstance(message, ToolMessage):
+            continue
+        output = _tool_output(message)
+        args = calls.get(message.tool_call_id, {}).get('args', {})
+        if message.name == 'get_dataset_summaries' and isinstance(output, list):
+            for summary in output:
+                if isinstance(summary, dict) and 'data_types' in summary:
+                    note(summary['file_name'])['columns'] = summary['data_types']
+        elif message.name == 'profile_datasets' and isinstance(output, list):
+            directory = args.get('directory') or os.getcwd()
+            for profile in output:
+                if isinstance(profile, dict) and profile.get('recommendation'):
+                    note(os.path.join(directory, profile['file']))['recommendation'] = profile['recommendation']
+        elif message.name in ('evaluate_classification_dataset', 'evaluate_regression_dataset') \
+                and isinstance(output, dict) and 'error' not in output:
+            scores = {k: round(v, 4) for k, v in output.items() if k in ('accuracy', 'r2_score')}
+            note(args.get('file_name', '')).setdefault('evaluations', {})[args.get('target_column')] = scores
+        elif message.name == 'evaluate_candidates' and isinstance(output, list):
+            for result in output:
+                if isinstance(result, dict) and 'error' not in result and 'target' in result:
+                    scores = {k: round(v, 4) for k, v in result.items() if k in ('accuracy', 'r2_score')}
+                    model = (result.get('model') or {}).get('name', 'random_forest')
+                    note(args.get('file_name', '')).setdefault('evaluations', {})[f"{result['target']} ({model})"] = scores
+    notes.pop('', None)
+    return notes
+
+
+def _render_notes(notes: Dict[str, Dict[str, Any]], max_notes: int) -> str:
+    lines = ["Known datasets (from earlier tool calls in this conversation; "
+             "reuse these instead of calling the tools again):"]
+    for file, note in list(notes.items())[-max_notes:]:
+        if note.get('version') != _file_version(file):
+            continue
+        parts = []
+        columns = note.get('columns')
+        if columns:
+            shown = ', '.join(f'{c} ({t})' for c, t in list(columns.items())[:NOTES_MAX_COLUMNS])
+            more = len(columns) - NOTES_MAX_COLUMNS
+            parts.append(f"columns: {shown}{f' and {more} more' if more > 0 else ''}")
+        rec = note.get('recommendation')
+        if rec:
+            parts.append(f"recommended target {rec['target']} ({rec['task']}, confidence {rec['confidence']})")
+        for target, scores in note.get('evaluations', {}).items():
+            parts.append(f"evaluated {target}: " + ', '.join(f'{k} {v}' for k, v in scores.items()))
+        if parts:
+            lines.append(f"- {file}: " + '; '.join(parts))
+    return '\n'.join(lines) if len(lines) > 1 else ''
+
+
+def _truncate(text: Any, limit: int) -> Any:
+    if isinstance(text, str) and len(text) > limit:
+        return text[:limit] + f' … [{len(text) - limit} more characters]'
+    return text
+
+
+def _turns(messages: List[AnyMessage]) -> List[List[AnyMessage]]:
+    """Split a conversation at each user message."""
+    turns: List[List[AnyMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def compact(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Graph node run before the agent on every turn to keep the prompt small.
+
+    Turns older than LLM_MEMORY_KEEP_TURNS are reduced to the question and a
+    truncated final answer (their tool calls and outputs are dropped), at most
+    LLM_MEMORY_MAX_TURNS turns are kept, and recent tool outputs are truncated.
+    Facts from tool results are kept as dataset notes in a leading system
+    message, so follow-up questions need not call the tools again.
+    """
+    messages = [m for m in state['messages'] if m.id != NOTES_ID]
+    new_notes = _extract_notes(messages)
+    notes = _merge_notes(state.get('dataset_notes') or {}, new_notes)
+
+    turns = _turns(messages)[-Config.LLM_MEMORY_MAX_TURNS:]
+    # The current question plus the previous KEEP_TURNS turns stay verbatim
+    recent = Config.LLM_MEMORY_KEEP_TURNS + 1
+    kept: List[AnyMessage] = []
+    for i, turn in enumerate(turns):
+        if i < len(turns) - recent:
+            answers = [m for m in turn if isinstance(m, AIMessage) and not m.tool_calls]
+            kept.extend(m for m in turn if isinstance(m, HumanMessage))
+            if answers:
+                answer = answers[-1]
+                kept.append(AIMessage(content=_truncate(answer.content, Config.LLM_MEMORY_ANSWER_CHARS), id=answer.id))
+        else:
+            kept.extend(ToolMessage(content=_truncate(m.content, Config.LLM_MEMORY_TOOL_CHARS), id=m.id,
+                                    tool_call_id=m.tool_call_id, name=m.name)
+                        if isinstance(m, ToolMessage) else m for m in turn)
+
+    rendered = _render_notes(notes, Config.LLM_MEMORY_MAX_NOTES)
+    if rendered:
+        kept.insert(0, SystemMessage(content=rendered, id=NOTES_ID))
+    return {'messages': [RemoveMessage(id=REMOVE_ALL_MESSAGES), *kept], 'dataset_notes': new_notes}
+
+
+def _context_digest(values: Dict[str, Any]) -> str:
+    """Identifies a conversation's state for the response cache ('' for a new conversation)."""
+    messages = values.get('messages') or []
+    if not messages:
+        return ''
+    digest = hashlib.blake2b(digest_size=16)
+    for message in messages:
+        digest.update(json.dumps([message.type, message.content], default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def create_checkpointer(kind: str, path: str) -> Any:
+    if kind == 'memory':
+        from langgraph.checkpoint.memory import InMemorySaver
+        return InMemorySaver()
+    if kind == 'sqlite':
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError as e:
+            raise ImportError("LLM_CHECKPOINTER 'sqlite' needs the langgraph-checkpoint-sqlite package") from e
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    raise ValueError(f"Unknown LLM_CHECKPOINTER '{kind}'")
+
+
+class ConversationStore:
+    """Conversation threads kept by the agent's checkpointer.
+
+    At most ``max_threads`` threads are kept; the least recently used is
+    deleted. Runs on one thread are serialized, and after each run the
+    thread's checkpoint history is collapsed to its latest state, so a thread
+    costs one compacted state rather than a checkpoint per step.
+    """
+
+    def __init__(self, checkpointer: Any, max_threads: int):
+        self.checkpointer = checkpointer
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, threading.Lock]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def config(self, thread_id: str) -> Dict[str, Any]:
+        return {'configurable': {'thread_id': thread_id}}
+
+    def lock(self, thread_id: str) -> threading.Lock:
+        """The thread's run lock; marks it most recently used and evicts the oldest threads."""
+        with self._lock:
+            lock = self._threads.pop(thread_id, None) or threading.Lock()
+            self._threads[thread_id] = lock
+            evicted = []
+            while len(self._threads) > self.max_threads:
+                oldest, oldest_lock = next(iter(self._threads.items()))
+                if oldest_lock.locked():
+                    break
+                del self._threads[oldest]
+                evicted.append(oldest)
+        for oldest in evicted:
+            self.checkpointer.delete_thread(oldest)
+        return lock
+
+    def values(self, graph: Any, thread_id: str) -> Dict[str, Any]:
+        return graph.get_state(self.config(thread_id)).values or {}
+
+    def context(self, graph: Any, thread_id: str) -> str:
+        return _context_digest(self.values(graph, thread_id))
+
+    def append(self, graph: Any, thread_id: str, question: str, reply: str) -> None:
+        """Record a turn answered without running the agent (e.g. from the response cache)."""
+        graph.update_state(self.config(thread_id),
+                           {'messages': [HumanMessage(content=question), AIMessage(content=reply)]},
+                           as_node='react_agent')
+
+    def prune(self, graph: Any, thread_id: str) -> None:
+        values = self.values(graph, thread_id)
+        self.checkpointer.delete_thread(thread_id)
+        if values:
+            graph.update_state(self.config(thread_id), values, as_node='react_agent')
+
+    def reset(self, thread_id: str) -> None:
+        with self._lock:
+            self._threads.pop(thread_id, None)
+        self.checkpointer.delete_thread(thread_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'threads': len(self._threads), 'max_threads': self.max_threads}
@@ -0,0 +1,146 @@
+import os
+import re
+import contextvars
+import numpy as np
+import pandas as pd
+from config import Config
+from concurrent.futures import ThreadPoolExecutor
+from cache_utils import LRUCache
+from llm.dataset_cache import DATAFRAME_CACHE, list_csv_paths
+from typing import Dict, Any, List, Optional
+
+# Column names that usually hold the label
+TARGET_HINTS = re.compile(
+    r'(^|_)(target|label|labels|class|y|outcome|response|result|churn|survived|default|fraud|'
+    r'status|diagnosis|price|sales|salary|income|score|quality|grade|rating|charges)($|_)')
+ID_HINTS = re.compile(r'(^|_)(id|uuid|index|key)($|_)|^unnamed')
+
+# Integer (or integral float) columns with at most this many values are treated as classes
+MAX_CLASSES = 20
+
+# Profiles keyed by file version and top_k
+PROFILE_CACHE = LRUCache(max_entries=Config.PROFILE_CACHE_MAX_ENTRIES)
+
+
+def _normalize_name(name: Any) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', str(name).lower()).strip('_')
+
+
+def _class_balance(counts: pd.Series) -> float:
+    """Normalized entropy of the class frequencies: 1 is perfectly balanced."""
+    if len(counts) < 2:
+        return 0.0
+    p = counts.to_numpy(dtype=np.float64) / counts.sum()
+    return float(-(p * np.log(p)).sum() / np.log(len(p)))
+
+
+def _candidate(series: pd.Series, position: int, n_columns: int) -> Optional[Dict[str, Any]]:
+    """Target-candidate heuristics for one column, or None if it cannot be a target."""
+    values = series.dropna()
+    n = len(values)
+    if n == 0:
+        return None
+    counts = values.value_counts()
+    n_unique = len(counts)
+    if n_unique <= 1:
+        return None
+    name = _normalize_name(series.name)
+    unique_ratio = n_unique / n
+    dtype = series.dtype
+    numeric = pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    integral = numeric and (pd.api.types.is_integer_dtype(dtype)
+                            or bool(np.all(np.mod(values.to_numpy(dtype=np.float64), 1) == 0)))
+
+    # Identifiers and free text are never targets
+    if ID_HINTS.search(name) and unique_ratio > 0.5:
+        return None
+    if (integral or not numeric) and unique_ratio > 0.95 and n > MAX_CLASSES:
+        return None
+    if not numeric and unique_ratio > 0.5 and n > MAX_CLASSES:
+        return None
+
+    task = 'regression' if numeric and (not integral or n_unique > MAX_CLASSES) else 'classification'
+    reasons = []
+    score = 0.0
+    if TARGET_HINTS.search(name):
+        score += 0.5
+        reasons.append('name')
+    if position == n_columns - 1:
+        score += 0.25
+        reasons.append('last column')
+    score += 0.1 * (1 - float(series.isna().mean()))
+    info: Dict[str, Any] = {'column': str(series.name), 'task': task, 'dtype': str(dtype), 'unique': n_unique}
+    if task == 'classification':
+        balance = _class_balance(counts)
+        score += 0.15 * balance
+        info['classes'] = n_unique
+        info['balance'] = round(balance, 3)
+        info['minority_share'] = round(float(counts.iloc[-1] / n), 4)
+        if balance < 0.3:
+            reasons.append('imbalanced')
+    else:
+        score += 0.1
+        reasons.append('continuous')
+    info['score'] = round(score, 3)
+    info['reasons'] = reasons
+    return info
+
+
+def _profile_frame(df: pd.DataFrame, top_k: int) -> Dict[str, Any]:
+    candidates = [c for c in (_candidate(df.iloc[:, i], i, df.shape[1]) for i in range(df.shape[1])) if c]
+    candidates.sort(key=lambda c: c['score'], reverse=True)
+    top = candidates[:top_k]
+    profile: Dict[str, Any] = {'rows_profiled': int(len(df)), 'columns': int(df.shape[1]),
+                               'candidates': top}
+    if top:
+        # Confidence grows with the lead over the runner-up
+        lead = top[0]['score'] - (top[1]['score'] if len(top) > 1 else 0.0)
+        profile['recommendation'] = {'target': top[0]['column'], 'task': top[0]['task'],
+                                     'confidence': round(float(min(1.0, 0.5 + lead)), 2)}
+    else:
+        profile['recommendation'] = None
+    return profile
+
+
+def profile_file(path: str, top_k: int = 3, sample_rows: int = Config.PROFILE_SAMPLE_ROWS,
+                 cache: Optional[LRUCache] = PROFILE_CACHE) -> Dict[str, Any]:
+    """Ranked target recommendation for one CSV, from its first ``sample_rows`` rows.
+
+    A dataset already in DATAFRAME_CACHE is profiled in full without re-reading it.
+    """
+    key = (DATAFRAME_CACHE.key(path), top_k, sample_rows)
+    result = cache.get(key) if cache is not None else None
+    if result is not None:
+        return result
+    if DATAFRAME_CACHE.cached(path):
+        df = DATAFRAME_CACHE.get(path)
+    else:
+        df = pd.read_csv(path, nrows=sample_rows, low_memory=False)
+    result = {'file': os.path.basename(path), **_profile_frame(df, top_k)}
+    if cache is not None:
+        cache.set(key, result)
+    return result
+
+
+def profile_directory(directory: Optional[str] = None, top_k: int = 3,
+                      workers: int = Config.PROFILE_WORKERS) -> List[Dict[str, Any]]:
+    """Profile every CSV in ``directory`` (default: the working directory) in parallel.
+
+    Files are read on a thread pool: the CSV parser and most column reductions
+    release the GIL, and threads avoid process start-up, which would dominate
+    on small files. Each task runs in a copy of the caller's context, so the
+    files it reads are recorded by an enclosing dataset_cache.track_reads.
+    """
+    paths = list_csv_paths(directory)
+
+    def run(path: str) -> Dict[str, Any]:
+        try:
+            return profile_file(path, top_k)
+        except Exception as e:
+            return {'file': os.path.basename(path), 'error': str(e)}
+
+    if len(paths) <= 1 or workers <= 1:
+        return [run(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths)), thread_name_prefix='profile') as pool:
+        futures = [pool.submit(contextvars.copy_context().run, run, p) for p in paths]
+        return [f.result() for f in futures]
@@ -3,7 +3,11 @@ from langchain_core.prompts import ChatPromptTemplate
 prompt = ChatPromptTemplate.from_messages([
     ("system", 
      "You are a data science assistant. Use the available tools to analyze CSV files. "
-     "Your job is to determine whether each dataset is for classification or regression, based on its structure."),
+     "Your job is to determine whether each dataset is for classification or regression, based on its structure. "
+     "Call profile_datasets once to get a ranked target recommendation for every file in the folder, "
+     "and only inspect individual files when a recommendation has low confidence. "
+     "To look at the data, use query_dataframe with filters, groupby or value_counts "
+     "rather than dumping whole tables."),
     
     ("user", "{input}"),
     ("placeholder", "{agent_scratchpad}")  # Required for tool-calling agents
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from config import Config
+from typing import Dict, Any, List, Optional
+
+# Operations a query may chain, and the aggregations groupby accepts
+OPERATIONS = ('select', 'filter', 'groupby', 'value_counts', 'sort', 'head', 'tail', 'describe')
+AGGREGATIONS = ('count', 'size', 'sum', 'mean', 'median', 'min', 'max', 'std', 'nunique', 'first', 'last')
+COMPARISONS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'not_in', 'contains', 'isnull', 'notnull')
+MAX_OPERATIONS = 10
+MAX_CELL_CHARS = 60
+
+
+def _columns(df: pd.DataFrame, columns: Any) -> List[Any]:
+    columns = [columns] if isinstance(columns, str) else list(columns or [])
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Unknown column(s) {missing}. Available: {list(df.columns)[:50]}")
+    return columns
+
+
+def _mask(series: pd.Series, cmp: str, value: Any) -> pd.Series:
+    if cmp == 'isnull':
+        return series.isna()
+    if cmp == 'notnull':
+        return series.notna()
+    if cmp in ('in', 'not_in'):
+        mask = series.isin(value if isinstance(value, list) else [value])
+        return mask if cmp == 'in' else ~mask
+    if cmp == 'contains':
+        return series.astype(str).str.contains(str(value), case=False, regex=False, na=False)
+    if pd.api.types.is_numeric_dtype(series.dtype) and isinstance(value, str):
+        value = pd.to_numeric(value)
+    return {'==': series.eq, '!=': series.ne, '<': series.lt, '<=': series.le,
+            '>': series.gt, '>=': series.ge}[cmp](value)
+
+
+def _apply(df: pd.DataFrame, operation: Dict[str, Any]) -> pd.DataFrame:
+    op = operation.get('op')
+    if op not in OPERATIONS:
+        raise ValueError(f"Unknown op '{op}'. Choose from {list(OPERATIONS)}")
+    if op == 'select':
+        return df[_columns(df, operation.get('columns'))]
+    if op == 'filter':
+        column, = _columns(df, operation.get('column'))
+        cmp = operation.get('cmp', '==')
+        if cmp not in COMPARISONS:
+            raise ValueError(f"Unknown cmp '{cmp}'. Choose from {list(COMPARISONS)}")
+        return df[_mask(df[column], cmp, operation.get('value')).to_numpy(dtype=bool, na_value=False)]
+    if op == 'groupby':
+        by = _columns(df, operation.get('by'))
+        agg = operation.get('agg') or {'*': 'size'}
+        bad = [f for f in agg.values() if f not in AGGREGATIONS]
+        if bad:
+            raise ValueError(f"Unknown aggregation(s) {bad}. Choose from {list(AGGREGATIONS)}")
+        grouped = df.groupby(by, observed=True, dropna=False, sort=True)
+        if list(agg) == ['*']:
+            return grouped.size().rename('size').reset_index()
+        _columns(df, list(agg))
+        return grouped.agg(**{f'{c}_{f}': (c, f) for c, f in agg.items()}).reset_index()
+    if op == 'value_counts':
+        column, = _columns(df, operation.get('column'))
+        counts = df[column].value_counts(dropna=False, normalize=bool(operation.get('normalize')))
+        return counts.rename('share' if operation.get('normalize') else 'count').rename_axis(column).reset_index()
+    if op == 'sort':
+        return df.sort_values(_columns(df, operation.get('by')), ascending=bool(operation.get('ascending', True)),
+                              kind='stable')
+    if op in ('head', 'tail'):
+        n = max(0, int(operation.get('n', 5)))
+        return df.head(n) if op == 'head' else df.tail(n)
+    # describe: one row per column, so wide frames stay within the column budget
+    return df.describe(include='all').T.rename_axis('column').reset_index()
+
+
+def _bounded_text(df: pd.DataFrame, max_rows: int, max_columns: int, max_chars: int) -> Dict[str, Any]:
+    """Render at most max_rows x max_columns cells and max_chars characters, saying what was cut."""
+    n_rows, n_cols = df.shape
+    shown = df.iloc[:max_rows, :max_columns]
+    text = shown.to_string(index=False, max_colwidth=MAX_CELL_CHARS)
+    result: Dict[str, Any] = {'rows': int(n_rows), 'columns': int(n_cols)}
+    notes = []
+    if n_rows > max_rows:
+        notes.append(f'showing the first {max_rows} of {n_rows} rows')
+    if n_cols > max_columns:
+        omitted = [str(c) for c in df.columns[max_columns:]]
+        notes.append(f"showing {max_columns} of {n_cols} columns; omitted: {', '.join(omitted[:20])}"
+                     + (' …' if len(omitted) > 20 else ''))
+    if len(text) > max_chars:
+        cut = text.rfind('\n', 0, max_chars)
+        text = text[:cut if cut > 0 else max_chars]
+        notes.append(f'output cut at {max_chars} characters')
+    if n_rows > max_rows:
+        # Summarize what the truncated rows contain
+        numeric = df.select_dtypes(include=np.number).iloc[:, :max_columns]
+        if not numeric.empty:
+            result['summary'] = {str(c): {'min': _scalar(s.min()), 'max': _scalar(s.max()), 'mean': _scalar(s.mean())}
+                                 for c, s in numeric.items()}
+    result['result'] = text
+    if notes:
+        result['truncated'] = '; '.join(notes)
+    return result
+
+
+def _scalar(value: Any) -> Any:
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else round(float(value), 6)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def query_frame(df: pd.DataFrame, operations: List[Dict[str, Any]], max_rows: Optional[int] = None,
+                max_columns: Optional[int] = None, max_chars: Optional[int] = None) -> Dict[str, Any]:
+    """Run a chain of whitelisted operations on ``df`` and return a size-bounded result.
+
+    Operations are dicts applied in order, e.g.
+    ``[{'op': 'filter', 'column': 'age', 'cmp': '>', 'value': 30},
+       {'op': 'groupby', 'by': ['sex'], 'agg': {'fare': 'mean'}}]``.
+    Each is a vectorized pandas call on the frame (no eval/query strings).
+    """
+    if not isinstance(operations, list) or len(operations) > MAX_OPERATIONS:
+        raise ValueError(f"operations must be a list of at most {MAX_OPERATIONS} steps")
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise ValueError("Each operation must be an object like {'op': 'head', 'n': 5}")
+        df = _apply(df, operation)
+    if df.index.name is not None or not pd.api.types.is_integer_dtype(df.index.dtype):
+        # Labels such as describe's statistic names are part of the answer
+        df = df.reset_index()
+    return _bounded_text(df, min(max_rows or Config.LLM_QUERY_MAX_ROWS, Config.LLM_QUERY_MAX_ROWS),
+                         min(max_columns or Config.LLM_QUERY_MAX_COLUMNS, Config.LLM_QUERY_MAX_COLUMNS),
+                         Config.LLM_QUERY_MAX_CHARS if max_chars is None else max_chars)
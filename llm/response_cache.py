@@ -0,0 +1,105 @@
+import re
+import threading
+import unicodedata
+from config import Config
+from cache_utils import LRUCache
+from concurrent.futures import Future
+from llm.dataset_cache import track_reads, _is_current
+from typing import Dict, Any, Callable, FrozenSet, Optional, Tuple
+
+
+def _normalize_prompt(prompt: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the question."""
+    text = unicodedata.normalize('NFKC', prompt or '').casefold()
+    return re.sub(r'\s+', ' ', text).strip().rstrip('?!.').strip()
+
+
+def _key(prompt: str, context: str) -> Tuple[str, str]:
+    return context, _normalize_prompt(prompt)
+
+
+class ResponseCache:
+    """Agent replies keyed by the normalized prompt and the data they were built from.
+
+    Each reply is stored with the files and directory listings its run read
+    (see dataset_cache.track_reads) and is served only while all of them are
+    unchanged, for at most ``ttl_seconds``. Concurrent runs of the same prompt
+    are coalesced: the first caller runs the agent and the others wait for its
+    reply. ``context`` identifies the conversation so far ('' for a new one),
+    so a follow-up question is only shared between identical conversations.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._replies = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self.stale = 0
+        self.coalesced = 0
+
+    def get(self, prompt: str, context: str = '') -> Optional[str]:
+        key = _key(prompt, context)
+        entry = self._replies.get(key)
+        if entry is None:
+            return None
+        reply, reads = entry
+        if not all(_is_current(read) for read in reads):
+            # A dataset the reply was built from has changed
+            self._replies.pop(key)
+            with self._lock:
+                self.stale += 1
+            return None
+        return reply
+
+    def claim(self, prompt: str, context: str = '') -> Tuple[Future, bool]:
+        """The future for this prompt's reply, and whether the caller must produce it."""
+        key = _key(prompt, context)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def resolve(self, prompt: str, future: Future, reply: str, reads: FrozenSet[Tuple[str, str, Any]],
+                context: str = '') -> None:
+        key = _key(prompt, context)
+        if reply:
+            self._replies.set(key, (reply, reads), size=len(reply))
+        with self._lock:
+            self._inflight.pop(key, None)
+        future.set_result(reply)
+
+    def fail(self, prompt: str, future: Future, error: BaseException, context: str = '') -> None:
+        """Release the claim without caching; waiting callers get ``error``."""
+        with self._lock:
+            self._inflight.pop(_key(prompt, context), None)
+        if not future.done():
+            future.set_exception(error)
+
+    def answer(self, prompt: str, compute: Callable[[], str], context: str = '') -> str:
+        """The cached reply, another caller's in-flight reply, or ``compute()``."""
+        reply = self.get(prompt, context)
+        if reply is not None:
+            return reply
+        future, leader = self.claim(prompt, context)
+        if not leader:
+            return future.result()
+        try:
+            with track_reads() as reads:
+                reply = compute()
+        except BaseException as e:
+            self.fail(prompt, future, e, context)
+            raise
+        self.resolve(prompt, future, reply, frozenset(reads), context)
+        return reply
+
+    def clear(self) -> None:
+        self._replies.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._replies.stats(), 'stale': self.stale, 'coalesced': self.coalesced,
+                'in_flight': len(self._inflight)}
+
+
+RESPONSE_CACHE = ResponseCache(Config.LLM_RESPONSE_CACHE_MAX_ENTRIES, Config.LLM_RESPONSE_CACHE_TTL_SECONDS)
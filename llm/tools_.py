@@ -1,12 +1,18 @@
 import os
-import glob
+import json
 import pandas as pd
-from typing import List, Optional
+from config import Config
+from typing import List, Optional, Dict, Any
 from langchain_core.tools import tool
-from sklearn.metrics import accuracy_score
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import r2_score, mean_squared_error
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from cache_utils import LRUCache
+from llm.dataset_cache import DATAFRAME_CACHE, list_csv_paths
+from llm.evaluation import evaluate, evaluate_many
+from llm.profiling import profile_directory
+from llm.query import query_frame
+
+# Summaries and DataFrame method outputs keyed by the file's version (path, mtime, size);
+# evaluations and profiles have their own caches keyed the same way
+TOOL_CACHE = LRUCache(max_entries=Config.LLM_TOOL_CACHE_MAX_ENTRIES)
 
 @tool
 def list_csv_files() -> Optional[List[str]]:
@@ -16,12 +22,28 @@ def list_csv_files() -> Optional[List[str]]:
         A list containing CSV file names.
         If no CSV files are found, returns None.
     """
-    csv_files = glob.glob(os.path.join(os.getcwd(), "*.csv"))
+    csv_files = list_csv_paths()
     if not csv_files:
         return None
     return [os.path.basename(file) for file in csv_files]
 
-DATAFRAME_CACHE = {}
+@tool
+def profile_datasets(directory: Optional[str] = None, top_k: int = 3) -> List[Dict[str, Any]]:
+    """Profile every CSV in a directory at once and recommend a target and task for each.
+
+    Prefer this over calling list_csv_files and get_dataset_summaries per file:
+    one call answers "is each dataset classification or regression?".
+
+    Args:
+        directory: Folder to scan. Defaults to the local directory.
+        top_k: How many ranked target candidates to return per file.
+
+    Returns:
+        One entry per file with rows_profiled, columns, a recommendation
+        ({target, task, confidence}) and the top candidates with their
+        heuristics (unique values, class balance, reasons).
+    """
+    return profile_directory(directory, top_k)
 
 @tool
 def preload_datasets(paths: List[str]) -> str:
@@ -41,8 +63,8 @@ def preload_datasets(paths: List[str]) -> str:
     loaded = []
     cached = []
     for path in paths:
-        if path not in DATAFRAME_CACHE:
-            DATAFRAME_CACHE[path] = pd.read_csv(path)
+        if not DATAFRAME_CACHE.cached(path):
+            DATAFRAME_CACHE.get(path)
             loaded.append(path)
         else:
             cached.append(path)
@@ -52,8 +74,6 @@ def preload_datasets(paths: List[str]) -> str:
         f"Already cached: {cached}"
     )
 
-from typing import List, Optional,Dict,Any
-
 @tool
 def get_dataset_summaries(dataset_paths: List[str]) -> List[Dict[str, Any]]:
     """
@@ -73,20 +93,20 @@ def get_dataset_summaries(dataset_paths: List[str]) -> List[Dict[str, Any]]:
     summaries = []
 
     for path in dataset_paths:
-        # Load and cache the dataset if not already cached
-        if path not in DATAFRAME_CACHE:
-            DATAFRAME_CACHE[path] = pd.read_csv(path)
-        
-        df = DATAFRAME_CACHE[path]
+        key = ('summary', DATAFRAME_CACHE.key(path))
+        summary = TOOL_CACHE.get(key)
+        if summary is None:
+            # Load and cache the dataset if not already cached
+            df = DATAFRAME_CACHE.get(path)
 
-        # Build summary
-        summary = {
-            "file_name": path,
-            "column_names": df.columns.tolist(),
-            "data_types": df.dtypes.astype(str).to_dict()
-        }
+            # Build summary
+            summary = {
+                "column_names": df.columns.tolist(),
+                "data_types": df.dtypes.astype(str).to_dict()
+            }
+            TOOL_CACHE.set(key, summary)
 
-        summaries.append(summary)
+        summaries.append({"file_name": path, **summary})
 
     return summaries
 
@@ -107,95 +127,125 @@ def call_dataframe_method(file_name: str, method: str) -> str:
        call_dataframe_method(file_name="data.csv", method="head")
    """
    # Try to get the DataFrame from cache, or load it if not already cached
-   if file_name not in DATAFRAME_CACHE:
-       try:
-           DATAFRAME_CACHE[file_name] = pd.read_csv(file_name)
-       except FileNotFoundError:
-           return f"DataFrame '{file_name}' not found in cache or on disk."
-       except Exception as e:
-           return f"Error loading '{file_name}': {str(e)}"
-   
-   df = DATAFRAME_CACHE[file_name]
+   try:
+       key = ('method', DATAFRAME_CACHE.key(file_name), method)
+       output = TOOL_CACHE.get(key)
+       if output is not None:
+           return output
+       df = DATAFRAME_CACHE.get(file_name)
+   except FileNotFoundError:
+       return f"DataFrame '{file_name}' not found in cache or on disk."
+   except Exception as e:
+       return f"Error loading '{file_name}': {str(e)}"
+   if method.startswith('to_'):
+       # Exporters render the whole frame before any budget could apply
+       return f"'{method}' would dump the whole DataFrame; use query_dataframe instead."
    func = getattr(df, method, None)
    if not callable(func):
        return f"'{method}' is not a valid method of DataFrame."
    try:
        result = func()
-       return str(result)
+       if isinstance(result, (pd.DataFrame, pd.Series)):
+           result = query_frame(result.to_frame() if isinstance(result, pd.Series) else result, [])
+           output = result.get('truncated', '') and f"[{result['truncated']}]\n"
+           output += result['result']
+       else:
+           output = str(result)[:Config.LLM_QUERY_MAX_CHARS]
+       TOOL_CACHE.set(key, output)
+       return output
    except Exception as e:
        return f"Error calling '{method}' on '{file_name}': {str(e)}"
 
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
-
-# Assumes this global cache is shared
-DATAFRAME_CACHE = {}
+@tool
+def query_dataframe(file_name: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run a chain of operations on a dataset and return a small, truncated result.
+    Prefer this over call_dataframe_method: it takes arguments and never floods the context.
+    Args:
+        file_name (str): The path or name of the dataset.
+        operations (List[Dict]): Steps applied in order, each one of:
+            {"op": "select", "columns": ["a", "b"]}
+            {"op": "filter", "column": "a", "cmp": "==|!=|<|<=|>|>=|in|not_in|contains|isnull|notnull", "value": 3}
+            {"op": "groupby", "by": ["a"], "agg": {"b": "count|size|sum|mean|median|min|max|std|nunique|first|last"}}
+            {"op": "value_counts", "column": "a", "normalize": false}
+            {"op": "sort", "by": ["a"], "ascending": false}
+            {"op": "head", "n": 10} or {"op": "tail", "n": 10}
+            {"op": "describe"}
+    Returns:
+        Dict[str, Any]: rows and columns of the full result, the result as text
+        (at most LLM_QUERY_MAX_ROWS rows, LLM_QUERY_MAX_COLUMNS columns and
+        LLM_QUERY_MAX_CHARS characters), what was truncated, and min/max/mean of
+        the numeric columns when rows were cut.
+    """
+    try:
+        key = ('query', DATAFRAME_CACHE.key(file_name), json.dumps(operations, sort_keys=True, default=str))
+        result = TOOL_CACHE.get(key)
+        if result is None:
+            result = query_frame(DATAFRAME_CACHE.get(file_name), operations)
+            TOOL_CACHE.set(key, result)
+        return result
+    except FileNotFoundError:
+        return {"error": f"DataFrame '{file_name}' not found in cache or on disk."}
+    except Exception as e:
+        return {"error": f"Error querying '{file_name}': {str(e)}"}
 
 @tool
-def evaluate_classification_dataset(file_name: str, target_column: str) -> Dict[str, float]:
+def evaluate_classification_dataset(file_name: str, target_column: str, quick: bool = False) -> Dict[str, Any]:
     """
     Train and evaluate a classifier on a dataset using the specified target column.
     Args:
         file_name (str): The name or path of the dataset stored in DATAFRAME_CACHE.
         target_column (str): The name of the column to use as the classification target.
+        quick (bool): Estimate on a subsample with fewer trees (for large datasets).
     Returns:
-        Dict[str, float]: A dictionary with the model's accuracy score.
+        Dict[str, Any]: A dictionary with the model's accuracy score, timing and
+        memory metrics, and whether the result came from the evaluation cache.
     """
-    # Try to get the DataFrame from cache, or load it if not already cached
-    if file_name not in DATAFRAME_CACHE:
-        try:
-            DATAFRAME_CACHE[file_name] = pd.read_csv(file_name)
-        except FileNotFoundError:
-            return {"error": f"DataFrame '{file_name}' not found in cache or on disk."}
-        except Exception as e:
-            return {"error": f"Error loading '{file_name}': {str(e)}"}
-    
-    df = DATAFRAME_CACHE[file_name]
-    if target_column not in df.columns:
-        return {"error": f"Target column '{target_column}' not found in '{file_name}'."}
-    
-    X = df.drop(columns=[target_column])
-    y = df[target_column]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestClassifier()
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-    acc = accuracy_score(y_test, y_pred)
-    return {"accuracy": acc}
+    return _run_evaluation(file_name, target_column, 'classification', quick)
 
 @tool
-def evaluate_regression_dataset(file_name: str, target_column: str) -> Dict[str, float]:
+def evaluate_regression_dataset(file_name: str, target_column: str, quick: bool = False) -> Dict[str, Any]:
     """
     Train and evaluate a regression model on a dataset using the specified target column.
     Args:
         file_name (str): The name or path of the dataset stored in DATAFRAME_CACHE.
         target_column (str): The name of the column to use as the regression target.
+        quick (bool): Estimate on a subsample with fewer trees (for large datasets).
     Returns:
-        Dict[str, float]: A dictionary with R² score and Mean Squared Error.
+        Dict[str, Any]: A dictionary with R² score and Mean Squared Error, timing and
+        memory metrics, and whether the result came from the evaluation cache.
     """
-    # Try to get the DataFrame from cache, or load it if not already cached
-    if file_name not in DATAFRAME_CACHE:
-        try:
-            DATAFRAME_CACHE[file_name] = pd.read_csv(file_name)
-        except FileNotFoundError:
-            return {"error": f"DataFrame '{file_name}' not found in cache or on disk."}
-        except Exception as e:
-            return {"error": f"Error loading '{file_name}': {str(e)}"}
-    
-    df = DATAFRAME_CACHE[file_name]
-    if target_column not in df.columns:
-        return {"error": f"Target column '{target_column}' not found in '{file_name}'."}
-    
-    X = df.drop(columns=[target_column])
-    y = df[target_column]
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    model = RandomForestRegressor()
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-    r2 = r2_score(y_test, y_pred)
-    mse = mean_squared_error(y_test, y_pred)
-    return {
-        "r2_score": r2,
-        "mean_squared_error": mse
-    }
\ No newline at end of file
+    return _run_evaluation(file_name, target_column, 'regression', quick)
+
+@tool
+def evaluate_candidates(file_name: str, task: str, target_columns: List[str],
+                        models: Optional[List[str]] = None, quick: bool = False) -> List[Dict[str, Any]]:
+    """
+    Evaluate several candidate targets and/or models on one dataset in parallel.
+    Args:
+        file_name (str): The name or path of the dataset stored in DATAFRAME_CACHE.
+        task (str): 'classification' or 'regression'.
+        target_columns (List[str]): Columns to try as the target.
+        models (List[str]): Models to compare: 'random_forest', 'extra_trees',
+            'hist_gradient_boosting'. Defaults to random_forest.
+        quick (bool): Estimate on a subsample with fewer trees (for large datasets).
+    Returns:
+        List[Dict[str, Any]]: One result per (target, model) with scores and metrics.
+    """
+    if task not in ('classification', 'regression'):
+        return [{"error": f"Unknown task '{task}'. Use 'classification' or 'regression'."}]
+    try:
+        return evaluate_many(file_name, task, target_columns,
+                             [{'name': m} for m in models] if models else None, quick)
+    except FileNotFoundError:
+        return [{"error": f"DataFrame '{file_name}' not found in cache or on disk."}]
+    except Exception as e:
+        return [{"error": f"Error evaluating '{file_name}': {str(e)}"}]
+
+def _run_evaluation(file_name: str, target_column: str, task: str, quick: bool) -> Dict[str, Any]:
+    try:
+        return evaluate(file_name, target_column, task, quick=quick)
+    except FileNotFoundError:
+        return {"error": f"DataFrame '{file_name}' not found in cache or on disk."}
+    except Exception as e:
+        return {"error": f"Error evaluating '{file_name}': {str(e)}"}
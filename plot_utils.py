@@ -1,64 +1,327 @@
 import io
+import os
+import json
 import base64
+import threading
+import multiprocessing
 import numpy as np
 import pandas as pd
-import seaborn as sns
-from typing import Dict, Any
-import matplotlib.pyplot as plt
+from config import Config
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Dict, Any, Callable, Iterable, List, Optional, Tuple
+from cache_utils import LRUCache, _column_fingerprints, _combine_fingerprints
+from stats_utils import _sorted_quantiles, _pairwise_corr, _is_numeric_dtype
 
-def _figure_to_base64() -> str:
+# Matplotlib, Seaborn and PIL are imported by the renderers on first use: they
+# cost seconds to import and most processes (web workers, chart data mode) never draw
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# Seaborn imports pyplot; keep it (and spawned render workers) on the headless backend
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+# Rendered plots keyed by the fingerprints of the columns that feed them
+PLOT_CACHE = LRUCache(max_entries=Config.PLOT_CACHE_MAX_ENTRIES,
+                      max_bytes=Config.PLOT_CACHE_MAX_BYTES)
+
+PANELS_PER_ROW = 2 # 2 plots per row
+
+
+class PlotPool:
+    """Worker pool for plot rendering, sized to the cores and started on first use.
+
+    Renderers only use the object-oriented Figure/Agg API, so they hold no
+    global pyplot state and can run in processes (default) or threads. With a
+    single worker, tasks run inline.
+    """
+
+    def __init__(self, workers: int, executor: str = 'process'):
+        self.workers = workers
+        self.executor = executor
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def resize(self, workers: int, executor: Optional[str] = None) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.workers = workers
+            self.executor = executor or self.executor
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.executor == 'process':
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='plot')
+            return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        if self.workers <= 1:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        try:
+            return self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool
+            self.resize(self.workers)
+            return self._get_executor().submit(fn, *args)
+
+    def shutdown(self) -> None:
+        self.resize(self.workers)
+
+
+PLOT_POOL = PlotPool(Config.PLOT_WORKERS, Config.PLOT_EXECUTOR)
+
+
+def _figure_to_png(fig: 'Figure', **savefig_kwargs: Any) -> bytes:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    FigureCanvasAgg(fig)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', **savefig_kwargs)
+    return buf.getvalue()
+
+def _to_base64(png: bytes) -> str:
+    return base64.b64encode(png).decode('utf-8')
+
+def _plot_key(kind: str, fingerprints: Iterable[str]) -> str:
+    # Column fingerprints cover the label, so a key does not depend on column positions
+    return _combine_fingerprints(kind, *fingerprints)
+
+def _numeric_fingerprints(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """``df.select_dtypes(include=[np.number])`` and the fingerprints of its columns."""
+    fingerprints = list(_column_fingerprints(df).values())
+    positions = [pos for pos, dtype in enumerate(df.dtypes) if _is_numeric_dtype(dtype)]
+    return df.iloc[:, positions], [fingerprints[pos] for pos in positions]
+
+def _heatmap_corr(numeric_df: pd.DataFrame, streamed: bool = False) -> pd.DataFrame:
+    if not streamed:
+        return numeric_df.corr(numeric_only=True)
+    return pd.DataFrame(_pairwise_corr(numeric_df), index=numeric_df.columns, columns=numeric_df.columns)
+
+def _render_heatmap(corr: pd.DataFrame) -> bytes:
+    # Grow the figure with the matrix so labels stay readable past a handful of columns
+    import seaborn as sns
+    from matplotlib.figure import Figure
+    side = max(6, 0.4 * len(corr))
+    fig = Figure(figsize=(side, side * 5 / 6), tight_layout=True)
+    ax = fig.add_subplot()
+    sns.heatmap(corr, cmap='coolwarm', annot=False, ax=ax)
+    return _figure_to_png(fig, bbox_inches='tight')
+
+def _render_panel_row(kind: str, panels: List[Tuple[str, np.ndarray]]) -> bytes:
+    """One row of the histogram or boxplot grid; rows share a width so they stack."""
+    import seaborn as sns
+    from matplotlib.figure import Figure
+    height = 3 if kind == 'histograms' else 2.5
+    fig = Figure(figsize=(PANELS_PER_ROW * 5, height), tight_layout=True)
+    axes = fig.subplots(1, PANELS_PER_ROW)
+    for ax, (name, values) in zip(axes, panels):
+        if values.size == 0:
+            ax.axis('off')
+            continue
+        if kind == 'histograms':
+            sns.histplot(values, kde=True, ax=ax, color='#6366F1')
+            ax.set_title(f'Histogram of {name}')
+        else:
+            sns.boxplot(x=values, ax=ax, color='#22C55E')
+            ax.set_title(f'Boxplot of {name}')
+        ax.set_xlabel(name)
+    ## Turn off any unused subplots
+    for ax in axes[len(panels):]:
+        ax.axis('off')
+    return _figure_to_png(fig)
+
+def _stitch_rows(rows: List[bytes]) -> str:
+    if len(rows) == 1:
+        return _to_base64(rows[0])
+    from PIL import Image
+    images = [Image.open(io.BytesIO(row)).convert('RGB') for row in rows]
+    sheet = Image.new('RGB', (max(im.width for im in images), sum(im.height for im in images)), 'white')
+    top = 0
+    for im in images:
+        sheet.paste(im, (0, top))
+        top += im.height
     buf = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(buf, format='png', bbox_inches='tight')
-    plt.close()
-    buf.seek(0)
-    return base64.b64encode(buf.read()).decode('utf-8')
+    sheet.save(buf, format='PNG')
+    return _to_base64(buf.getvalue())
 
-def _generate_plots(df: pd.DataFrame) -> Dict[str, Any]:
+def _generate_plots(df: pd.DataFrame, cache: Optional[LRUCache] = PLOT_CACHE,
+                    pool: PlotPool = PLOT_POOL,
+                    max_columns: int = Config.PLOT_MAX_COLUMNS,
+                    sample: Optional[np.ndarray] = None) -> Dict[str, Any]:
     plots: Dict[str, Any] = {}
-    numeric_df = df.select_dtypes(include=[np.number])
+    numeric_df, fingerprints = _numeric_fingerprints(df)
+    # With a row sample (approximate mode) the grids, and their KDEs, only see
+    # the sampled rows; the heatmap still streams over every row
+    panel_df = numeric_df if sample is None else numeric_df.iloc[sample]
+    tag = '' if sample is None else f'-sample{len(sample)}'
+    # Each plot (and each row of a grid) is keyed only by the columns it draws,
+    # so a step that touches other columns leaves it cached
+    cols = list(range(min(numeric_df.shape[1], max_columns)))
+
+    # Every uncached image is an independent task: the heatmap and each row of
+    # the histogram and boxplot grids all render in parallel
+    pending: Dict[str, Future] = {}
+    images: Dict[str, bytes] = {}
+
+    def request(key: str, fn: Callable[..., bytes], make_args: Callable[[], tuple]) -> None:
+        # The task's inputs are only built on a cache miss
+        image = cache.get(key) if cache is not None else None
+        if image is not None:
+            images[key] = image
+        elif key not in pending:
+            pending[key] = pool.submit(fn, *make_args())
 
     # Correlation heatmap
     if numeric_df.shape[1] >= 2:
-        plt.figure(figsize=(6, 5))
-        corr = numeric_df.corr(numeric_only=True)
-        sns.heatmap(corr, cmap='coolwarm', annot=False)
-        plots['heatmap'] = _figure_to_base64()
-
-    # Histograms and Boxplots for up to 6 numeric columns
-    cols = list(numeric_df.columns)[:6]
+        heatmap_key = _plot_key('heatmap', fingerprints)
+        request(heatmap_key, _render_heatmap, lambda: (_heatmap_corr(numeric_df, sample is not None),))
 
+    # Histograms and Boxplots, one row of panels per task
+    # Grid rows hold column positions in numeric_df, so duplicate labels are drawn once each
+    grids: Dict[str, Tuple[str, List[str]]] = {}
     if cols:
-        ## Historgram subplot
-        n_cols = 2 # 2 plots per row
-        n_rows = (len(cols) + n_cols - 1) // n_cols
-        fig, axes = plt.subplots(n_rows, n_cols, figsize=(n_cols * 5, n_rows * 3))
-        axes = axes.flatten()
-        for i, col in enumerate(cols):
-            series = numeric_df[col].dropna()
-            if series.empty:
-                axes[i].axis('off')
+        rows = [cols[i:i + PANELS_PER_ROW] for i in range(0, len(cols), PANELS_PER_ROW)]
+        for kind in ('histograms', 'boxplots'):
+            grid_key = _plot_key(kind + tag, fingerprints[:len(cols)])
+            row_keys = [_plot_key(f'{kind}-row{tag}', [fingerprints[j] for j in row]) for row in rows]
+            grids[kind] = (grid_key, row_keys)
+            cached = cache.get(grid_key) if cache is not None else None
+            if cached is not None:
+                plots[kind] = cached
                 continue
-            sns.histplot(series, kde=True, ax=axes[i], color='#6366F1')
-            axes[i].set_title(f'Histogram of {col}')
-        ## Turn off any unused subplots
-        for j in range(i + 1, len(axes)):
-            axes[j].axis('off')
-        plots['histograms'] = _figure_to_base64()
-
-        ## Boxplot subplot
-        fig, axes = plt.subplots(n_rows, n_cols, figsize=(n_cols * 5, n_rows * 2.5))
-        axes = axes.flatten()
-        for i, col in enumerate(cols):
-            series = numeric_df[col].dropna()
-            if series.empty:
-                axes[i].axis('off')
-                continue
-            sns.boxplot(x=series, ax=axes[i], color='#22C55E')
-            axes[i].set_title(f'Boxplot of {col}')
-        ## Turn off any unused subplots
-        for j in range(i + 1, len(axes)):
-            axes[j].axis('off')
-        plots['boxplots'] = _figure_to_base64()
+            for row, row_key in zip(rows, row_keys):
+                request(row_key, _render_panel_row,
+                        lambda row=row, kind=kind: (kind, [(str(numeric_df.columns[j]),
+                                                            panel_df.iloc[:, j].dropna().to_numpy()) for j in row]))
+
+    for key, future in pending.items():
+        images[key] = future.result()
+        if cache is not None:
+            cache.set(key, images[key])
+
+    if numeric_df.shape[1] >= 2:
+        plots['heatmap'] = _to_base64(images[heatmap_key])
+    for kind, (grid_key, row_keys) in grids.items():
+        if kind not in plots:
+            plots[kind] = _stitch_rows([images[k] for k in row_keys])
+            if cache is not None:
+                cache.set(grid_key, plots[kind])
 
     return plots
+
+
+## Chart data mode
+# The same three charts as compact numbers for the dashboard to draw itself
+
+def _json_floats(values: np.ndarray, decimals: Optional[int] = None) -> List[Optional[float]]:
+    if decimals is not None:
+        values = np.round(values, decimals)
+    return [None if np.isnan(v) else float(v) for v in values]
+
+def _histogram_bins(counts: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+                    q1: np.ndarray, q3: np.ndarray, max_bins: int) -> np.ndarray:
+    """Bin counts per column, following numpy's 'auto' rule (as seaborn does)."""
+    n = np.maximum(counts, 1).astype(np.float64)
+    spread = hi - lo
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sturges = spread / (np.log2(n) + 1.0)
+        fd = 2.0 * (q3 - q1) / np.cbrt(n)
+        width = np.where(fd > 0, np.fmin(fd, sturges), sturges)
+        bins = np.ceil(spread / width)
+    bins = np.where(np.isfinite(bins) & (spread > 0), bins, 1)
+    return np.clip(bins, 1, max_bins).astype(np.int64)
+
+def _chart_data(df: pd.DataFrame, cache: Optional[LRUCache] = PLOT_CACHE,
+                max_columns: int = Config.PLOT_MAX_COLUMNS,
+                max_bins: int = Config.CHART_MAX_BINS,
+                max_outliers: int = Config.CHART_MAX_OUTLIERS,
+                sample: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """Histogram counts, box-plot summaries and the correlation matrix as JSON-ready data.
+
+    Covers the same columns as _generate_plots. One column-wise sort of the
+    numeric block gives the quartiles, whiskers and outliers; histograms for
+    all columns come from a single bincount and the correlation from streamed
+    masked matrix products. With ``sample`` (row positions) histograms and box
+    plots are built from those rows, with counts scaled to the full column.
+    """
+    numeric_df, fingerprints = _numeric_fingerprints(df)
+    kind = f'charts-{max_columns}-{max_bins}-{max_outliers}'
+    if sample is not None:
+        kind += f'-sample{len(sample)}'
+    key = _plot_key(kind, fingerprints)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        return cached
+
+    charts: Dict[str, Any] = {'mode': 'data'}
+
+    # Correlation heatmap: pairwise-complete Pearson over every row, like DataFrame.corr
+    if numeric_df.shape[1] >= 2:
+        charts['heatmap'] = {'columns': [str(c) for c in numeric_df.columns],
+                             'matrix': [_json_floats(row, 4) for row in _pairwise_corr(numeric_df)]}
+
+    cols = list(numeric_df.columns)[:max_columns]
+    if cols:
+        k = len(cols)
+        panel_df = numeric_df.iloc[:, :k]
+        block = (panel_df if sample is None else panel_df.iloc[sample]).to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(block)
+        counts = valid.sum(axis=0)
+        # Sampled counts stand for the whole column
+        scale = np.ones(k) if sample is None else panel_df.notna().sum().to_numpy() / np.maximum(counts, 1)
+        sorted_block = np.sort(block, axis=0)
+        q1, median, q3 = _sorted_quantiles(sorted_block, counts, np.array([0.25, 0.5, 0.75]))
+        has_values = counts > 0
+        last = np.maximum(counts - 1, 0)
+        lo = np.where(has_values, sorted_block[0] if len(block) else np.nan, np.nan)
+        hi = np.where(has_values, sorted_block[last, np.arange(k)] if len(block) else np.nan, np.nan)
+
+        # Histograms: every value gets a global bin id (column offset + bin) for one bincount
+        bins = _histogram_bins(counts, lo, hi, q1, q3, max_bins)
+        offsets = np.concatenate(([0], np.cumsum(bins)))
+        width = np.where(hi > lo, (hi - lo) / bins, 1.0)
+        with np.errstate(invalid='ignore'):
+            idx = np.floor((block - lo) / width)
+        idx = np.clip(np.where(valid, idx, 0), 0, bins - 1).astype(np.int64) + offsets[:-1]
+        bin_counts = np.bincount(idx[valid], minlength=offsets[-1])
+
+        # Box plots: Tukey whiskers at 1.5 IQR; the sorted column gives the cut points
+        iqr = q3 - q1
+        histograms, boxplots = [], []
+        for j, col in enumerate(cols):
+            values = sorted_block[:counts[j], j]
+            if not has_values[j]:
+                histograms.append({'column': str(col), 'edges': [], 'counts': []})
+                boxplots.append({'column': str(col), 'low': None, 'q1': None, 'median': None,
+                                 'q3': None, 'high': None, 'outliers': [], 'outlier_count': 0})
+                continue
+            edges = lo[j] + width[j] * np.arange(bins[j] + 1)
+            if hi[j] == lo[j]:
+                edges = np.array([lo[j] - 0.5, lo[j] + 0.5])
+            histograms.append({'column': str(col), 'edges': _json_floats(edges),
+                               'counts': np.round(bin_counts[offsets[j]:offsets[j + 1]] * scale[j]).astype(np.int64).tolist()})
+            start = np.searchsorted(values, q1[j] - 1.5 * iqr[j], side='left')
+            stop = np.searchsorted(values, q3[j] + 1.5 * iqr[j], side='right')
+            outliers = np.concatenate((values[:start], values[stop:]))
+            if len(outliers) > max_outliers:
+                # Evenly spaced through the sorted outliers, keeping both extremes
+                outliers = outliers[np.linspace(0, len(outliers) - 1, max_outliers).round().astype(np.int64)]
+            boxplots.append({'column': str(col), 'low': float(values[start]), 'q1': float(q1[j]),
+                             'median': float(median[j]), 'q3': float(q3[j]), 'high': float(values[stop - 1]),
+                             'outliers': _json_floats(outliers), 'outlier_count': int(round((counts[j] - (stop - start)) * scale[j]))})
+        charts['histograms'] = histograms
+        charts['boxplots'] = boxplots
+
+    if cache is not None:
+        cache.set(key, charts, size=len(json.dumps(charts)))
+    return charts
@@ -1,101 +1,552 @@
+import warnings
+from abc import ABC, abstractmethod
 import numpy as np
 import pandas as pd
-from typing import Dict, Any
-from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler, Normalizer
-
-def _compute_overview_and_stats(df: pd.DataFrame) -> Dict[str, Any]:
-    overview = {
-        'total_rows': int(df.shape[0]),
-        'total_columns': int(df.shape[1]),
-        'missing_values': int(df.isna().sum().sum()),
-        'numeric_columns': int(df.select_dtypes(include=[np.number]).shape[1]),
-    }
-
-    column_info = []
-    for col in df.columns:
-        series = df[col]
-        missing_percent = float(series.isna().mean() * 100.0)
-        dtype_str = str(series.dtype)
-        unique_values = int(series.nunique(dropna=True))
-        column_info.append({
-            'name': col,
-            'dtype': dtype_str,
-            'missing_percent': missing_percent,
-            'unique_values': unique_values,
-        })
-
-    numeric_df = df.select_dtypes(include=[np.number])
-    stats: Dict[str, Dict[str, float]] = {}
-    if not numeric_df.empty:
-        desc = numeric_df.describe().to_dict()
-        # transpose to {col: {metric: value}}
-        for col, metrics in desc.items():
-            stats[col] = {}
-            for metric, value in metrics.items():
-                # Cast numpy types to python native for JSON
-                if pd.isna(value):
-                    stats[col][metric] = None
-                else:
-                    stats[col][metric] = float(value)
-
-    return {
-        'data_overview': overview,
-        'column_info': column_info,
-        'statistics': stats,
-    }
-
-def _apply_preprocessing(df: pd.DataFrame, steps: list[str]) -> pd.DataFrame:
-    result = df.copy(deep=True)
-    numeric_cols = list(result.select_dtypes(include=[np.number]).columns)
-    cat_cols = list(result.select_dtypes(exclude=[np.number]).columns)
-
-    if 'drop_missing' in steps:
-        result = result.dropna()
-        numeric_cols = list(result.select_dtypes(include=[np.number]).columns)
-        cat_cols = list(result.select_dtypes(exclude=[np.number]).columns)
-
-    if 'fill_mean' in steps and numeric_cols:
-        result[numeric_cols] = result[numeric_cols].fillna(result[numeric_cols].mean())
-
-    if 'fill_median' in steps and numeric_cols:
-        result[numeric_cols] = result[numeric_cols].fillna(result[numeric_cols].median())
-
-    if 'fill_mode' in steps and cat_cols:
-        for c in cat_cols:
-            mode_val = result[c].mode(dropna=True)
+from config import Config
+from pandas._libs.sparse import IntIndex
+from typing import Dict, Any, List, Optional, Tuple
+from cache_utils import LRUCache, _frame_fingerprint, _combine_fingerprints
+from stats_utils import _compute_overview_and_stats
+
+# Step outputs keyed by the fingerprint chain of the source data and the steps before them
+STEP_CACHE = LRUCache(max_entries=Config.PIPELINE_CACHE_MAX_ENTRIES,
+                      max_bytes=Config.PIPELINE_CACHE_MAX_BYTES)
+
+
+def _numeric_columns(df: pd.DataFrame) -> List[Any]:
+    return list(df.select_dtypes(include=[np.number]).columns)
+
+
+def _categorical_columns(df: pd.DataFrame) -> List[Any]:
+    return list(df.select_dtypes(exclude=[np.number]).columns)
+
+
+def _to_json_value(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return str(value)
+    return value
+
+
+def _native_values(values: List[Any], dtype: Any) -> List[Any]:
+    """``values`` as ``dtype`` values: fitted parameters read back from JSON hold timestamps as strings."""
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return list(pd.to_datetime(values))
+    if pd.api.types.is_timedelta64_dtype(dtype):
+        return list(pd.to_timedelta(values))
+    return list(values)
+
+
+class PreprocessingStep(ABC):
+    """One node of a PreprocessingPipeline.
+
+    ``fit`` learns the step's parameters from its input and ``transform`` applies
+    them. Transforms never modify their input in place: steps that only touch some
+    columns return a shallow copy with those columns replaced, so untouched
+    columns are shared with the upstream frame (and the step cache).
+    """
+    name = ''
+
+    def fit(self, df: pd.DataFrame) -> None:
+        pass
+
+    @abstractmethod
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """``df`` with the fitted step applied."""
+
+    def get_params(self) -> Dict[str, Any]:
+        """JSON-serializable fitted parameters."""
+        return {}
+
+    def set_params(self, params: Dict[str, Any]) -> None:
+        pass
+
+
+class DropMissingStep(PreprocessingStep):
+    name = 'drop_missing'
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        if not df.isna().any().any():
+            return df
+        return df.dropna()
+
+
+class FillNumericStep(PreprocessingStep):
+    """Fills missing numeric values with the column mean or median."""
+
+    def __init__(self, name: str, statistic: str):
+        self.name = name
+        self.statistic = statistic
+        self.values: Dict[Any, Any] = {}
+
+    def fit(self, df: pd.DataFrame) -> None:
+        numeric_cols = _numeric_columns(df)
+        values = getattr(df[numeric_cols], self.statistic)() if numeric_cols else pd.Series(dtype=float)
+        self.values = {col: _to_json_value(v) for col, v in values.items()}
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return _fill_columns(df, self.values)
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'values': [[col, v] for col, v in self.values.items()]}
+
+    def set_params(self, params: Dict[str, Any]) -> None:
+        self.values = {col: v for col, v in params['values']}
+
+
+class FillModeStep(PreprocessingStep):
+    name = 'fill_mode'
+
+    def __init__(self):
+        self.values: Dict[Any, Any] = {}
+
+    def fit(self, df: pd.DataFrame) -> None:
+        self.values = {}
+        for col in _categorical_columns(df):
+            mode_val = df[col].mode(dropna=True)
             if not mode_val.empty:
-                result[c] = result[c].fillna(mode_val.iloc[0])
-
-    # One-hot encoding
-    if 'one_hot' in steps and cat_cols:
-        result = pd.get_dummies(result, columns=cat_cols, drop_first=True)
-        numeric_cols = list(result.select_dtypes(include=[np.number]).columns)
-
-    ## Outliear Treatment using IQR Mapping
-    if 'treat_outliers' in steps and numeric_cols:
-        for col in numeric_cols:
-            Q1 = result[col].quantile(0.25)
-            Q3 = result[col].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            result[col] = np.where(result[col] < lower_bound, lower_bound,
-                                   np.where(result[col] > upper_bound, upper_bound, result[col]))
-
-    # Scaling / Normalization (apply to numeric columns only)
-    numeric_cols = list(result.select_dtypes(include=[np.number]).columns)
-    if numeric_cols:
-        if 'standardize' in steps:
-            scaler = StandardScaler()
-            result[numeric_cols] = scaler.fit_transform(result[numeric_cols])
-        if 'minmax' in steps:
-            scaler = MinMaxScaler()
-            result[numeric_cols] = scaler.fit_transform(result[numeric_cols])
-        if 'robust' in steps:
-            scaler = RobustScaler()
-            result[numeric_cols] = scaler.fit_transform(result[numeric_cols])
-        if 'normalize_l2' in steps:
-            normalizer = Normalizer(norm='l2')
-            result[numeric_cols] = normalizer.fit_transform(result[numeric_cols])
-
-    return result
\ No newline at end of file
+                self.values[col] = mode_val.iloc[0]
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        values = {col: _native_values([v], df[col].dtype)[0] for col, v in self.values.items() if col in df.columns}
+        return _fill_columns(df, values)
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'values': [[col, _to_json_value(v)] for col, v in self.values.items()]}
+
+    def set_params(self, params: Dict[str, Any]) -> None:
+        self.values = {col: v for col, v in params['values']}
+
+
+def _fill_columns(df: pd.DataFrame, values: Dict[Any, Any]) -> pd.DataFrame:
+    # Only columns that actually have gaps are copied
+    missing = [col for col in values if col in df.columns and df[col].isna().any()]
+    if not missing:
+        return df
+    result = df.copy(deep=False)
+    for col in missing:
+        result[col] = df[col].fillna(values[col])
+    return result
+
+
+# Name of the top-k encoding's bucket for the values outside the top k
+OTHER_CATEGORY = '__other__'
+# Bytes per stored value of a sparse dummy column: the bool plus its int32 row index
+SPARSE_VALUE_BYTES = 5
+
+
+def _encoding_plan(series: pd.Series, max_categories: int, top_k: int, min_coverage: float,
+                   hash_buckets: int) -> Dict[str, Any]:
+    """How to encode one column: every category, the top k plus "other", or hashed buckets."""
+    counts = series.value_counts(dropna=True)
+    if len(counts) <= max_categories:
+        return {'method': 'one_hot', 'categories': list(pd.Categorical(series).categories)}
+    top = counts.iloc[:top_k]
+    if top.sum() >= min_coverage * counts.sum():
+        return {'method': 'top_k', 'categories': list(top.index) + [OTHER_CATEGORY]}
+    # ID-like columns: no small set of values covers the data
+    return {'method': 'hash', 'buckets': hash_buckets}
+
+
+def _dummy_names(col: Any, plan: Dict[str, Any]) -> List[str]:
+    if plan['method'] == 'hash':
+        return [f'{col}_hash{i}' for i in range(plan['buckets'])]
+    # drop_first, like get_dummies(drop_first=True)
+    return [f'{col}_{c}' for c in plan['categories'][1:]]
+
+
+def _codes(series: pd.Series, plan: Dict[str, Any]) -> np.ndarray:
+    """Each row's dummy column index (-1 for missing values and dropped first categories)."""
+    missing = series.isna().to_numpy()
+    if plan['method'] == 'hash':
+        # hash_array uses a fixed key, so buckets are stable across processes and replays
+        hashed = pd.util.hash_array(series.astype(str).to_numpy(dtype=object))
+        codes = (hashed % np.uint64(plan['buckets'])).astype(np.int64)
+    else:
+        if plan['method'] == 'top_k':
+            categories = _native_values(plan['categories'][:-1], series.dtype) + [OTHER_CATEGORY]
+            # As object, so category columns (from uploads) accept the "other" value
+            series = series.astype(object)
+            series = series.where(series.isin(categories[:-1]) | series.isna(), OTHER_CATEGORY)
+        else:
+            categories = _native_values(plan['categories'], series.dtype)
+        codes = pd.Categorical(series, categories=categories).codes.astype(np.int64) - 1
+    codes[missing] = -1
+    return codes
+
+
+def _dummies(codes: np.ndarray, names: List[str], index: pd.Index, sparse: bool) -> pd.DataFrame:
+    n, k = len(codes), len(names)
+    if not sparse:
+        X = np.zeros((n, k), dtype=bool)
+        rows = np.flatnonzero(codes >= 0)
+        X[rows, codes[rows]] = True
+        return pd.DataFrame(X, columns=names, index=index)
+    # One stable sort groups the rows of each dummy column, already in row order
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes[codes >= 0], minlength=k)
+    ends = np.cumsum(counts) + (len(codes) - counts.sum())
+    columns = {}
+    for j, name in enumerate(names):
+        rows = order[ends[j] - counts[j]:ends[j]].astype(np.int32)
+        columns[name] = pd.arrays.SparseArray(np.ones(len(rows), dtype=bool), sparse_index=IntIndex(n, rows),
+                                              fill_value=False)
+    return pd.DataFrame(columns, index=index)
+
+
+class OneHotStep(PreprocessingStep):
+    """Dummy columns for the non-numeric columns, with the encoding frozen at fit time
+    so replaying on new data yields the same columns.
+
+    Columns with at most ONEHOT_MAX_CATEGORIES values are one-hot encoded like
+    ``pd.get_dummies(drop_first=True)``. Wider columns keep their ONEHOT_TOP_K
+    most frequent values plus an "other" bucket when those cover
+    ONEHOT_TOP_K_MIN_COVERAGE of the rows, and are otherwise hashed into
+    ONEHOT_HASH_BUCKETS columns. Before encoding, the output size is estimated:
+    with ONEHOT_OUTPUT=auto an output above ONEHOT_MAX_BYTES becomes sparse
+    (``SparseDtype(bool)``), and one that is still too large is rejected.
+    """
+    name = 'one_hot'
+
+    def __init__(self, max_categories: int = Config.ONEHOT_MAX_CATEGORIES, top_k: int = Config.ONEHOT_TOP_K,
+                 min_coverage: float = Config.ONEHOT_TOP_K_MIN_COVERAGE,
+                 hash_buckets: int = Config.ONEHOT_HASH_BUCKETS, output: str = Config.ONEHOT_OUTPUT,
+                 max_bytes: int = Config.ONEHOT_MAX_BYTES):
+        if output not in ('dense', 'sparse', 'auto'):
+            raise ValueError(f"Unknown ONEHOT_OUTPUT '{output}'")
+        self.max_categories = max_categories
+        self.top_k = top_k
+        self.min_coverage = min_coverage
+        self.hash_buckets = hash_buckets
+        self.output = output
+        self.max_bytes = max_bytes
+        self.plans: Dict[Any, Dict[str, Any]] = {}
+        self.sparse = output == 'sparse'
+
+    def fit(self, df: pd.DataFrame) -> None:
+        self.plans = {col: _encoding_plan(df[col], self.max_categories, self.top_k, self.min_coverage,
+                                          self.hash_buckets)
+                      for col in _categorical_columns(df)}
+        dense_bytes, sparse_bytes = self.estimate(df)
+        self.sparse = self.output == 'sparse' or (self.output == 'auto' and dense_bytes > self.max_bytes)
+        needed = sparse_bytes if self.sparse else dense_bytes
+        if needed > self.max_bytes:
+            raise ValueError(f"One-hot encoding would need about {needed / 2 ** 20:.0f} MB "
+                             f"({'sparse' if self.sparse else 'dense'}), over the "
+                             f"{self.max_bytes / 2 ** 20:.0f} MB budget (ONEHOT_MAX_BYTES)")
+
+    def estimate(self, df: pd.DataFrame) -> Tuple[int, int]:
+        """Bytes of the dummy columns stored dense (one bool per cell) and sparse."""
+        width = sum(len(_dummy_names(col, plan)) for col, plan in self.plans.items())
+        # At most one non-zero per row and encoded column
+        nonzero = len(df) * len(self.plans)
+        return len(df) * width, nonzero * SPARSE_VALUE_BYTES
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        if not self.plans:
+            return df
+        encoded = [_dummies(_codes(df[col], plan), _dummy_names(col, plan), df.index, self.sparse)
+                   for col, plan in self.plans.items()]
+        return pd.concat([df.drop(columns=list(self.plans)), *encoded], axis=1)
+
+    def get_params(self) -> Dict[str, Any]:
+        columns = [[col, {**plan, 'categories': [_to_json_value(c) for c in plan['categories']]}
+                    if 'categories' in plan else plan] for col, plan in self.plans.items()]
+        return {'sparse': self.sparse, 'columns': columns}
+
+    def set_params(self, params: Dict[str, Any]) -> None:
+        if 'categories' in params:
+            # Pipelines saved before the encoding plans one-hot encoded every column
+            self.plans = {col: {'method': 'one_hot', 'categories': cats} for col, cats in params['categories']}
+            self.sparse = False
+            return
+        self.plans = {col: plan for col, plan in params['columns']}
+        self.sparse = params['sparse']
+
+
+class NumericStep(PreprocessingStep):
+    """A step over all numeric columns that works in place on a float matrix.
+
+    Consecutive numeric steps are fused by ``_fit_transform_numeric``: the
+    numeric block is copied out once into a contiguous array of the pipeline's
+    working dtype, every step fits and transforms that array in place, and the
+    result is assigned back to the frame once.
+    """
+
+    def __init__(self):
+        self.columns: List[Any] = []
+
+    def fit_array(self, X: np.ndarray) -> None:
+        pass
+
+    @abstractmethod
+    def transform_array(self, X: np.ndarray) -> np.ndarray:
+        """``X`` (rows by ``columns``) with the step applied, in place where possible."""
+
+    def fit(self, df: pd.DataFrame) -> None:
+        self.columns = _numeric_columns(df)
+        if self.columns:
+            self.fit_array(df[self.columns].to_numpy(dtype=np.float64))
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        return _transform_numeric(df, [self], np.float64)
+
+    def get_params(self) -> Dict[str, Any]:
+        return {'columns': self.columns}
+
+    def set_params(self, params: Dict[str, Any]) -> None:
+        self.columns = list(params['columns'])
+
+
+class OutlierStep(NumericStep):
+    """Clips numeric columns to the IQR fences (Q1 - 1.5*IQR, Q3 + 1.5*IQR)."""
+    name = 'treat_outliers'
+
+    def __init__(self):
+        super().__init__()
+        self.lower: Optional[np.ndarray] = None
+        self.upper: Optional[np.ndarray] = None
+
+    def fit_array(self, X: np.ndarray) -> None:
+        with warnings.catch_warnings():
+            # All-NaN columns get NaN fences, which leave them untouched
+            warnings.simplefilter('ignore', RuntimeWarning)
+            Q1, Q3 = np.nanquantile(X, [0.25, 0.75], axis=0)
+        IQR = Q3 - Q1
+        self.lower = Q1 - 1.5 * IQR
+        self.upper = Q3 + 1.5 * IQR
+
+    def transform_array(self, X: np.ndarray) -> np.ndarray:
+        # NaN fences compare false, so np.clip would propagate them; mask instead
+        lower = np.where(np.isnan(self.lower), -np.inf, self.lower).astype(X.dtype)
+        upper = np.where(np.isnan(self.upper), np.inf, self.upper).astype(X.dtype)
+        return np.clip(X, lower, upper, out=X)
+
+    def get_params(self) -> Dict[str, Any]:
+        if not self.columns:
+            return {'columns': []}
+        return {'columns': self.columns, 'lower': self.lower.tolist(), 'upper': self.upper.tolist()}
+
+    def set_params(self, params: Dict[str, Any]) -> None:
+        self.columns = list(params['columns'])
+        if self.columns:
+            self.lower = np.asarray(params['lower'], dtype=np.float64)
+            self.upper = np.asarray(params['upper'], dtype=np.float64)
+
+
+class ScaleStep(NumericStep):
+    """Affine scaling of all numeric columns by fitted per-column vectors.
+
+    The parameters are fitted with the matching sklearn scaler and applied with
+    the same arithmetic sklearn uses (``(x - center) / scale``, or
+    ``x * scale - center`` for minmax).
+    """
+    # sklearn class names; sklearn is imported on first fit (it adds seconds to start-up)
+    SCALERS = {'standardize': 'StandardScaler', 'minmax': 'MinMaxScaler', 'robust': 'RobustScaler'}
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+        self.center: Optional[np.ndarray] = None
+        self.scale: Optional[np.ndarray] = None
+
+    def fit_array(self, X: np.ndarray) -> None:
+        import sklearn.preprocessing
+        scaler = getattr(sklearn.preprocessing, self.SCALERS[self.name])(copy=False).fit(X)
+        if self.name == 'minmax':
+            # sklearn computes x * scale_ + min_; keep it in that form
+            self.center, self.scale = -scaler.min_, scaler.scale_
+        elif self.name == 'standardize':
+            self.center, self.scale = scaler.mean_, scaler.scale_
+        else:
+            self.center, self.scale = scaler.center_, scaler.scale_
+
+    def transform_array(self, X: np.ndarray) -> np.ndarray:
+        if self.name == 'minmax':
+            X *= self.scale
+            X -= self.center
+        else:
+            X -= self.center
+            X /= self.scale
+        return X
+
+    def get_params(self) -> Dict[str, Any]:
+        if not self.columns:
+            return {'columns': []}
+        return {'columns': self.columns, 'center': self.center.tolist(), 'scale': self.scale.tolist()}
+
+    def set_params(self, params: Dict[str, Any]) -> None:
+        self.columns = list(params['columns'])
+        if self.columns:
+            self.center = np.asarray(params['center'], dtype=np.float64)
+            self.scale = np.asarray(params['scale'], dtype=np.float64)
+
+
+class NormalizeStep(NumericStep):
+    """Scales each row of the numeric columns to unit L2 norm (stateless)."""
+    name = 'normalize_l2'
+
+    def transform_array(self, X: np.ndarray) -> np.ndarray:
+        # Raises on NaN, like sklearn's Normalizer
+        from sklearn.preprocessing import normalize
+        return normalize(X, norm='l2', copy=False)
+
+
+def _numeric_matrix(df: pd.DataFrame, columns: List[Any], dtype: Any) -> np.ndarray:
+    # Column-major, so each column is one contiguous run for the per-column
+    # reductions; filled column by column to make exactly one copy
+    X = np.empty((len(df), len(columns)), dtype=dtype, order='F')
+    for j, col in enumerate(columns):
+        values = df[col].to_numpy()
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in 'iuf':
+            np.copyto(X[:, j], values, casting='unsafe')
+        else:
+            # Nullable extension dtypes
+            X[:, j] = df[col].to_numpy(dtype=dtype, na_value=np.nan)
+    return X
+
+
+def _assign_numeric(df: pd.DataFrame, columns: List[Any], X: np.ndarray) -> pd.DataFrame:
+    result = df.copy(deep=False)
+    result[columns] = X
+    return result
+
+
+def _fit_transform_numeric(df: pd.DataFrame, steps: List[NumericStep], dtype: Any) -> pd.DataFrame:
+    columns = _numeric_columns(df)
+    for step in steps:
+        step.columns = columns
+    if not columns:
+        return df
+    X = _numeric_matrix(df, columns, dtype)
+    for step in steps:
+        step.fit_array(X)
+        X = step.transform_array(X)
+    return _assign_numeric(df, columns, X)
+
+
+def _transform_numeric(df: pd.DataFrame, steps: List[NumericStep], dtype: Any) -> pd.DataFrame:
+    # Every step of a fused run was fitted on the same columns
+    columns = steps[0].columns
+    if not columns:
+        return df
+    X = _numeric_matrix(df, columns, dtype)
+    for step in steps:
+        X = step.transform_array(X)
+    return _assign_numeric(df, columns, X)
+
+
+## Steps always run in this order, whatever order they were requested in
+STEP_FACTORIES = {
+    'drop_missing': DropMissingStep,
+    'fill_mean': lambda: FillNumericStep('fill_mean', 'mean'),
+    'fill_median': lambda: FillNumericStep('fill_median', 'median'),
+    'fill_mode': FillModeStep,
+    'one_hot': OneHotStep,
+    'treat_outliers': OutlierStep,
+    'standardize': lambda: ScaleStep('standardize'),
+    'minmax': lambda: ScaleStep('minmax'),
+    'robust': lambda: ScaleStep('robust'),
+    'normalize_l2': NormalizeStep,
+}
+
+
+class PreprocessingPipeline:
+    """An ordered chain of fitted preprocessing steps.
+
+    ``fit_transform`` runs the chain against a source frame. With a step cache,
+    each node's output and fitted parameters are stored under the fingerprint of
+    the source plus the steps up to it, so adding or removing a step only
+    recomputes the steps after it. Consecutive numeric steps form one fused node
+    that runs on a single float array (float32 with ``float32=True``, halving
+    its memory). ``to_dict``/``from_dict`` round-trip the fitted parameters as
+    JSON so ``transform`` can replay the pipeline on new data without refitting.
+    """
+
+    def __init__(self, steps: List[str], float32: bool = False):
+        # Unknown step names are ignored, as the preprocessing form always did
+        self.steps: List[PreprocessingStep] = [factory() for name, factory in STEP_FACTORIES.items()
+                                               if name in steps]
+        self.float32 = float32
+
+    @property
+    def step_names(self) -> List[str]:
+        return [step.name for step in self.steps]
+
+    @property
+    def dtype(self) -> Any:
+        return np.float32 if self.float32 else np.float64
+
+    def _nodes(self) -> List[Tuple[int, int]]:
+        """Step index ranges: one per step, except runs of numeric steps are fused."""
+        nodes: List[Tuple[int, int]] = []
+        for i, step in enumerate(self.steps):
+            if nodes and isinstance(step, NumericStep) and isinstance(self.steps[i - 1], NumericStep):
+                nodes[-1] = (nodes[-1][0], i + 1)
+            else:
+                nodes.append((i, i + 1))
+        return nodes
+
+    def _cache_keys(self, df: pd.DataFrame) -> List[str]:
+        keys = []
+        key = _frame_fingerprint(df)
+        for step in self.steps:
+            token = f'{step.name}:{np.dtype(self.dtype).name}' if isinstance(step, NumericStep) else step.name
+            key = _combine_fingerprints(key, token)
+            keys.append(key)
+        return keys
+
+    def fit_transform(self, df: pd.DataFrame, cache: Optional[LRUCache] = STEP_CACHE) -> pd.DataFrame:
+        result = df
+        keys = self._cache_keys(df) if cache is not None and self.steps else None
+        for start, end in self._nodes():
+            done = start
+            if keys is not None:
+                # Resume from the furthest step of this node that is already cached
+                for k in range(end - 1, start - 1, -1):
+                    hit = cache.get(keys[k])
+                    if hit is not None:
+                        result, params = hit
+                        for step, step_params in zip(self.steps[k + 1 - len(params):k + 1], params):
+                            step.set_params(step_params)
+                        done = k + 1
+                        break
+            if done == end:
+                continue
+            pending = self.steps[done:end]
+            if isinstance(pending[0], NumericStep):
+                result = _fit_transform_numeric(result, pending, self.dtype)
+            else:
+                pending[0].fit(result)
+                result = pending[0].transform(result)
+            if keys is not None:
+                cache.set(keys[end - 1], (result, [step.get_params() for step in self.steps[start:end]]),
+                          size=int(result.memory_usage(index=True, deep=True).sum()))
+        return result
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        for start, end in self._nodes():
+            if isinstance(self.steps[start], NumericStep):
+                df = _transform_numeric(df, self.steps[start:end], self.dtype)
+            else:
+                df = self.steps[start].transform(df)
+        return df
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'float32': self.float32,
+                'steps': [{'name': step.name, 'params': step.get_params()} for step in self.steps]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PreprocessingPipeline':
+        pipeline = cls([entry['name'] for entry in data['steps']], float32=data.get('float32', False))
+        params = {entry['name']: entry.get('params', {}) for entry in data['steps']}
+        for step in pipeline.steps:
+            step.set_params(params[step.name])
+        return pipeline
+
+
+def _apply_preprocessing(df: pd.DataFrame, steps: list[str], float32: bool = False) -> pd.DataFrame:
+    return PreprocessingPipeline(steps, float32=float32).fit_transform(df)
@@ -0,0 +1,537 @@
+import numpy as np
+import pandas as pd
+from config import Config
+from typing import Dict, Any, List, Iterator, Optional, Tuple
+
+DESCRIBE_METRICS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+PERCENTILES = np.array([0.25, 0.5, 0.75])
+
+# HyperLogLog precision: 2**14 registers, ~0.8% standard error
+HLL_PRECISION = 14
+
+
+def _numeric_blocks(numeric_df: pd.DataFrame, block_cells: int) -> Iterator[Tuple[List[int], np.ndarray]]:
+    """Yield (column positions, 2-D array) blocks of same-dtype numeric columns.
+
+    Columns are grouped by dtype so every block keeps its native dtype (sums of
+    float32 columns stay float32, exactly as pandas does), and each block holds
+    at most ``block_cells`` values to bound the temporary memory.
+    """
+    n_rows = max(int(numeric_df.shape[0]), 1)
+    block_cols = max(1, block_cells // n_rows)
+    groups: Dict[np.dtype, List[int]] = {}
+    for pos, dtype in enumerate(numeric_df.dtypes):
+        groups.setdefault(dtype, []).append(pos)
+    for positions in groups.values():
+        for start in range(0, len(positions), block_cols):
+            chunk = positions[start:start + block_cols]
+            # F-ordered so each column is contiguous, like a single pandas Series
+            block = np.asfortranarray(numeric_df.iloc[:, chunk].to_numpy())
+            yield chunk, block
+
+
+def _lerp(a: np.ndarray, b: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # Same formulation as numpy's linear quantile interpolation
+    diff_b_a = b - a
+    result = np.asarray(a + diff_b_a * t)
+    np.subtract(b, diff_b_a * (1 - t), out=result, where=t >= 0.5, casting='unsafe')
+    return result
+
+
+def _sorted_quantiles(sorted_block: np.ndarray, counts: np.ndarray, qs: np.ndarray) -> np.ndarray:
+    """Linear-interpolated quantiles of each column of a column-wise sorted block.
+
+    NaNs sort to the end, so only the first ``counts[j]`` rows of column ``j``
+    are real values. Returns an array of shape (len(qs), n_cols).
+    """
+    n_cols = sorted_block.shape[1]
+    out = np.full((len(qs), n_cols), np.nan)
+    valid = counts > 0
+    if not valid.any():
+        return out
+    cols = np.nonzero(valid)[0]
+    n = counts[cols].astype(np.float64)
+    for i, q in enumerate(qs):
+        virtual = n * q + (1 - q) - 1
+        lower = np.floor(virtual)
+        gamma = virtual - lower
+        lo = lower.astype(np.int64)
+        hi = np.minimum(lo + 1, counts[cols] - 1)
+        a = sorted_block[lo, cols]
+        b = sorted_block[hi, cols]
+        out[i, cols] = _lerp(a, b, gamma)
+    return out
+
+
+def _describe_block(block: np.ndarray) -> Dict[str, np.ndarray]:
+    """Describe metrics, missing counts and distinct counts for one numeric block."""
+    n_rows = block.shape[0]
+    if block.dtype.kind == 'f':
+        mask = np.isnan(block)
+        counts = n_rows - mask.sum(axis=0)
+        filled = np.where(mask, 0, block)
+        sum_dtype = block.dtype
+    else:
+        mask = None
+        counts = np.full(block.shape[1], n_rows)
+        filled = block
+        sum_dtype = np.float64
+
+    # Moments follow pandas' nanmean/nanvar (two-pass variance, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=0, dtype=sum_dtype) / counts.astype(sum_dtype)
+        avg = filled.sum(axis=0, dtype=np.float64) / counts
+        sqr = (avg - filled.astype(np.float64, copy=False)) ** 2
+        if mask is not None:
+            sqr[mask] = 0
+        ddof_counts = (counts - 1).astype(np.float64)
+        var = sqr.sum(axis=0, dtype=np.float64) / ddof_counts
+        var[ddof_counts <= 0] = np.nan
+        if block.dtype.kind == 'f':
+            var = var.astype(block.dtype, copy=False)
+        std = np.sqrt(var)
+
+    # One sort per column gives min, max, quartiles and the distinct count
+    sorted_block = np.sort(block, axis=0)
+    quantiles = _sorted_quantiles(sorted_block, counts, PERCENTILES)
+    has_values = counts > 0
+    last = np.maximum(counts - 1, 0)
+    col_idx = np.arange(block.shape[1])
+    mins = np.where(has_values, sorted_block[0, col_idx] if n_rows else np.nan, np.nan)
+    maxs = np.where(has_values, sorted_block[last, col_idx] if n_rows else np.nan, np.nan)
+    if n_rows > 1:
+        changes = sorted_block[1:] != sorted_block[:-1]
+        in_range = np.arange(n_rows - 1)[:, None] < (counts - 1)[None, :]
+        distinct = (changes & in_range).sum(axis=0) + has_values
+    else:
+        distinct = has_values.astype(np.int64)
+
+    return {
+        'count': counts,
+        'missing': n_rows - counts,
+        'distinct': distinct,
+        'mean': mean,
+        'std': std,
+        'min': mins,
+        '25%': quantiles[0],
+        '50%': quantiles[1],
+        '75%': quantiles[2],
+        'max': maxs,
+    }
+
+
+## Approximate analytics
+
+def _sample_size(epsilon: float, confidence: float) -> int:
+    # Dvoretzky-Kiefer-Wolfowitz: with this many uniformly drawn rows, every
+    # empirical quantile is within ``epsilon`` in rank of the true one
+    # (simultaneously for all quantiles) with probability ``confidence``
+    return int(np.ceil(np.log(2 / (1 - confidence)) / (2 * epsilon ** 2)))
+
+
+def _approx_sample(n_rows: int, epsilon: float = Config.STATS_APPROX_EPSILON,
+                   confidence: float = Config.STATS_APPROX_CONFIDENCE,
+                   min_rows: int = Config.STATS_APPROX_MIN_ROWS, seed: int = 0) -> Optional[np.ndarray]:
+    """Sorted row positions of a uniform sample, or None when the data should stay exact.
+
+    The seed is fixed so repeated requests see the same rows and hit the plot cache.
+    """
+    size = _sample_size(epsilon, confidence)
+    if n_rows < min_rows or size >= n_rows:
+        return None
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(n_rows, size=size, replace=False))
+
+
+def _approximation_info(n_rows: int, sample: np.ndarray, epsilon: float, confidence: float) -> Dict[str, Any]:
+    """What the approximate payload's numbers are based on, for the response."""
+    return {
+        'sample_rows': int(len(sample)),
+        'total_rows': n_rows,
+        'rank_error': epsilon,
+        'confidence': confidence,
+        # Describe metrics stay exact: their one sort per column is cheaper than
+        # a sketch and also yields the numeric distinct counts. unique_values is
+        # only estimated (HyperLogLog) for non-numeric columns.
+        'approximate': ['histograms', 'boxplots', 'unique_values'],
+        'exact': ['statistics', 'missing_values', 'correlation'],
+    }
+
+
+def _pairwise_corr(X: Any, block_cells: int = Config.STATS_BLOCK_CELLS) -> np.ndarray:
+    """Pearson correlation over pairwise-complete rows, like DataFrame.corr.
+
+    Co-moment sums are streamed over row blocks with one matrix product each,
+    so memory stays bounded by ``block_cells`` however long the frame is.
+    ``X`` is a 2-D array or a numeric DataFrame (converted one block at a time).
+    Values are shifted by the first block's means to keep the sums well conditioned.
+    """
+    k = X.shape[1]
+    n = np.zeros((k, k))
+    sx = np.zeros((k, k))
+    sxx = np.zeros((k, k))
+    sxy = np.zeros((k, k))
+    shift = None
+    block_rows = max(1, block_cells // max(k, 1))
+    for start in range(0, X.shape[0], block_rows):
+        if isinstance(X, pd.DataFrame):
+            block = X.iloc[start:start + block_rows].to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            block = np.asarray(X[start:start + block_rows], dtype=np.float64)
+        missing = np.isnan(block)
+        if shift is None:
+            counts = (~missing).sum(axis=0)
+            shift = np.where(counts > 0, np.where(missing, 0.0, block).sum(axis=0) / np.maximum(counts, 1), 0.0)
+        present = (~missing).astype(np.float64)
+        centered = np.where(missing, 0.0, block - shift)
+        n += present.T @ present
+        sx += centered.T @ present
+        sxx += (centered * centered).T @ present
+        sxy += centered.T @ centered
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # sx[i, j]: sum of column i over rows where j is present; sx.T is the other side
+        cov = n * sxy - sx * sx.T
+        var = (n * sxx - sx * sx) * (n * sxx - sx * sx).T
+        corr = np.clip(cov / np.sqrt(var), -1.0, 1.0)
+    corr[(n < 2) | ~(var > 0)] = np.nan
+    np.fill_diagonal(corr, np.where(np.diag(var) > 0, 1.0, np.nan))
+    return corr
+
+
+def _hash_values(values: pd.Series) -> np.ndarray:
+    try:
+        return pd.util.hash_pandas_object(values, index=False, categorize=False).to_numpy()
+    except TypeError:
+        # Unhashable cells (lists, dicts) fall back to their string form
+        return pd.util.hash_pandas_object(values.astype(str), index=False, categorize=False).to_numpy()
+
+
+class HyperLogLog:
+    """Mergeable HyperLogLog distinct-count sketch over 64-bit pandas hashes."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        # Ranks are at most 65, so one byte per register
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values: pd.Series) -> None:
+        values = values.dropna()
+        if not values.empty:
+            self.add_hashes(_hash_values(values))
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """Add values by their _hash_values hashes."""
+        if not len(hashes):
+            return
+        p = self.precision
+        bucket = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = (hashes << np.uint64(p)) | np.uint64((1 << p) - 1)
+        # Rank = position of the leftmost 1-bit in the remaining bits
+        _, exponent = np.frexp(rest.astype(np.float64))
+        rank = (65 - exponent).astype(np.uint8)
+        np.maximum.at(self.registers, bucket, rank)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+def _hll_distinct_count(series: pd.Series, precision: int = HLL_PRECISION) -> int:
+    """HyperLogLog estimate of the number of distinct non-null values."""
+    sketch = HyperLogLog(precision)
+    sketch.add(series)
+    return min(sketch.count(), int(series.notna().sum()))
+
+
+def _hashable_form(values: pd.Series) -> pd.Series:
+    # Hash every chunk in a common dtype so int8/int16/float chunks of one column agree
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        return values.astype(np.float64)
+    return values.astype(object)
+
+
+class StreamingStats:
+    """Overview and statistics accumulated chunk by chunk, e.g. while parsing an upload.
+
+    Counts, missing values, min/max, mean and std are exact (Chan's parallel
+    update). Distinct counts are exact up to ``exact_distinct_limit`` values (kept
+    as a sorted array of their 64-bit hashes) and switch to HyperLogLog above it. Percentiles come from a bottom-k row sample,
+    so they are exact whenever the dataset has at most ``sample_rows`` rows.
+    """
+
+    def __init__(self, sample_rows: int = Config.STATS_SAMPLE_ROWS,
+                 exact_distinct_limit: int = Config.STATS_EXACT_DISTINCT_LIMIT,
+                 sample_cells: int = Config.STATS_BLOCK_CELLS, seed: int = 0):
+        self.sample_rows = sample_rows
+        self.sample_cells = sample_cells
+        self.exact_distinct_limit = exact_distinct_limit
+        self.rows = 0
+        self.columns: List[Any] = []
+        self._rng = np.random.default_rng(seed)
+        self._missing: Dict[Any, int] = {}
+        self._count: Dict[Any, int] = {}
+        self._mean: Dict[Any, float] = {}
+        self._m2: Dict[Any, float] = {}
+        self._min: Dict[Any, float] = {}
+        self._max: Dict[Any, float] = {}
+        self._distinct: Dict[Any, Any] = {}
+        self._sample: pd.DataFrame | None = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            # Keep the row sample within the same cell budget as a stats block
+            n_numeric = sum(_is_numeric_dtype(d) for d in chunk.dtypes)
+            self.sample_rows = max(1000, min(self.sample_rows, self.sample_cells // max(1, n_numeric)))
+        self.rows += int(chunk.shape[0])
+        for col, n_missing in chunk.isna().sum().items():
+            self._missing[col] = self._missing.get(col, 0) + int(n_missing)
+
+        numeric_cols = [c for c, dtype in chunk.dtypes.items() if _is_numeric_dtype(dtype)]
+        if numeric_cols:
+            block = chunk[numeric_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+            self._update_moments(numeric_cols, block)
+            self._update_sample(numeric_cols, block)
+
+        for col in chunk.columns:
+            self._update_distinct(col, chunk[col])
+
+    def _update_moments(self, cols: List[Any], block: np.ndarray) -> None:
+        mask = np.isnan(block)
+        counts = (~mask).sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sums = np.where(mask, 0, block).sum(axis=0)
+            means = sums / counts
+            m2 = np.where(mask, 0, (block - means) ** 2).sum(axis=0)
+        for j, col in enumerate(cols):
+            n_b = int(counts[j])
+            if n_b == 0:
+                self._count.setdefault(col, 0)
+                continue
+            column = block[:, j]
+            lo, hi = float(np.nanmin(column)), float(np.nanmax(column))
+            n_a = self._count.get(col, 0)
+            if n_a == 0:
+                self._count[col], self._mean[col], self._m2[col] = n_b, float(means[j]), float(m2[j])
+                self._min[col], self._max[col] = lo, hi
+                continue
+            # Chan et al. pairwise merge of (count, mean, M2)
+            n = n_a + n_b
+            delta = float(means[j]) - self._mean[col]
+            self._mean[col] += delta * n_b / n
+            self._m2[col] += float(m2[j]) + delta * delta * n_a * n_b / n
+            self._count[col] = n
+            self._min[col] = min(self._min[col], lo)
+            self._max[col] = max(self._max[col], hi)
+
+    def _update_sample(self, cols: List[Any], block: np.ndarray) -> None:
+        # Bottom-k sampling: every row gets a random priority, the k lowest survive
+        chunk_sample = pd.DataFrame(block, columns=cols)
+        chunk_sample['__priority'] = self._rng.random(block.shape[0])
+        merged = chunk_sample if self._sample is None else pd.concat([self._sample, chunk_sample], ignore_index=True)
+        if len(merged) > self.sample_rows:
+            keep = np.argpartition(merged['__priority'].to_numpy(), self.sample_rows)[:self.sample_rows]
+            merged = merged.iloc[keep].reset_index(drop=True)
+        self._sample = merged
+
+    def _update_distinct(self, col: Any, values: pd.Series) -> None:
+        hashes = _hash_values(_hashable_form(values).dropna())
+        state = self._distinct.get(col)
+        if isinstance(state, HyperLogLog):
+            state.add_hashes(hashes)
+            return
+        state = np.unique(hashes) if state is None else np.union1d(state, hashes)
+        if len(state) > self.exact_distinct_limit:
+            sketch = HyperLogLog()
+            sketch.add_hashes(state)
+            state = sketch
+        self._distinct[col] = state
+
+    def _distinct_count(self, col: Any) -> int:
+        state = self._distinct.get(col)
+        if isinstance(state, HyperLogLog):
+            return min(state.count(), self.rows - self._missing.get(col, 0))
+        return 0 if state is None else len(state)
+
+    def approximation(self, confidence: float = Config.STATS_APPROX_CONFIDENCE) -> Optional[Dict[str, Any]]:
+        """What result()'s estimates are based on (like _approximation_info), or None when it is exact."""
+        sample_rows = 0 if self._sample is None else len(self._sample)
+        approximate = []
+        if sample_rows < self.rows and self._sample is not None:
+            approximate.append('percentiles')
+        if any(isinstance(state, HyperLogLog) for state in self._distinct.values()):
+            approximate.append('unique_values')
+        if not approximate:
+            return None
+        return {
+            'sample_rows': sample_rows,
+            'total_rows': self.rows,
+            # The DKW bound of _sample_size, solved for epsilon
+            'rank_error': float(np.sqrt(np.log(2 / (1 - confidence)) / (2 * sample_rows))) if sample_rows else None,
+            'confidence': confidence,
+            'approximate': approximate,
+            'exact': ['count', 'mean', 'std', 'min', 'max', 'missing_values'],
+        }
+
+    def result(self, dtypes: pd.Series) -> Dict[str, Any]:
+        """Build the same payload as _compute_overview_and_stats for the final dtypes."""
+        numeric_cols = [c for c, dtype in dtypes.items() if _is_numeric_dtype(dtype)]
+        overview = {
+            'total_rows': self.rows,
+            'total_columns': int(len(dtypes)),
+            'missing_values': int(sum(self._missing.get(c, 0) for c in dtypes.index)),
+            'numeric_columns': len(numeric_cols),
+        }
+
+        column_info = []
+        for col, dtype in dtypes.items():
+            column_info.append({
+                'name': col,
+                'dtype': str(dtype),
+                'missing_percent': float(self._missing.get(col, 0) / self.rows * 100.0) if self.rows else float('nan'),
+                'unique_values': self._distinct_count(col),
+            })
+
+        stats: Dict[str, Dict[str, float]] = {}
+        if numeric_cols and self.rows:
+            for col in numeric_cols:
+                n = self._count.get(col, 0)
+                quartiles = [np.nan] * 3
+                if n and self._sample is not None and col in self._sample:
+                    sampled = self._sample[col].to_numpy()
+                    sampled = sampled[~np.isnan(sampled)]
+                    if sampled.size:
+                        quartiles = np.quantile(sampled, PERCENTILES).tolist()
+                values = [n, self._mean.get(col, np.nan),
+                          np.sqrt(self._m2[col] / (n - 1)) if n > 1 else np.nan,
+                          self._min.get(col, np.nan), *quartiles, self._max.get(col, np.nan)]
+                stats[col] = {m: _to_native(v) for m, v in zip(DESCRIBE_METRICS, values)}
+
+        return {
+            'data_overview': overview,
+            'column_info': column_info,
+            'statistics': stats,
+        }
+
+
+def _is_numeric_dtype(dtype: Any) -> bool:
+    # Same predicate as df.select_dtypes(include=[np.number])
+    if issubclass(dtype.type, np.number):
+        return True
+    return bool(getattr(dtype, '_is_numeric', False)) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _to_native(value: Any) -> Any:
+    # Cast numpy types to python native for JSON
+    if pd.isna(value):
+        return None
+    return float(value)
+
+
+def _inline_columns(computed: Dict[str, Any], max_columns: Optional[int]) -> Dict[str, Any]:
+    """``computed`` with the column profiles cut to the first ``max_columns`` columns.
+
+    The overview still covers every column; the rest of the profiles are
+    served a page at a time by column_utils.column_page.
+    """
+    if max_columns is None or len(computed['column_info']) <= max_columns:
+        return computed
+    column_info = computed['column_info'][:max_columns]
+    names = {info['name'] for info in column_info}
+    return {**computed, 'column_info': column_info,
+            'statistics': {col: s for col, s in computed['statistics'].items() if col in names}}
+
+
+def _compute_overview_and_stats(df: pd.DataFrame, approximate: bool = False,
+                                block_cells: int = Config.STATS_BLOCK_CELLS,
+                                approx_min_rows: int = Config.STATS_APPROX_MIN_ROWS,
+                                max_columns: Optional[int] = None) -> Dict[str, Any]:
+    """Overview, per-column info and describe statistics of ``df``.
+
+    With ``max_columns``, only the first that many columns are profiled (see
+    _inline_columns); the overview is still computed over the whole frame.
+    """
+    if max_columns is not None and df.shape[1] > max_columns:
+        computed = _compute_overview_and_stats(df.iloc[:, :max_columns], approximate, block_cells, approx_min_rows)
+        step = max(1, block_cells // max(df.shape[0], 1))
+        computed['data_overview'].update({
+            'total_columns': int(df.shape[1]),
+            # Over column blocks, so no frame-sized boolean mask is built
+            'missing_values': int(sum(df.iloc[:, start:start + step].isna().to_numpy().sum()
+                                      for start in range(0, df.shape[1], step))),
+            'numeric_columns': sum(_is_numeric_dtype(dtype) for dtype in df.dtypes),
+        })
+        return computed
+    n_rows = int(df.shape[0])
+    numeric_positions = [i for i, dtype in enumerate(df.dtypes) if _is_numeric_dtype(dtype)]
+
+    missing = np.zeros(df.shape[1], dtype=np.int64)
+    distinct = np.zeros(df.shape[1], dtype=np.int64)
+    described: Dict[int, Dict[str, Any]] = {}
+
+    # Plain numpy numeric columns go through the vectorized block engine;
+    # extension dtypes (Int64, Float64, ...) keep pandas' own reductions
+    block_positions = [p for p in numeric_positions if isinstance(df.dtypes.iloc[p], np.dtype)]
+    if block_positions:
+        block_df = df.iloc[:, block_positions]
+        for chunk, block in _numeric_blocks(block_df, block_cells):
+            metrics = _describe_block(block)
+            for j, local in enumerate(chunk):
+                pos = block_positions[local]
+                missing[pos] = metrics['missing'][j]
+                distinct[pos] = metrics['distinct'][j]
+                described[pos] = {m: metrics[m][j] for m in DESCRIBE_METRICS}
+
+    other_positions = [p for p in range(df.shape[1]) if p not in described]
+    numeric_set = set(numeric_positions)
+    if other_positions:
+        other_df = df.iloc[:, other_positions]
+        other_missing = other_df.isna().sum().to_numpy()
+        for j, pos in enumerate(other_positions):
+            series = other_df.iloc[:, j]
+            missing[pos] = other_missing[j]
+            if approximate and n_rows >= approx_min_rows:
+                distinct[pos] = _hll_distinct_count(series)
+            else:
+                distinct[pos] = series.nunique(dropna=True)
+        for pos in other_positions:
+            if pos in numeric_set:
+                desc = df.iloc[:, pos].describe()
+                described[pos] = {m: desc[m] for m in DESCRIBE_METRICS}
+
+    overview = {
+        'total_rows': n_rows,
+        'total_columns': int(df.shape[1]),
+        'missing_values': int(missing.sum()),
+        'numeric_columns': len(numeric_positions),
+    }
+
+    column_info = []
+    for pos, (col, dtype) in enumerate(df.dtypes.items()):
+        column_info.append({
+            'name': col,
+            'dtype': str(dtype),
+            'missing_percent': float(missing[pos] / n_rows * 100.0) if n_rows else float('nan'),
+            'unique_values': int(distinct[pos]),
+        })
+
+    stats: Dict[str, Dict[str, float]] = {}
+    if numeric_positions and n_rows:
+        # {col: {metric: value}}
+        for pos in numeric_positions:
+            stats[df.columns[pos]] = {m: _to_native(described[pos][m]) for m in DESCRIBE_METRICS}
+
+    return {
+        'data_overview': overview,
+        'column_info': column_info,
+        'statistics': stats,
+    }
@@ -0,0 +1,11 @@
+import pandas as pd
+from cache_utils import _column_fingerprints, _frame_fingerprint
+
+
+def test_frame_fingerprints_tell_column_labels_apart():
+    values = [1, 2, 3]
+    assert _frame_fingerprint(pd.DataFrame({1: values})) != _frame_fingerprint(pd.DataFrame({'1': values}))
+    same = pd.DataFrame([[1, 2], [3, 4]], columns=['a', 'a'])
+    swapped = pd.DataFrame([[2, 1], [4, 3]], columns=['a', 'a'])
+    assert len(_column_fingerprints(same)) == 2
+    assert _frame_fingerprint(same) != _frame_fingerprint(swapped)
@@ -0,0 +1,25 @@
+import pandas as pd
+from cache_utils import LRUCache
+from column_utils import column_page
+from dataset_store import ArrowDiskStore, MemoryStore
+
+
+def test_columns_sharing_a_name_are_profiled_by_position():
+    df = pd.DataFrame([[1, 100.0, 'x'], [3, 300.0, 'y']], columns=['a', 'b', 'a'])
+    df.insert(1, 'a', [100.0, 300.0], allow_duplicates=True)
+    store = MemoryStore(per_user_bytes=1 << 20, global_bytes=1 << 20)
+    store.set(1, df)
+    page = column_page(store, 1, cache=LRUCache(max_entries=16))
+    assert [(c['position'], c['name'], c['dtype']) for c in page['columns']] == [
+        (0, 'a', 'int64'), (1, 'a', 'float64'), (2, 'b', 'float64'), (3, 'a', 'object')]
+    assert [(c['statistics'] or {}).get('mean') for c in page['columns']] == [2.0, 200.0, 200.0, None]
+    page = column_page(store, 1, sort='mean', descending=True, cache=LRUCache(max_entries=16))
+    assert [c['position'] for c in page['columns']] == [1, 2, 0, 3]
+
+
+def test_column_blocks_read_from_disk(tmp_path):
+    df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y'], 'c': [0.5, 1.5]})
+    store = ArrowDiskStore(str(tmp_path))
+    store.set(2, df)
+    page = column_page(store, 2, sort='name', descending=True, cache=LRUCache(max_entries=16))
+    assert [(c['name'], c['dtype']) for c in page['columns']] == [('c', 'float64'), ('b', 'object'), ('a', 'int64')]
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from dataset_store import ArrowDiskStore, DatasetStore, MemoryStore, TieredDatasetStore, _arrow_table, _from_arrow
+
+
+def test_mixed_object_columns_are_stored_as_text(tmp_path):
+    # Excel sheets often hold IDs such as 1, 2, 'X3' in one column
+    df = pd.DataFrame({'id': [1, 2, 'X3', None], 'x': [1.0, 2.0, 3.0, 4.0]})
+    store = ArrowDiskStore(str(tmp_path))
+    store.set(1, df)
+    out = store.get(1)
+    assert out['id'].tolist() == ['1', '2', 'X3', None]
+    assert out['x'].tolist() == df['x'].tolist()
+
+
+def test_non_str_column_labels_survive_a_round_trip(tmp_path):
+    df = pd.DataFrame({0: [1, 2], 'a': ['x', 'y'], 2.5: [0.1, 0.2]})
+    assert _from_arrow(_arrow_table(df)).columns.tolist() == [0, 'a', 2.5]
+    store = ArrowDiskStore(str(tmp_path))
+    store.set(1, df)
+    pd.testing.assert_frame_equal(store.get(1), df)
+    assert store.get(1, columns=[2.5]).columns.tolist() == [2.5]
+    assert store.dtypes(1).index.tolist() == [0, 'a', 2.5]
+
+
+def test_sparse_columns_round_trip_with_their_labels():
+    df = pd.DataFrame({1: pd.arrays.SparseArray([0, 0, 1], fill_value=0), 'b': [1, 2, 3]})
+    out = _from_arrow(_arrow_table(df))
+    assert out.columns.tolist() == [1, 'b']
+    assert isinstance(out[1].dtype, pd.SparseDtype)
+
+
+def _tiered(tmp_path):
+    return TieredDatasetStore(MemoryStore(per_user_bytes=1 << 30, global_bytes=1 << 30),
+                              ArrowDiskStore(str(tmp_path)))
+
+
+def test_tiered_column_reads_come_from_disk_without_promotion(tmp_path):
+    df = pd.DataFrame({'a': [1, 2], 'b': [3.0, 4.0]})
+    store = _tiered(tmp_path)
+    store.disk.set(1, df)
+    out = store.get(1, columns=['b'])
+    assert out.columns.tolist() == ['b']
+    assert store.memory.get(1) is None
+    pd.testing.assert_frame_equal(store.get(1), df)
+    assert store.memory.get(1) is not None
+    assert store.get(1, columns=['a'])['a'].tolist() == [1, 2]
+
+
+def test_stores_must_implement_the_storage_methods():
+    class Partial(DatasetStore):
+        def get(self, user_id, columns=None, slot='current'):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_memory_store_rejects_frames_over_its_budget():
+    df = pd.DataFrame({'a': range(1000)})
+    store = MemoryStore(per_user_bytes=1000, global_bytes=1 << 20)
+    with pytest.raises(ValueError, match='DATASET_STORE_USER_BYTES'):
+        store.set(1, df)
+    assert store.get(1) is None
+    assert not store.try_set(1, df)
+
+
+def test_tiered_store_keeps_frames_over_the_memory_budget_on_disk(tmp_path):
+    df = pd.DataFrame({'a': range(1000)})
+    store = TieredDatasetStore(MemoryStore(per_user_bytes=1000, global_bytes=1 << 20),
+                               ArrowDiskStore(str(tmp_path)))
+    store.set(1, df)
+    assert store.memory.get(1) is None
+    pd.testing.assert_frame_equal(store.get(1), df)
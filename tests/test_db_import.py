@@ -0,0 +1,26 @@
+import sqlite3
+import pytest
+from db_import import record_batches
+from db_pool import DatabasePools
+from test_db_pool import CONFIG
+
+
+def _pool(tmp_path):
+    path = str(tmp_path / 'data.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.executemany('INSERT INTO t VALUES (?)', [(1,), (2,)])
+    pools = DatabasePools(CONFIG)
+    return pools.pool(pools.register({'db_type': 'sqlite', 'database': path}))
+
+
+def test_a_query_may_end_with_a_semicolon(tmp_path):
+    batches = list(record_batches(_pool(tmp_path), [], query='SELECT x FROM t ORDER BY x; '))
+    assert [b.column(0).to_pylist() for b in batches] == [[1, 2]]
+
+
+def test_a_query_cannot_run_further_statements(tmp_path):
+    pool = _pool(tmp_path)
+    with pytest.raises(ValueError, match='single statement'):
+        list(record_batches(pool, [], query='select 1) x; COMMIT; DELETE FROM t; select (1'))
+    assert [b.num_rows for b in record_batches(pool, [('main', 't')], table='t')] == [2]
@@ -0,0 +1,55 @@
+import sqlite3
+import pytest
+from db_pool import DatabasePools, public_params
+
+CONFIG = {'DB_POOL_MAX_POOLS': 4, 'DB_POOL_MAX_SIZE': 2, 'DB_POOL_IDLE_SECONDS': 300,
+          'DB_POOL_ACQUIRE_TIMEOUT': 1, 'DB_CONNECT_TIMEOUT': 1, 'DB_ALLOW_SQLITE': True,
+          'DB_SCHEMA_CACHE_TTL_SECONDS': 60}
+
+
+def _database(tmp_path) -> dict:
+    path = str(tmp_path / 'data.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+    return {'db_type': 'sqlite', 'database': path, 'password': 'secret'}
+
+
+def test_another_worker_rebuilds_the_pool_from_the_session(tmp_path):
+    params = _database(tmp_path)
+    # Two web workers: the pool only exists in the one that handled /connect_db
+    connected, other = DatabasePools(CONFIG), DatabasePools(CONFIG)
+    pool_id = connected.register(params)
+    session = {'pool_id': pool_id, 'params': public_params(params)}
+    assert 'password' not in session['params']
+    resolved = other.resolve(session['pool_id'], {**session['params'], 'password': 'secret'})
+    assert resolved == pool_id
+    assert other.list_tables(resolved) == ([('main', 't')], False)
+
+
+def test_rebuilding_needs_the_same_parameters(tmp_path):
+    params = _database(tmp_path)
+    pool_id = DatabasePools(CONFIG).register(params)
+    other = DatabasePools(CONFIG)
+    with pytest.raises(KeyError):
+        other.resolve(pool_id, {**public_params(params), 'password': 'wrong'})
+    assert other.stats()['pools'] == []
+
+
+def test_the_reaper_keeps_a_busy_mongo_client(monkeypatch):
+    import db_pool
+    closed = []
+
+    class Client:
+        def close(self):
+            closed.append(self)
+
+    monkeypatch.setitem(db_pool.DRIVERS, 'mongodb', lambda *args: Client())
+    pool = db_pool.ConnectionPool({'db_type': 'mongodb', 'host': 'h'}, max_size=2, idle_seconds=10,
+                                  acquire_timeout=1, connect_timeout=1)
+    with pool.connection() as client:
+        # A long import: far more than idle_seconds since the checkout
+        assert pool.close_idle(now=pool.last_used + 60) == 0
+        assert not closed
+    assert pool.close_idle(now=pool.last_used + 5) == 0
+    assert pool.close_idle(now=pool.last_used + 60) == 1
+    assert closed == [client]
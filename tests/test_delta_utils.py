@@ -0,0 +1,19 @@
+from delta_utils import SnapshotStore, _parts, versioned
+
+
+def test_duplicate_column_names_get_their_own_parts():
+    result = {'column_info': [{'name': 'a', 'dtype': 'int64'}, {'name': 'a', 'dtype': 'object'}],
+              'statistics': {1: {'mean': 1.0}, '1': {'mean': 2.0}},
+              'plots': {'histograms': [{'column': 'a', 'counts': [1]}, {'column': 'a', 'counts': [2]}]}}
+    ids = [part_id for part_id, _ in _parts(result)]
+    assert len(ids) == len(set(ids)) == 6
+
+
+def test_a_delta_resends_only_the_changed_duplicate(tmp_path):
+    snapshots = SnapshotStore(str(tmp_path), max_entries=10)
+    first = {'column_info': [{'name': 'a', 'missing_percent': 0.0}, {'name': 'a', 'missing_percent': 0.0}]}
+    second = {'column_info': [{'name': 'a', 'missing_percent': 0.0}, {'name': 'a', 'missing_percent': 5.0}]}
+    version = versioned(first, snapshots=snapshots)['version']
+    delta = versioned(second, since=version, snapshots=snapshots)
+    assert list(delta['parts'].values()) == [{'name': 'a', 'missing_percent': 5.0}]
+    assert len(delta['order']) == 2
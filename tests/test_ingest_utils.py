@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from ingest_utils import _ingest_chunks
+
+
+def _chunks():
+    # An ID column that only turns out to be text in a later chunk
+    return [pd.DataFrame({'id': [1, 2, 3], 'x': [0.5, 1.5, 2.5]}),
+            pd.DataFrame({'id': ['X4', None, 'X6'], 'x': [3.5, 4.5, np.nan]})]
+
+
+def test_columns_that_change_type_between_chunks_become_text(tmp_path):
+    df, _ = _ingest_chunks(_chunks(), str(tmp_path / 'data.arrow'), spill=False)
+    assert df['id'].tolist()[:3] == ['1', '2', '3']
+    assert df['id'].isna().tolist() == [False] * 4 + [True, False]
+    pa.Table.from_pandas(df, preserve_index=False)
+
+
+def test_spilled_columns_that_change_type_between_chunks_become_text(tmp_path):
+    path = str(tmp_path / 'data.arrow')
+    df, result = _ingest_chunks(_chunks(), path, spill=True)
+    assert df is None
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.schema.field('id').type == pa.string()
+    assert table.column('id').to_pylist() == ['1', '2', '3', 'X4', None, 'X6']
+    assert result['data_overview']['total_rows'] == 6
+    assert 'id' not in result['statistics']
+
+
+def _ids(n: int = 3000, chunk_rows: int = 1000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'key': [f'k{i}' for i in rng.integers(0, 10 ** 6, n)], 'x': rng.normal(size=n)})
+    return df, [df.iloc[i:i + chunk_rows].reset_index(drop=True) for i in range(0, n, chunk_rows)]
+
+
+def test_resident_uploads_get_exact_statistics(tmp_path):
+    expected, chunks = _ids()
+    df, result = _ingest_chunks(chunks, str(tmp_path / 'data.arrow'), spill=False)
+    unique = {info['name']: info['unique_values'] for info in result['column_info']}
+    assert unique == expected.nunique().to_dict()
+    assert result['statistics']['x']['50%'] == pytest.approx(expected['x'].median(), rel=1e-6)
+    assert 'approximation' not in result
+
+
+def test_spilled_uploads_say_what_is_estimated(tmp_path):
+    _, chunks = _ids(n=300_000, chunk_rows=100_000)
+    df, result = _ingest_chunks(chunks, str(tmp_path / 'data.arrow'), spill=True)
+    assert df is None
+    approximation = result['approximation']
+    assert approximation['total_rows'] == 300_000
+    assert approximation['sample_rows'] < 300_000
+    assert 'percentiles' in approximation['approximate']
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_job_worker_processes_exit_after_rendering_plots(tmp_path):
+    # Plots rendered inside a job worker must not leave it unable to exit
+    script = tmp_path / 'run_jobs.py'
+    script.write_text(textwrap.dedent(f'''
+        import multiprocessing
+        import sys
+        sys.path.insert(0, {ROOT!r})
+        from concurrent.futures import ProcessPoolExecutor
+        from config import Config
+        from jobs import _init_worker
+
+
+        def render():
+            import numpy as np
+            import pandas as pd
+            from plot_utils import PLOT_POOL, _generate_plots
+            df = pd.DataFrame(np.random.default_rng(0).normal(size=(100, 5)), columns=list('abcde'))
+            return sorted(_generate_plots(df, cache=None)), PLOT_POOL.executor
+
+
+        if __name__ == '__main__':
+            config = {{k: getattr(Config, k) for k in dir(Config) if k.isupper()}}
+            config.update(PLOT_WORKERS=4, PLOT_EXECUTOR='process', JOB_WORKERS=1, DATASET_STORE_BACKEND='disk',
+                          DATASET_DIR={str(tmp_path / 'datasets')!r}, JOB_DIR={str(tmp_path / 'jobs')!r})
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(config,)) as pool:
+                print(pool.submit(render).result())
+    '''))
+    env = {**os.environ, 'MPLBACKEND': 'Agg'}
+    done = subprocess.run([sys.executable, str(script)], capture_output=True, text=True, timeout=120, env=env)
+    assert done.returncode == 0, done.stderr
+    assert "(['boxplots', 'heatmap', 'histograms'], 'thread')" in done.stdout
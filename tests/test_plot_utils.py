@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+from cache_utils import LRUCache
+from plot_utils import _chart_data
+
+
+def test_chart_data_keeps_duplicate_column_names_apart():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(200, 3)), columns=['a', 'a', 'b'])
+    cache = LRUCache(max_entries=8)
+    charts = _chart_data(df, cache=cache)
+    assert [h['column'] for h in charts['histograms']] == ['a', 'a', 'b']
+    assert charts['boxplots'][0]['median'] != charts['boxplots'][1]['median']
+    # Swapping the two 'a' columns is a different dataset, not a cache hit
+    swapped = df.iloc[:, [1, 0, 2]]
+    assert _chart_data(swapped, cache=cache)['boxplots'][0]['median'] == charts['boxplots'][1]['median']
@@ -0,0 +1,131 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from preprocess_utils import OTHER_CATEGORY, NumericStep, OneHotStep, PreprocessingPipeline, PreprocessingStep
+
+
+def _high_cardinality(n: int = 5000, levels: int = 300) -> pd.Series:
+    rng = np.random.default_rng(0)
+    values = np.where(rng.random(n) < 0.9, rng.choice(['a', 'b', 'c'], n),
+                      rng.choice([f'v{i}' for i in range(levels)], n))
+    return pd.Series(values, name='c')
+
+
+def test_top_k_encodes_category_dtype_columns():
+    # Uploads store low-cardinality text as category dtype
+    df = pd.DataFrame({'c': _high_cardinality().astype('category'), 'x': np.arange(5000)})
+    step = OneHotStep(max_categories=50, top_k=3, min_coverage=0.8)
+    step.fit(df)
+    assert step.plans['c']['method'] == 'top_k'
+
+    out = step.transform(df)
+    kept = step.plans['c']['categories'][:-1]
+    assert sorted(kept) == ['a', 'b', 'c']
+    # The most frequent value is the dropped first dummy
+    assert list(out.columns) == ['x'] + [f'c_{v}' for v in kept[1:]] + [f'c_{OTHER_CATEGORY}']
+    for value in kept[1:]:
+        assert out[f'c_{value}'].sum() == (df['c'] == value).sum()
+    assert out[f'c_{OTHER_CATEGORY}'].sum() == (~df['c'].isin(kept)).sum()
+
+
+def test_top_k_category_column_through_the_pipeline():
+    df = pd.DataFrame({'c': _high_cardinality().astype('category')})
+    out = PreprocessingPipeline(['one_hot']).fit_transform(df, cache=None)
+    assert out.to_numpy().sum(axis=1).max() == 1
+
+
+def _mixed_frame(n: int = 500) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    when = pd.to_datetime(rng.choice(['2020-01-01', '2021-05-02', '2022-03-03'], n))
+    return pd.DataFrame({
+        'when': when,
+        'took': pd.to_timedelta(rng.choice([1, 2, 5], n), unit='h'),
+        'label': rng.choice(['x', 'y', 'z'], n),
+        'value': rng.normal(size=n),
+    })
+
+
+def test_one_hot_matches_get_dummies_for_datetime_columns():
+    df = _mixed_frame()
+    # The baseline's get_dummies call, on the non-numeric columns (timedeltas count as numeric)
+    expected = pd.get_dummies(df, columns=list(df.select_dtypes(exclude=[np.number]).columns), drop_first=True)
+    out = PreprocessingPipeline(['one_hot']).fit_transform(df, cache=None)
+    assert sorted(out.columns) == sorted(expected.columns)
+    assert out['when_2021-05-02 00:00:00'].sum() > 0
+    pd.testing.assert_frame_equal(out[expected.columns], expected)
+
+
+def test_one_hot_replays_from_json_params():
+    # Step cache hits and saved pipelines restore the plan from its JSON form
+    from cache_utils import LRUCache
+    df = _mixed_frame()
+    # The baseline's get_dummies call, on the non-numeric columns (timedeltas count as numeric)
+    expected = pd.get_dummies(df, columns=list(df.select_dtypes(exclude=[np.number]).columns), drop_first=True)
+    cache = LRUCache(max_entries=8)
+    PreprocessingPipeline(['one_hot']).fit_transform(df, cache=cache)
+    cached = PreprocessingPipeline(['fill_mode', 'one_hot'])
+    cached.fit_transform(df, cache=cache)
+    pipeline = PreprocessingPipeline.from_dict(json.loads(json.dumps(cached.to_dict())))
+    pd.testing.assert_frame_equal(pipeline.transform(df)[expected.columns], expected)
+
+
+def test_fill_mode_keeps_datetime_columns_datetime():
+    df = _mixed_frame()
+    df.loc[:10, 'when'] = pd.NaT
+    pipeline = PreprocessingPipeline(['fill_mode'])
+    pipeline.fit_transform(df, cache=None)
+    replayed = PreprocessingPipeline.from_dict(json.loads(json.dumps(pipeline.to_dict())))
+    out = replayed.transform(df)
+    assert out['when'].dtype == df['when'].dtype
+    assert not out['when'].isna().any()
+
+
+def test_steps_must_implement_transform():
+    class NoTransform(PreprocessingStep):
+        name = 'no_transform'
+
+    with pytest.raises(TypeError):
+        NoTransform()
+
+
+def test_numeric_steps_must_implement_transform_array():
+    class NoTransformArray(NumericStep):
+        name = 'no_transform_array'
+
+    with pytest.raises(TypeError):
+        NoTransformArray()
+
+
+def test_encoding_plan_follows_the_cardinality():
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame({
+        'few': rng.choice(['a', 'b'], 2000),
+        'skewed': _high_cardinality(2000).to_numpy(),
+        'ids': [f'id{i}' for i in range(2000)],
+    })
+    step = OneHotStep(max_categories=50, top_k=3, min_coverage=0.8, hash_buckets=16, output='dense')
+    step.fit(df)
+    assert {col: plan['method'] for col, plan in step.plans.items()} == \
+        {'few': 'one_hot', 'skewed': 'top_k', 'ids': 'hash'}
+    out = step.transform(df)
+    assert [c for c in out.columns if c.startswith('ids_')] == [f'ids_hash{i}' for i in range(16)]
+    # Every row lands in exactly one bucket
+    assert (out[[f'ids_hash{i}' for i in range(16)]].sum(axis=1) == 1).all()
+
+
+def test_hashed_and_sparse_encodings_replay_identically():
+    df = pd.DataFrame({'ids': [f'id{i}' for i in range(3000)], 'x': np.arange(3000.0)})
+    pipeline = PreprocessingPipeline(['one_hot'])
+    first = pipeline.fit_transform(df, cache=None)
+    replayed = PreprocessingPipeline.from_dict(json.loads(json.dumps(pipeline.to_dict()))).transform(df)
+    pd.testing.assert_frame_equal(replayed, first)
+    step = OneHotStep(max_categories=50, hash_buckets=8, output='sparse')
+    step.fit(df)
+    sparse = step.transform(df)
+    buckets = [f'ids_hash{i}' for i in range(8)]
+    assert all(isinstance(sparse[c].dtype, pd.SparseDtype) for c in buckets)
+    dense = OneHotStep(max_categories=50, hash_buckets=8, output='dense')
+    dense.fit(df)
+    assert np.array_equal(np.column_stack([np.asarray(sparse[c], dtype=bool) for c in buckets]),
+                          dense.transform(df)[buckets].to_numpy(dtype=bool))
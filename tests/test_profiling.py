@@ -0,0 +1,13 @@
+import pandas as pd
+from llm.dataset_cache import track_reads
+from llm.profiling import profile_directory
+
+
+def test_parallel_profiling_records_every_file_read(tmp_path):
+    for name in ('a.csv', 'b.csv', 'c.csv'):
+        pd.DataFrame({'x': range(20), 'y': [i % 2 for i in range(20)]}).to_csv(tmp_path / name, index=False)
+    with track_reads() as reads:
+        profiles = profile_directory(str(tmp_path), 3, workers=4)
+    assert [p['file'] for p in profiles] == ['a.csv', 'b.csv', 'c.csv']
+    files = {path for kind, path, _ in reads if kind == 'file'}
+    assert files == {str((tmp_path / name).resolve()) for name in ('a.csv', 'b.csv', 'c.csv')}
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from stats_utils import HyperLogLog, StreamingStats
+
+
+def _unique(stats: StreamingStats, dtypes: pd.Series) -> dict:
+    return {info['name']: info['unique_values'] for info in stats.result(dtypes)['column_info']}
+
+
+def test_distinct_counts_are_exact_below_the_limit():
+    stats = StreamingStats(exact_distinct_limit=100)
+    # Downcasting can give one column different dtypes in different chunks
+    chunks = [pd.DataFrame({'n': np.arange(40, dtype=np.int8), 't': [f'v{i % 30}' for i in range(40)]}),
+              pd.DataFrame({'n': np.arange(20, 60, dtype=np.float32), 't': [None] * 5 + ['v0'] * 35})]
+    for chunk in chunks:
+        stats.update(chunk)
+    assert _unique(stats, chunks[0].dtypes) == {'n': 60, 't': 30}
+    assert stats.approximation() is None
+
+
+def test_distinct_counts_switch_to_a_sketch_above_the_limit():
+    stats = StreamingStats(exact_distinct_limit=1000)
+    for start in range(0, 50_000, 10_000):
+        stats.update(pd.DataFrame({'id': [f'id{i}' for i in range(start, start + 10_000)]}))
+    assert isinstance(stats._distinct['id'], HyperLogLog)
+    assert abs(_unique(stats, pd.Series({'id': np.dtype(object)}))['id'] - 50_000) < 0.03 * 50_000
+    assert stats.approximation()['approximate'] == ['unique_values']
+
+
+def test_exact_distinct_state_is_bounded():
+    stats = StreamingStats(exact_distinct_limit=500)
+    for start in range(0, 2000, 100):
+        stats.update(pd.DataFrame({'id': np.arange(start, start + 100)}))
+        state = stats._distinct['id']
+        assert isinstance(state, HyperLogLog) or state.nbytes <= 500 * 8
@@ -0,0 +1,37 @@
+import time
+import importlib
+from typing import Dict, Iterable
+
+# Modules the app imports lazily, by warm-up target
+PRELOAD_MODULES = {
+    'analytics': ['matplotlib.figure', 'matplotlib.backends.backend_agg', 'seaborn', 'PIL.Image',
+                  'sklearn.preprocessing'],
+    'agent': ['langgraph.graph', 'langchain.agents', 'langchain_community.chat_models', 'llm.tools_'],
+}
+
+
+def warm_up(targets: Iterable[str] = ('analytics', 'agent')) -> Dict[str, float]:
+    """Pay the lazy start-up costs now instead of on the first request.
+
+    ``analytics`` imports the plotting and scaling libraries and renders a tiny
+    plot (which loads Matplotlib's font cache); ``agent`` builds the LangGraph
+    agent. Run it once in the master process before workers fork (``PRELOAD``
+    with ``gunicorn --preload``) so every worker inherits the loaded modules.
+    Returns the seconds spent per target.
+    """
+    timings = {}
+    for target in targets:
+        if target not in PRELOAD_MODULES:
+            raise ValueError(f"Unknown warm-up target '{target}'. Choose from {sorted(PRELOAD_MODULES)}")
+        started = time.perf_counter()
+        for module in PRELOAD_MODULES[target]:
+            importlib.import_module(module)
+        if target == 'analytics':
+            import pandas as pd
+            from plot_utils import _render_heatmap
+            _render_heatmap(pd.DataFrame([[1.0]]))
+        else:
+            from llm.llm import get_agent
+            get_agent()
+        timings[target] = round(time.perf_counter() - started, 3)
+    return timings